@@ -19,6 +19,38 @@ if tf.version.VERSION[0] == '2':
   tf = tf.compat.v1
   tf.disable_v2_behavior()
 
+# region : Lazy attributes
+
+# Models, trainers, the organizer and data sets are imported on first access
+#   so that `import tframe` stays cheap for task scripts and sweep trials.
+#   Values are (module, attribute), attribute being None for the module itself
+_LAZY_ATTRIBUTES = {
+  'models': ('.models', None),
+  'Predictor': ('.models', 'Predictor'),
+  'Classifier': ('.models', 'Classifier'),
+  'DataSet': ('.data.dataset', 'DataSet'),
+  'mu': ('.utils.organizer.mu', None),
+  'DefaultHub': ('.trainers.smartrainer', 'SmartTrainerHub'),
+}
+
+
+def __getattr__(name):
+  if name not in _LAZY_ATTRIBUTES: raise AttributeError(
+    "module '{}' has no attribute '{}'".format(__name__, name))
+  import importlib
+  module_name, attr = _LAZY_ATTRIBUTES[name]
+  module = importlib.import_module(module_name, __name__)
+  value = module if attr is None else getattr(module, attr)
+  # Cache value so that __getattr__ will not be called again
+  globals()[name] = value
+  return value
+
+
+def __dir__():
+  return sorted(list(globals().keys()) + list(_LAZY_ATTRIBUTES.keys()))
+
+# endregion : Lazy attributes
+
 from . import pedia
 from .enums import *
 
@@ -31,16 +63,6 @@ from .utils import checker
 from .utils import console
 from .utils import local
 from .utils import linker
-from tframe.data.dataset import DataSet
-
-from .import models
-
-from .models import Predictor
-from .models import Classifier
-
-from .utils.organizer import mu
-
-from .trainers.smartrainer import SmartTrainerHub as DefaultHub
 
 
 def set_random_seed(seed=26):
@@ -2,6 +2,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import os
 from collections import OrderedDict
 import numpy as np
 
@@ -60,6 +61,8 @@ class KrauseEvaluator(object):
     self._save_theta0_ops = None
 
     self._sqrt_MS_g = {}
+    self._sqrt_MS_g_placeholders = {}
+    self._assign_stats_op = None
     self._decay_rate_buffer = {}
 
     self._avg_sqrt_MS_g = None
@@ -116,10 +119,16 @@ class KrauseEvaluator(object):
       self._sqrt_MS_g = {
         theta: tf.Variable(tf.zeros_like(theta), trainable=False)
         for theta in var_list}
+    self._sqrt_MS_g_placeholders = {
+      theta: tf.placeholder(theta.dtype, theta.shape)
+      for theta in var_list}
     self._save_theta0_ops = [
       tf.assign(theta0, theta) for theta, theta0 in self._theta_0.items()]
-    self._reset_theta_ops = [
-      tf.assign(theta, theta0) for theta, theta0 in self._theta_0.items()]
+    self._reset_theta_ops = tf.group(*[
+      tf.assign(theta, theta0) for theta, theta0 in self._theta_0.items()])
+    self._assign_stats_op = tf.group(*[
+      tf.assign(self._sqrt_MS_g[theta], ph)
+      for theta, ph in self._sqrt_MS_g_placeholders.items()])
 
   def _calculate_gradient_stats(self):
     # Sanity check
@@ -162,13 +171,11 @@ class KrauseEvaluator(object):
         th.decimal_str(metric_val, th.val_decimals)))
 
     # Assign mean square grads
-    assign_ops = []
-    for var, output_list in zip(self._var_list, outputs):
+    stats = []
+    for output_list in outputs:
       assert isinstance(output_list, list)
-      mean_square = np.mean(output_list, axis=0)
-      sqrt_mean_square = np.sqrt(mean_square)
-      assign_ops.append(tf.assign(self._sqrt_MS_g[var], sqrt_mean_square))
-    self._model.session.run(assign_ops)
+      stats.append(np.sqrt(np.mean(output_list, axis=0)))
+    self._assign_gradient_stats(stats)
 
     # After gradient stats have been calculated, save them into disk
     # .. if necessary
@@ -180,6 +187,28 @@ class KrauseEvaluator(object):
       self._model.agent.save_model(suffix='DeStat')
       self.show_status('sqrt_MS_g saved to checkpoint')
 
+  def _assign_gradient_stats(self, stats):
+    assert len(stats) == len(self._var_list)
+    self._model.session.run(self._assign_stats_op, feed_dict={
+      self._sqrt_MS_g_placeholders[var]: val
+      for var, val in zip(self._var_list, stats)})
+
+  def _restore_gradient_stats(self):
+    """Restore sqrt_MS_g from the latest DeStat checkpoint saved by
+       _calculate_gradient_stats. Return whether stats have been restored."""
+    ckpt_dir = self._model.agent.ckpt_dir
+    ckpt_state = tf.train.get_checkpoint_state(ckpt_dir)
+    if not ckpt_state: return False
+    names = [os.path.basename(p)
+             for p in ckpt_state.all_model_checkpoint_paths]
+    names = [n for n in names if '-DeStat-' in n]
+    if not names: return False
+    stats_vars = [self._sqrt_MS_g[var] for var in self._var_list]
+    saver = tf.train.Saver(var_list=stats_vars)
+    saver.restore(self._model.session, os.path.join(ckpt_dir, names[-1]))
+    self.show_status('sqrt_MS_g restored from `{}`'.format(names[-1]))
+    return True
+
   # endregion : Private Methods
 
   # region : Public Methods
@@ -200,7 +229,11 @@ class KrauseEvaluator(object):
                  + self._decay_rate[var] * (self._theta_0[var] - var))
       update_ops.append(tf.assign(var, new_var))
 
-    if not th.train_stats_exists or th.de_save_train_stats:
+    # th.de_save_train_stats forces gradient stats to be re-calculated.
+    # .. Otherwise they are loaded along with the model if
+    # .. th.train_stats_exists, or restored from a DeStat checkpoint if any
+    if th.de_save_train_stats or not (
+        th.train_stats_exists or self._restore_gradient_stats()):
       self._calculate_gradient_stats()
     return tf.group(*update_ops)
 
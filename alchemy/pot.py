@@ -91,7 +91,8 @@ class Pot(object):
     # Initiate a scroll for this pot
     self.scroll = ScrollClass(
       self.hyper_params, self.constraints,
-      observation_fetcher=self.get_observations, **kwargs)
+      observation_fetcher=self.get_observations,
+      config_fetcher=self.get_finished_configs, **kwargs)
     # Set criterion
     self.criterion = kwargs.get(self.KEYS.CRITERION, None)
 
@@ -128,6 +129,11 @@ class Pot(object):
       observations.append((od, note.criteria[self.criterion]))
     return observations
 
+  def get_finished_configs(self):
+    """Return configs of all notes in summary. Unlike get_observations,
+       criterion is not required."""
+    return [note.configs for note in self.summary_fetcher()]
+
   # endregion: Bridges Between Helper and Scroll
 
   # region: Private Methods
@@ -1,4 +1,5 @@
 from .scroll_base import Scroll
+from .asha import ASHA
 from .bo.bayesian import Bayesian
 from .goose import Goose
 from .grid_search import GridSearch
@@ -9,6 +10,7 @@ SCROLL_SHELF = {
   'bayesian': Bayesian,
   'grid': GridSearch,
   'grid_search': GridSearch,
+  'asha': ASHA,
   # 'goose': Goose,
 }
 
@@ -36,5 +38,6 @@ def get_argument_keys():
   keys = []
   for c in classes: keys.extend(
     [k for k in c.__init__.__code__.co_varnames if k not in
-     ('self', 'hyper_params', 'constraints', 'observation_fetcher', 'kwargs')])
+     ('self', 'hyper_params', 'constraints', 'observation_fetcher',
+      'config_fetcher', 'kwargs')])
   return list(set(keys))
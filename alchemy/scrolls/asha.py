@@ -0,0 +1,105 @@
+import os
+
+from .scroll_base import Scroll, lock_file, unlock_file
+from ..hyper_param import CategoricalHP, FloatHP
+
+
+class ASHA(Scroll):
+  """Asynchronous successive halving. Configurations are sampled randomly
+     and every trial is launched with the full budget. At each rung, i.e.,
+     round min_rounds * reduction_factor^k, the trial reports its best
+     validation record to a rung board shared by all trials and continues
+     only if the record is within the top 1/reduction_factor of records
+     reported at that rung. Otherwise it is stopped by the trainer.
+
+     Reference:
+       [1] Liam Li, etc. A System for Massively Parallel Hyperparameter
+           Tuning. 2020.
+  """
+
+  name = 'ASHA'
+  valid_HP_types = (CategoricalHP, FloatHP)
+  enable_hp_types = True
+  logging_is_needed = True
+  board_is_needed = True
+
+  def __init__(self, hyper_params, constraints, times=None,
+               reduction_factor=3, min_rounds=1, n_rungs=4, rung_board=None,
+               **kwargs):
+    # Call parent's constructor
+    super(ASHA, self).__init__(hyper_params, constraints, **kwargs)
+    # Specific variables
+    self.times = None if times is None else int(times)
+    self.reduction_factor = int(reduction_factor)
+    assert self.reduction_factor > 1
+    self.rungs = [int(min_rounds) * self.reduction_factor ** k
+                  for k in range(int(n_rungs))]
+    # Will be set by Helper if not provided
+    self.board_path = rung_board
+
+  @property
+  def details(self):
+    return '{} (eta: {}, rungs: {})'.format(
+      self.name, self.reduction_factor, self.rungs)
+
+  def combinations(self):
+    if self.board_path is None: raise AssertionError(
+      '!! Rung board path has not been set.')
+    # Finished trials count towards times when resuming
+    trial_id = sum(self.get_finished_counts().values())
+    while self.times is None or trial_id < self.times:
+      trial_id += 1
+      self.log('Trial # {}'.format(trial_id))
+      # Log finished trials
+      new_observations = self.get_new_x_y()
+      if len(new_observations) > 0:
+        self.log_strings[-1] += ' | Observed {} | BEST: {:.3f}'.format(
+          len(new_observations), self.best_criterion)
+      # Sample a configuration
+      configs = self._value_list_to_config(self._sample_values(1)[0])
+      self.apply_constraint(configs)
+      self.log('Next config: {}'.format(configs))
+      # Settings for trainer
+      configs['asha_board'] = self.board_path
+      configs['asha_rungs'] = ','.join([str(r) for r in self.rungs])
+      configs['asha_eta'] = self.reduction_factor
+      configs['asha_trial'] = '{}-{}'.format(os.getpid(), trial_id)
+      yield configs
+
+
+class RungBoard(object):
+  """A text file shared by trials, each line of which is
+     `trial_id rung value`. Used by trainer to report intermediate records."""
+
+  def __init__(self, path, reduction_factor=3):
+    self.path = path
+    self.reduction_factor = reduction_factor
+
+  def report(self, trial_id, rung, value, lower_is_better=True):
+    """Record value of a trial at a rung and return whether it should be
+       promoted to the next rung"""
+    with open(self.path, 'a+') as f:
+      lock_file(f)
+      f.write('{} {} {}\n'.format(trial_id, rung, value))
+      f.flush()
+      f.seek(0)
+      lines = f.readlines()
+      unlock_file(f)
+    # Gather latest records at this rung
+    records = {}
+    for line in lines:
+      parts = line.split()
+      if len(parts) != 3 or int(parts[1]) != rung: continue
+      records[parts[0]] = float(parts[2])
+    # Promote if not enough trials have reached this rung
+    values = sorted(records.values(), reverse=not lower_is_better)
+    k = len(values) // self.reduction_factor
+    if k == 0: return True
+    cut = values[k - 1]
+    return value <= cut if lower_is_better else value >= cut
+
+  @staticmethod
+  def get_rungs(rungs):
+    if rungs is None: return []
+    return [int(r) for r in str(rungs).split(',') if r]
+
@@ -0,0 +1,16 @@
+from .ei import expected_improvement
+
+
+ACQUISITIONS = {
+  'ei': expected_improvement,
+  'expected_improvement': expected_improvement,
+}
+
+
+def get_acquisition(identifier):
+  if callable(identifier): return identifier
+  assert isinstance(identifier, str)
+  s = identifier.lower().replace('-', '_')
+  if not s in ACQUISITIONS:
+    raise KeyError("!! Unknown acquisition key '{}'".format(s))
+  return ACQUISITIONS[s]
@@ -0,0 +1,11 @@
+import numpy as np
+from scipy.special import erf
+
+
+def expected_improvement(mu, sigma, best, xi=0.01):
+  """Expected improvement over `best` for minimization"""
+  improvement = best - mu - xi
+  z = improvement / sigma
+  cdf = 0.5 * (1.0 + erf(z / np.sqrt(2.0)))
+  pdf = np.exp(-0.5 * np.square(z)) / np.sqrt(2.0 * np.pi)
+  return improvement * cdf + sigma * pdf
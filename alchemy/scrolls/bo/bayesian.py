@@ -1,3 +1,4 @@
+import time
 from collections import OrderedDict
 
 import numpy as np
@@ -7,19 +8,32 @@ from tframe import console
 from tframe.alchemy.scrolls.scroll_base import Scroll
 from tframe.alchemy.hyper_param import CategoricalHP, FloatHP, HyperParameter
 
+from .acquisitions import get_acquisition
 from .priors import get_prior
 
 
 class Bayesian(Scroll):
-  """TODO: this class is unfinished yet"""
+  """Native Bayesian optimization using a Gaussian process prior and
+     (parallel) expected improvement. In each round, q_size configurations
+     are proposed with the Kriging believer (liar='kb') or constant liar
+     (liar='min'/'max'/'mean') heuristic: after a point is chosen, a fantasy
+     observation is fed to the GP so that the next point is chosen elsewhere.
+     Fantasies are removed before real observations are fed in next round.
+     The q_size trials of a round are run concurrently by Helper, and `times`
+     is the maximum number of trials.
+  """
 
   name = 'Bayesian'
   valid_HP_types = (CategoricalHP, FloatHP)
   enable_hp_types = True
+  logging_is_needed = True
+
+  LIARS = ('kb', 'min', 'max', 'mean')
 
   def __init__(self, hyper_params, constraints, observation_fetcher,
                prior='gp', acquisition='ei', times=None, expectation=None,
-               **kwargs):
+               q_size=1, liar='kb', n_initial_points=5, acq_n_points=10000,
+               acq_xi=0.01, **kwargs):
     # Call parent's constructor
     super(Bayesian, self).__init__(
       hyper_params, constraints, observation_fetcher=observation_fetcher,
@@ -27,56 +41,113 @@ class Bayesian(Scroll):
 
     # Specific variables
     assert prior == 'gp' and acquisition == 'ei'  # fix for now
+    if liar not in self.LIARS: raise KeyError(
+      '!! liar should be in {}'.format(self.LIARS))
     self.prior = get_prior(prior)(**kwargs)
-    self.acquisition = acquisition
-    self.times = times
+    self.acquisition = get_acquisition(acquisition)
+    self.times = None if times is None else int(times)
     self.expectation = expectation
-
-    # Buffers
-    self.previous_observations = None
-
+    self.q_size = int(q_size)
+    self.concurrency = self.q_size
+    self.liar = liar
+    self.n_initial_points = int(n_initial_points)
+    self.acq_n_points = int(acq_n_points)
+    self.acq_xi = float(acq_xi)
+    # Encode configs when they are put into observation store
+    self.store.encoder = lambda config: self._encode(list(config.values()))
+
+  @property
+  def details(self):
+    return '{} ({})'.format(self.name, ', '.join([
+      '{}: {}'.format(k, v) for k, v in {
+        'q': self.q_size, 'liar': self.liar, 'n_init': self.n_initial_points,
+        'acq_n_points': self.acq_n_points, 'acq_xi': self.acq_xi}.items()]))
 
   def combinations(self):
-    run_id = 0
+    run_id, n_trials = 0, 0
     while True:
       # Increase run_id
       run_id += 1
-      # Get observations
-      xs, ys = self._get_vector_observations()
+      self.log('Run # {}'.format(run_id))
+      # Get new observations
+      new_x_y_list = self.get_new_x_y()
+      ys = [y for _, y in new_x_y_list]
       # Decide whether to terminate
-      if any([self.times is not None and run_id > self.times,
-              self.expectation is not None and any([
-                self.is_better(y, self.expectation) for y in ys])]): break
-
-      # Fit prior
-
-      # Sample next hyper-parameter
-
-      # Yield result
-      yield None
+      if self.times is not None and n_trials >= self.times:
+        self.log('Terminate on max trials ({}) achieved.'.format(self.times))
+        break
+      if self.expectation is not None and any([
+        self.is_better(y, self.expectation) for y in ys]):
+        self.log('Terminate since expectation ({}) is satisfied.'.format(
+          self.expectation))
+        break
+
+      # Feed new observations to prior incrementally
+      if len(new_x_y_list) > 0:
+        tic = time.time()
+        n = len(new_x_y_list)
+        self.prior.feed_observations(
+          self.store.X[-n:], [self._to_loss(y) for y in self.store.y[-n:]])
+        detail = ' | Observed {}: {}'.format(len(ys), ', '.join(
+          ['({}) {:.3f}'.format(i + 1, y) for i, y in enumerate(ys)]))
+        detail += ' | BEST: {:.3f}'.format(self.best_criterion)
+        detail += ' | fit time: {:.2f} sec'.format(time.time() - tic)
+        self.log_strings[-1] += detail
+
+      # Propose a batch of configurations and yield them
+      q = self.q_size
+      if self.times is not None: q = min(q, self.times - n_trials)
+      n_trials += q
+      for values in self._propose_batch(q):
+        next_config = self._value_list_to_config(values)
+        self.apply_constraint(next_config)
+        self.log('Next config: {}'.format(next_config))
+        yield next_config
+
+  # region: Proposal
+
+  def _propose_batch(self, q):
+    # Sample randomly before enough observations are gathered
+    if self.prior.size < self.n_initial_points:
+      return self._sample_values(q)
+
+    size, batch = self.prior.size, []
+    observed = self.prior.ys.copy()
+    for _ in range(q):
+      candidates = self._sample_values(self.acq_n_points)
+      X = np.stack([self._encode(c) for c in candidates])
+      mu, sigma = self.prior.predict(X)
+      ei = self.acquisition(mu, sigma, np.min(self.prior.ys), self.acq_xi)
+      i = int(np.argmax(ei))
+      batch.append(candidates[i])
+      # Feed fantasy observation
+      if self.liar == 'kb': lie = mu[i]
+      else: lie = {'min': np.min, 'max': np.max, 'mean': np.mean}[
+        self.liar](observed)
+      self.prior.feed_observations([X[i]], [lie])
+    # Remove fantasies
+    self.prior.truncate(size)
+    return batch
+
+  # endregion: Proposal
 
   # region: Transformations
 
-  def _get_vector_observations(self):
-    observations = self.observation_fetcher()
-    xs, ys = [], []
-    for ob in observations:
-      assert isinstance(ob, tuple) and len(ob) == 2
-      hp, criterion = ob
-      assert isinstance(hp, dict) and isinstance(criterion, float)
-      xs.append(np.concatenate([k.to_vector_list(v) for k, v in hp.items()]))
-      ys.append(criterion)
-    return xs, ys
-
-  def input_transform(self, x):
-    return x
-
+  def _to_loss(self, y):
+    """The GP always minimizes"""
+    return -float(y) if self.greater_is_better else float(y)
+
+  def _encode(self, values):
+    """Map a list of HP values to a vector in the unit hyper-cube"""
+    vector = []
+    for hp, v in zip(self.hyper_params.values(), values):
+      assert isinstance(hp, HyperParameter)
+      if isinstance(hp, FloatHP):
+        if hp.scale == 'log-uniform':
+          v, v_min, v_max = [np.log(u) for u in (v, hp.v_min, hp.v_max)]
+        else: v_min, v_max = hp.v_min, hp.v_max
+        vector.append((v - v_min) / (v_max - v_min))
+      else: vector.extend(hp.to_vector_list(v))
+    return np.array(vector, dtype=np.float64)
 
   # endregion: Transformations
-
-  # region: Private Methods
-
-
-  # endregion: Private Methods
-
-
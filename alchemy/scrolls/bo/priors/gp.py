@@ -1,26 +1,76 @@
-import sklearn
+import numpy as np
+from scipy.linalg import cholesky, solve_triangular
 
 from .prior_base import PriorBase
 
 
 class GaussianProcess(PriorBase):
+  """Gaussian process with a Matern-5/2 kernel on inputs normalized to [0, 1].
+     Observations are fed incrementally: the Cholesky factor of the kernel
+     matrix is extended block-wise instead of being recomputed, so feeding m
+     new points to a GP with n points costs O(n^2 m) rather than O(n^3)."""
 
-  def __init__(self, **kwargs):
+  def __init__(self, length_scale=0.25, noise=1e-4, **kwargs):
     super(GaussianProcess, self).__init__(**kwargs)
+    self.length_scale = length_scale
+    self.noise = noise
+    # Observations and the lower Cholesky factor of K + noise * I
+    self._X = None
+    self._y = np.zeros([0])
+    self._L = np.zeros([0, 0])
 
-    # Get kernel
-    self.kernel = None
-    # Create model
-    self.model = sklearn.gaussian_process.GaussianProcessRegressor(
-      self.kernel, **kwargs)
+  @property
+  def size(self):
+    return len(self._y)
 
+  @property
+  def ys(self):
+    return self._y
 
-  def feed_observations(self, x_list, y_list):
-    pass
+  # region: Public Methods
 
+  def feed_observations(self, x_list, y_list):
+    if len(y_list) == 0: return
+    X = np.array(x_list, dtype=np.float64).reshape(len(y_list), -1)
+    if self._X is None: self._X = np.zeros([0, X.shape[1]])
+    # Extend Cholesky factor block-wise
+    n, m = self.size, len(X)
+    K22 = self.kernel(X, X) + self.noise * np.eye(m)
+    if n == 0: self._L = cholesky(K22, lower=True)
+    else:
+      L21 = solve_triangular(self._L, self.kernel(self._X, X), lower=True).T
+      L = np.zeros([n + m, n + m])
+      L[:n, :n], L[n:, :n] = self._L, L21
+      L[n:, n:] = cholesky(K22 - L21 @ L21.T, lower=True)
+      self._L = L
+    self._X = np.concatenate([self._X, X])
+    self._y = np.concatenate([self._y, np.array(y_list, dtype=np.float64)])
 
-class Kernel(object):
-  pass
+  def truncate(self, size):
+    """Remove observations fed after the first `size` ones, e.g., fantasies
+       used in batch proposals. The leading block of the Cholesky factor is
+       still valid."""
+    self._X, self._y = self._X[:size], self._y[:size]
+    self._L = self._L[:size, :size]
 
+  def predict(self, xs):
+    X = np.array(xs, dtype=np.float64)
+    if self.size == 0: return np.zeros(len(X)), np.ones(len(X))
+    # Standardize targets
+    mean, std = np.mean(self._y), np.std(self._y)
+    if std == 0: std = 1.0
+    alpha = solve_triangular(
+      self._L.T, solve_triangular(self._L, (self._y - mean) / std, lower=True))
+    Ks = self.kernel(X, self._X)
+    mu = Ks @ alpha
+    v = solve_triangular(self._L, Ks.T, lower=True)
+    var = np.maximum(1.0 - np.sum(v * v, axis=0), 1e-12)
+    return mu * std + mean, np.sqrt(var) * std
 
+  def kernel(self, X1, X2):
+    d = np.sqrt(np.maximum(np.sum(np.square(
+      X1[:, None, :] - X2[None, :, :]), axis=-1), 0)) / self.length_scale
+    r = np.sqrt(5.0) * d
+    return (1.0 + r + np.square(r) / 3.0) * np.exp(-r)
 
+  # endregion: Public Methods
@@ -1,10 +1,11 @@
-import sklearn
-
-
 class PriorBase(object):
 
   def __init__(self, **kwargs):
     self.kwargs = kwargs
 
   def feed_observations(self, x_list, y_list):
-    raise NotImplementedError
\ No newline at end of file
+    raise NotImplementedError
+
+  def predict(self, xs):
+    """Return mean and standard deviation of predictive distributions"""
+    raise NotImplementedError
@@ -33,15 +33,22 @@ class GridSearch(Scroll):
           yield configs
 
   def combinations(self):
+    # Configurations finished in previous sweeps will be skipped
+    finished = self.get_finished_counts()
+    if finished: console.show_status(
+      '{} finished trials found in summary'.format(sum(finished.values())))
     for run_id in range(self.times):
-      history = []
+      history = set()
       for configs in self.hp_descartes():
         assert isinstance(configs, OrderedDict)
         self.apply_constraint(configs)
         # Check history
-        config_hash = hash(tuple(sorted([(k, v) for k, v in configs.items()])))
-        if config_hash in history: continue
-        history.append(config_hash)
+        config_key = self.get_config_key(configs)
+        if config_key in history: continue
+        history.add(config_key)
+        # Skip finished configurations and those being run by other sweeps
+        if finished.get(config_key, 0) > run_id: continue
+        if not self.claim(config_key, run_id): continue
         # Show status
         console.show_status('', '[# {} of Run {}/{}]'.format(
           len(history), run_id + 1, self.times))
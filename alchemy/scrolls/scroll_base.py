@@ -1,9 +1,14 @@
+import hashlib
+import os
+import time
+
 import numpy as np
 from collections import OrderedDict
 
 from tframe import console
 
 from ..hyper_param import HyperParameter
+from ..hyper_param import CategoricalHP, FloatHP, IntegerHP
 
 
 class Scroll(object):
@@ -13,9 +18,15 @@ class Scroll(object):
 
   enable_hp_types = False
   logging_is_needed = False
+  # Whether trials launched by this scroll share a rung board file
+  board_is_needed = False
+  # Number of trials Helper may run concurrently. Once this number of trials
+  #  have been launched, Helper waits for all of them before asking for more
+  concurrency = 1
 
   def __init__(self, hyper_params, constraints, observation_fetcher=None,
-               greater_is_better=None, **kwargs):
+               greater_is_better=None, config_fetcher=None, resume=True,
+               **kwargs):
     # Set hyper-parameters
     self.hyper_params = OrderedDict()
     self.set_search_space(hyper_params)
@@ -25,10 +36,16 @@ class Scroll(object):
     # Set observation_fetcher
     self._observation_fetcher = observation_fetcher
     self._greater_is_better = greater_is_better
+    # Resume related variables. config_fetcher returns configs of finished
+    #  trials, and claim_path (set by Helper) is a file shared by sweep
+    #  processes to claim configurations being run
+    self._config_fetcher = config_fetcher
+    self.resume = resume in (True, 'true', 'True')
+    self.claim_path = None
     # Save key word arguments
     self.kwargs = kwargs
     # Buffer
-    self.seen_previously = []
+    self.store = ObservationStore()
     self.log_strings = []
 
   # region: Properties
@@ -37,10 +54,14 @@ class Scroll(object):
   def details(self):
     return self.name
 
+  @property
+  def seen_previously(self):
+    return self.store.observations
+
   @property
   def best_criterion(self):
-    ys = [t[1] for t in self.seen_previously]
-    return sorted(ys)[-1 if self.greater_is_better else 0]
+    ys = self.store.y
+    return np.max(ys) if self.greater_is_better else np.min(ys)
 
   @property
   def observation_fetcher(self):
@@ -124,15 +145,46 @@ class Scroll(object):
   def get_new_x_y(self, key_format='value'):
     # Check input
     assert key_format in ('value', 'dict', 'hp_dict', 'hyper_parameter_dict')
-    # Get new observations
-    new_observations = [
-      ob for ob in self.observation_fetcher() if ob not in self.seen_previously]
-    # Extent observation buffer
-    self.seen_previously.extend(new_observations)
+    # Get new observations and put them into observation store
+    new_observations = self.store.ingest(self.observation_fetcher())
     # Get new_x_y
     if key_format != 'value': return new_observations
     return [(list(hp_dict.values()), c) for hp_dict, c in new_observations]
 
+  # region: Resume
+
+  @staticmethod
+  def get_config_key(configs):
+    return get_config_key(configs)
+
+  def get_finished_counts(self):
+    """Return a dictionary {config_key: times} of finished trials"""
+    counts = {}
+    if not self.resume or not callable(self._config_fetcher): return counts
+    for configs in self._config_fetcher():
+      key = self.get_config_key(OrderedDict(
+        [(k, configs[k]) for k in self.hyper_params.keys() if k in configs]))
+      counts[key] = counts.get(key, 0) + 1
+    return counts
+
+  def claim(self, key, run_id=0):
+    """Claim a configuration in claim file. Return False if it has been
+       claimed by another living sweep process."""
+    if not self.resume or self.claim_path is None: return True
+    pid, tag = os.getpid(), '{}-{}'.format(run_id, key)
+    with open(self.claim_path, 'a+') as f:
+      lock_file(f)
+      f.seek(0)
+      owners = [int(line.split()[0]) for line in f.readlines()
+                if len(line.split()) == 2 and line.split()[1] == tag]
+      claimed = any([p != pid and _is_alive(p) for p in owners])
+      if not claimed: f.write('{} {}\n'.format(pid, tag))
+      f.flush()
+      unlock_file(f)
+    return not claimed
+
+  # endregion: Resume
+
   def log(self, s):
     assert isinstance(s, str)
     self.log_strings.append(s)
@@ -142,6 +194,24 @@ class Scroll(object):
     if empty_buffer: self.log_strings = []
     return logs
 
+  def _sample_values(self, n):
+    """Sample n value lists uniformly in the search space"""
+    columns = []
+    for hp in self.hyper_params.values():
+      if isinstance(hp, FloatHP):
+        if hp.scale == 'log-uniform': col = np.exp(np.random.uniform(
+          np.log(hp.v_min), np.log(hp.v_max), n))
+        else: col = np.random.uniform(hp.v_min, hp.v_max, n)
+        if isinstance(hp, IntegerHP):
+          col = [int(c) for c in np.clip(np.round(col), hp.v_min, hp.v_max)]
+        else: col = [float(c) for c in col]
+      else:
+        assert isinstance(hp, CategoricalHP)
+        col = [hp.choices[i]
+               for i in np.random.randint(len(hp.choices), size=n)]
+      columns.append(col)
+    return [list(values) for values in zip(*columns)]
+
   def _value_list_to_config(self, values):
     assert isinstance(values, (tuple, list))
     od = OrderedDict()
@@ -150,3 +220,92 @@ class Scroll(object):
 
 
 
+class ObservationStore(object):
+  """Hash-indexed store of observations, each of which is a tuple of
+     (config_dict, criterion). Ingesting n observations costs O(n). Criteria
+     and (optionally) encoded configs are kept in growing numpy arrays."""
+
+  def __init__(self, encoder=None):
+    # encoder maps a config dict to a 1-D vector
+    self.encoder = encoder
+    self.observations = []
+    self._counts = {}
+    self._X, self._y = None, np.zeros([16])
+    self._size = 0
+
+  def __len__(self):
+    return self._size
+
+  @property
+  def X(self):
+    """Encoded configs of shape [n, dim]"""
+    if self._X is None: return None
+    return self._X[:self._size]
+
+  @property
+  def y(self):
+    return self._y[:self._size]
+
+  def ingest(self, observations):
+    """Add observations not seen before and return them. Observations are
+       treated as a multi-set, i.e., repeated trials are kept."""
+    counts, new_observations = {}, []
+    for ob in observations:
+      key = (get_config_key(ob[0]), repr(float(ob[1])))
+      counts[key] = counts.get(key, 0) + 1
+      if counts[key] > self._counts.get(key, 0):
+        self._counts[key] = counts[key]
+        new_observations.append(ob)
+    for ob in new_observations: self._append(ob)
+    return new_observations
+
+  def _append(self, ob):
+    config, criterion = ob
+    # Enlarge buffers if necessary
+    if self._size == len(self._y):
+      self._y = np.concatenate([self._y, np.zeros_like(self._y)])
+      if self._X is not None:
+        self._X = np.concatenate([self._X, np.zeros_like(self._X)])
+    self._y[self._size] = criterion
+    if self.encoder is not None:
+      x = np.asarray(self.encoder(config), dtype=np.float64)
+      if self._X is None: self._X = np.zeros([len(self._y), x.size])
+      self._X[self._size] = x
+    self.observations.append(ob)
+    self._size += 1
+
+
+def get_config_key(configs):
+  """Canonicalized key of a configuration dict, stable across processes.
+     Values are compared as strings, numbers are compared as floats."""
+  def _canonical(v):
+    try: return repr(float(v))
+    except (TypeError, ValueError): return str(v).lower()
+  items = sorted([(str(getattr(k, 'name', k)), _canonical(v))
+                  for k, v in configs.items()])
+  return hashlib.md5(repr(items).encode()).hexdigest()
+
+
+
+def _is_alive(pid):
+  if os.name == 'nt': return True
+  try: os.kill(pid, 0)
+  except ProcessLookupError: return False
+  except PermissionError: return True
+  return True
+
+
+def lock_file(f):
+  try: import fcntl
+  except ImportError: return
+  while True:
+    try:
+      fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+      return
+    except OSError: time.sleep(0.1)
+
+
+def unlock_file(f):
+  try: import fcntl
+  except ImportError: return
+  fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -39,6 +39,7 @@ class Config(
   log_folder_name = Flag.string('logs', '...')
   ckpt_folder_name = Flag.string('checkpoints', '...')
   snapshot_folder_name = Flag.string('snapshots', '...')
+  trace_folder_name = Flag.string('traces', '...')
 
   job_dir = Flag.string(
     './records', 'The root directory where the records should be put',
@@ -67,6 +68,18 @@ class Config(
   allow_growth = Flag.boolean(True, 'tf.ConfigProto().gpu_options.allow_growth')
   gpu_memory_fraction = Flag.float(
     0.4, 'config.gpu_options.per_process_gpu_memory_fraction')
+  intra_op_threads = Flag.integer(
+    0, 'tf.ConfigProto().intra_op_parallelism_threads, 0 for TF default')
+  inter_op_threads = Flag.integer(
+    0, 'tf.ConfigProto().inter_op_parallelism_threads, 0 for TF default')
+  auto_tune_threads = Flag.boolean(
+    False, 'Whether to benchmark several intra/inter-op thread settings with '
+           'warm-up update steps and use the fastest one')
+  tune_threads_steps = Flag.integer(
+    10, 'Number of timed update steps for each setting in thread tuning')
+  sibling_trials = Flag.integer(
+    1, 'Number of trials running concurrently on this host. Available cores '
+       'will be divided among them. Usually set by script helper')
 
   # Other fancy stuff
   int_para_1 = Flag.integer(None, 'Used to pass an integer parameter using '
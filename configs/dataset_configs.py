@@ -75,6 +75,24 @@ class DataConfigs(object):
     None, 'Length of sub-sequence used in seq_set.get_round_len or '
           'gen_rnn_batches', is_key=None)
 
+  # tf.data input pipeline options
+  use_tf_data = Flag.boolean(
+    False, 'Whether to feed training data via a tf.data iterator instead of '
+           'feed_dict. Validation and evaluation still use feed_dict',
+    is_key=None)
+  tf_data_shuffle_buffer = Flag.integer(
+    0, 'Shuffle buffer size of tf.data pipeline, non-positive value '
+       'indicates the whole data set', is_key=None)
+  tf_data_prefetch = Flag.integer(
+    2, 'Number of batches to prefetch in tf.data pipeline, -1 for AUTOTUNE',
+    is_key=None)
+  tf_data_parallel_calls = Flag.integer(
+    4, 'num_parallel_calls used in tf.data map/interleave, -1 for AUTOTUNE',
+    is_key=None)
+  tf_data_map_func = Flag.whatever(
+    None, 'A function mapping (features, targets) batch tensors to '
+          '(features, targets), applied in tf.data pipeline')
+
   # Data augmentation options
   augmentation = Flag.boolean(False, 'Whether to augment data', is_key=None)
   aug_config = Flag.string(
@@ -111,6 +111,10 @@ class ModelConfigs(object):
     0, 'Warm-up rounds for etching', is_key=None)
   etch_warm_up_steps = Flag.integer(
     0, 'Warm-up steps for etching', is_key=None)
+  etch_in_graph = Flag.boolean(
+    False, 'Whether to calculate new masks inside graph during etching. Etch '
+          'kernels without in-graph implementation will be etched in NumPy',
+    is_key=None)
   pruning_rate_fc = Flag.float(
     0.0, 'Pruning rate for fully connected layers', is_key=None)
   etch_rate_fc = Flag.float(
@@ -16,6 +16,36 @@ class MonitorConfigs(object):
   monitor_weight_grads = Flag.boolean(False, 'Whether to monitor weights grad')
   monitor_weight_flips = Flag.boolean(False, 'Whether to monitor weights flips')
 
+  # Step tracing
+  trace_steps = Flag.string(
+    None, 'Training steps to be traced with FULL_TRACE RunOptions, '
+          'e.g., `100-105` or `10,20,100-105`')
+  trace_val_cycle = Flag.integer(
+    0, 'If positive, every N-th validation will be traced')
+  trace_memory = Flag.boolean(
+    False, 'Whether to show memory usage in exported chrome traces')
+
+  @property
+  def trace_step_set(self):
+    """Steps parsed from trace_steps. The parsed set is cached along with
+       the string it is parsed from, thus assigning trace_steps invalidates
+       the cache"""
+    cache = getattr(self, '_trace_step_cache', None)
+    if cache is not None and cache[0] == self.trace_steps: return cache[1]
+    steps = set()
+    if self.trace_steps not in (None, '', '-'):
+      for seg in self.trace_steps.split(','):
+        if '-' in seg:
+          begin, end = [int(s) for s in seg.split('-')]
+          steps.update(range(begin, end + 1))
+        else: steps.add(int(seg))
+    self._trace_step_cache = (self.trace_steps, frozenset(steps))
+    return self._trace_step_cache[1]
+
+  @property
+  def trace_on(self):
+    return self.trace_val_cycle > 0 or len(self.trace_step_set) > 0
+
   def smooth_out_monitor_configs(self):
     pass
 
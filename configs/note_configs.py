@@ -48,6 +48,11 @@ class NoteConfigs(object):
   error_injection_step = Flag.integer(-1, '...')
   max_states_per_block = Flag.integer(
     -1, 'Max state size for each state block to export')
+  note_tensor_policy = Flag.string(
+    None, 'Storage policies of tensors exported to note, e.g., '
+          '`*/W*:q8,delta;*:f16,log=20`. Rules are matched in order against '
+          'key paths of tensors. See utils/file_tools/tensor_store.py',
+    is_key=None)
 
   export_top_k = Flag.integer(3, 'Used in export_false of classifier')
 
@@ -13,6 +13,20 @@ class RNNConfigs(object):
 
   # Training configs
   parallel_on = Flag.boolean(False, 'Whether to turn on parallel option')
+  hoist_input_projection = Flag.boolean(
+    False, 'Whether to calculate input-to-hidden projections of RNN cells for '
+           'the whole sequence in one matmul before tf.scan')
+  rnn_while_loop = Flag.boolean(
+    False, 'Whether to run RNN with tf.while_loop instead of tf.scan. States '
+           'are carried as loop variables instead of being stacked')
+  rnn_parallel_iterations = Flag.integer(
+    10, 'parallel_iterations used in tf.scan or tf.while_loop')
+  rnn_swap_memory = Flag.boolean(
+    False, 'Whether to swap tensors kept for back-propagation from GPU to '
+           'CPU memory in tf.scan or tf.while_loop')
+  rnn_final_output_only = Flag.boolean(
+    False, 'Whether to keep only outputs of the last step, works only when '
+           'rnn_while_loop is True')
 
   # Basic RNN configs
   rc_dims = Flag.whatever(None, '...')
@@ -50,6 +50,13 @@ class TrainerConfigs(object):
   terminate_on_note = Flag.boolean(
     False, 'This option is for the convenience of taking notes')
 
+  asha_board = Flag.string(
+    None, 'Path of rung board shared by trials launched by ASHA scroll')
+  asha_rungs = Flag.string(
+    None, 'Rounds separated by comma at which ASHA decides whether to stop')
+  asha_eta = Flag.integer(3, 'Reduction factor of ASHA')
+  asha_trial = Flag.string(None, 'Trial ID reported to rung board')
+
   val_progress_bar = Flag.boolean(
     False, 'Whether to show progress bar during validation')
   val_decimals = Flag.integer(3, 'Decimals displayed in validation reports')
@@ -93,6 +100,10 @@ class TrainerConfigs(object):
   state_nan_protection = Flag.boolean(
     False, 'Whether to use NaN protection on train state update. '
            'Usually used with clip_nan_protection')
+  keep_state_in_graph = Flag.boolean(
+    False, 'Whether to keep RNN states in non-trainable variables updated '
+           'inside graph instead of feeding and fetching them each step',
+    is_key=None)
   terminate_on_nan = Flag.boolean(True, 'Whether to terminate on NaN')
   lives = Flag.integer(0, 'Number of chances to resurrect', is_key=None)
   reset_optimizer_after_resurrection = Flag.boolean(
@@ -107,6 +118,13 @@ class TrainerConfigs(object):
     None, 'Batch size modifier after resurrection', is_key=None)
 
   updates_per_round = Flag.integer(None, 'Number of updates per round')
+  steps_per_run = Flag.integer(
+    1, 'Number of updates executed inside a tf.while_loop in a single '
+       'session.run call. Only feed-forward predictors are supported')
+  num_towers = Flag.integer(
+    1, 'Number of net replicas sharing variables. Each batch is split into '
+       'num_towers slices and gradients of replicas are averaged before being '
+       'applied. Only feed-forward predictors are supported')
 
   wmxe_min = Flag.float(
     0.1, 'Minimum value of weights used in weighted M[SA]E', is_key=None)
@@ -143,4 +161,18 @@ class TrainerConfigs(object):
     if self.global_l2_penalty * self.decoupled_l2_penalty != 0:
       raise AssertionError(
         '!! global_l2_penalty can not be used with decoupled_l2_penalty')
-
+    if self.steps_per_run > 1:
+      # Tensors fetched along with each single update can not be fetched
+      #   when updates are executed inside a tf.while_loop
+      for key in ('monitor_weight_grads', 'export_activations'):
+        if getattr(self, key): raise AssertionError(
+          '!! {} can not be used when steps_per_run > 1'.format(key))
+
+    if self.num_towers > 1 and self.steps_per_run > 1: raise AssertionError(
+      '!! num_towers > 1 can not be used when steps_per_run > 1')
+
+    if self.use_tf_data:
+      if self.steps_per_run > 1: raise AssertionError(
+        '!! use_tf_data can not be used when steps_per_run > 1')
+      if self.use_dynamic_ground_truth: raise AssertionError(
+        '!! Dynamic ground truth is not supported when use_tf_data is True')
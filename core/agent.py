@@ -20,6 +20,7 @@ from tframe.utils.local import check_path, clear_paths, write_file
 from tframe.utils.local import save_checkpoint, load_checkpoint
 from tframe.utils.file_tools import io_utils
 from tframe.utils.string_tools import get_time_string
+from tframe.utils.tracer import StepTracer
 
 from tframe.core.decorators import with_graph
 
@@ -39,6 +40,8 @@ class Agent(object):
     # An agent saves model and writes summary
     self._saver = None
     self._summary_writer = None
+    # An agent traces steps specified in hub if necessary
+    self._tracer = StepTracer(self)
     # An agent holds a default note
     self._note = Note()
     context.note = self._note
@@ -67,6 +70,11 @@ class Agent(object):
     assert isinstance(self._summary_writer, tf.summary.FileWriter)
     return self._summary_writer
 
+  @property
+  def tracer(self):
+    assert isinstance(self._tracer, StepTracer)
+    return self._tracer
+
   # endregion : Accessors
 
   # region : Paths
@@ -85,6 +93,10 @@ class Agent(object):
     return check_path(self.root_path, hub.log_folder_name,
                       self._model.mark, create_path=hub.summary)
   @property
+  def trace_dir(self):
+    return check_path(self.root_path, hub.log_folder_name, self._model.mark,
+                      hub.trace_folder_name, create_path=True)
+  @property
   def ckpt_dir(self):
     if hub.specified_ckpt_path is not None: return hub.specified_ckpt_path
     return check_path(self.root_path, hub.ckpt_folder_name,
@@ -180,7 +192,13 @@ class Agent(object):
       var_list=self._model.variable_to_save, max_to_keep=2)
 
   @with_graph
-  def launch_model(self, overwrite=False):
+  def launch_model(self, overwrite=False, tune_batches=None):
+    """Launch session on self.graph.
+
+    :param overwrite: whether to clear existing paths if hub.overwrite is True
+    :param tune_batches: an iterable of data batches used for tuning thread
+                         pools when hub.auto_tune_threads is True
+    """
     if hub.suppress_logging: console.suppress_logging()
     # Before launch session, do some cleaning work
     if overwrite and hub.overwrite:
@@ -205,6 +223,7 @@ class Agent(object):
     if not hub.allow_growth:
       value = hub.gpu_memory_fraction
       config.gpu_options.per_process_gpu_memory_fraction = value
+    self._set_thread_options(config, tune_batches)
     self._session = tf.Session(graph=self._graph, config=config)
     console.show_status('Session launched')
     # Prepare some tools
@@ -272,8 +291,95 @@ class Agent(object):
   def save_plot(self, fig, filename):
     imtool.save_plt(fig, '{}/{}'.format(self.snapshot_dir, filename))
 
+  @staticmethod
+  def get_available_cores():
+    """Number of cores in the CPU affinity mask of this process, divided
+       among hub.sibling_trials trials running on the same host"""
+    if hasattr(os, 'sched_getaffinity'): cores = len(os.sched_getaffinity(0))
+    else: cores = os.cpu_count() or 1
+    return max(1, cores // max(1, hub.sibling_trials))
+
   # endregion : Public Methods
 
+  # region : Thread Configuration
+
+  def _set_thread_options(self, config, tune_batches=None):
+    intra, inter = hub.intra_op_threads, hub.inter_op_threads
+    cores = self.get_available_cores()
+    if hub.auto_tune_threads and tune_batches is not None:
+      intra, inter = self._tune_threads(config, tune_batches)
+    elif hub.sibling_trials > 1 or hub.auto_tune_threads:
+      # TF thread pools are sized by total core count by default, which
+      #   oversubscribes the cores shared by sibling trials
+      if intra == 0: intra = cores
+      if inter == 0: inter = min(2, cores)
+
+    config.intra_op_parallelism_threads = intra
+    config.inter_op_parallelism_threads = inter
+    if intra or inter: console.show_status(
+      'Thread pools set to intra-op = {}, inter-op = {}'.format(intra, inter))
+
+  def _get_thread_candidates(self):
+    cores = self.get_available_cores()
+    candidates = [(cores, 1), (cores, 2), (max(1, cores // 2), 2),
+                  (max(1, cores // 4), 4)]
+    if hub.intra_op_threads or hub.inter_op_threads:
+      candidates.insert(0, (hub.intra_op_threads, hub.inter_op_threads))
+    # Remove duplicates while keeping order
+    return [c for i, c in enumerate(candidates) if c not in candidates[:i]]
+
+  def _tune_threads(self, config, tune_batches, warm_up=2):
+    """Run warm-up update steps in a temporary session for each candidate
+       (intra, inter) setting and return the fastest one. Variables in the
+       temporary sessions are initialized independently thus model states
+       will not be affected. Since TF inter-op pool is process-global and
+       sized by the first session otherwise, each session (including the
+       final one) owns its thread pools once tuning is on. Summary and
+       tracer are turned off during tuning since summary writer has not been
+       created yet."""
+    import itertools
+    steps = hub.tune_threads_steps
+    batches = list(itertools.islice(tune_batches, warm_up + steps))
+    if not batches: return hub.intra_op_threads, hub.inter_op_threads
+    while len(batches) < warm_up + steps: batches += batches
+
+    console.show_status('Tuning thread pools ...')
+    results = []
+    summary, trace_steps, trace_val_cycle = (
+      hub.summary, hub.trace_steps, hub.trace_val_cycle)
+    hub.summary, hub.trace_steps, hub.trace_val_cycle = False, None, 0
+    config.use_per_session_threads = True
+    init_op = tf.global_variables_initializer()
+    try:
+      for intra, inter in self._get_thread_candidates():
+        config.intra_op_parallelism_threads = intra
+        config.inter_op_parallelism_threads = inter
+        self._session = tf.Session(graph=self._graph, config=config)
+        try:
+          self._session.run(init_op)
+          for batch in batches[:warm_up]: self._model.update_model(batch)
+          tic = time.time()
+          for batch in batches[warm_up:warm_up + steps]:
+            self._model.update_model(batch)
+          elapsed = (time.time() - tic) / steps
+        finally:
+          self._session.close()
+          self._session = None
+        results.append((elapsed, intra, inter))
+        console.supplement(
+          'intra-op = {}, inter-op = {}: {:.2f}ms/step'.format(
+            intra, inter, elapsed * 1000))
+    finally:
+      hub.summary, hub.trace_steps, hub.trace_val_cycle = (
+        summary, trace_steps, trace_val_cycle)
+
+    _, intra, inter = min(results)
+    self.take_notes('Thread pools tuned: intra-op = {}, inter-op = {}'.format(
+      intra, inter))
+    return intra, inter
+
+  # endregion : Thread Configuration
+
   # region : Public Methods for Note
 
   # region : For TensorViewer
@@ -283,7 +389,8 @@ class Agent(object):
     if hub.epoch_as_step and context.trainer.total_rounds is not None:
       step = int(context.trainer.total_rounds * 1000)
     else: step = self._model.counter
-    self._note.take_down_scalars_and_tensors(step, scalars, tensors)
+    self._note.take_down_scalars_and_tensors(
+      step, scalars, tensors, tensor_policy=hub.note_tensor_policy)
 
   # endregion : For TensorViewer
 
@@ -312,6 +419,7 @@ class Agent(object):
     note = self._note.tensor_free if hub.gather_only_scalars else self._note
     summary.append(note)
     io_utils.save(summary, file_path)
+    self._append_to_summary_index(file_path, summary)
     # with open(file_path, 'wb') as f:
     #   pickle.dump(summary, f, pickle.HIGHEST_PROTOCOL)
 
@@ -319,6 +427,29 @@ class Agent(object):
     console.show_status('Note added to summaries ({} => {}) at `{}`'.format(
       len(summary) - 1, len(summary), file_path))
 
+  @staticmethod
+  def _append_to_summary_index(file_path, summary):
+    """Append notes not yet indexed to the records file and their configs
+       and criteria to the index file read by summary viewer. Both files are
+       rebuilt if the index is stale, e.g., after the summary has been
+       edited."""
+    from tframe.utils.summary_viewer.note_table import NoteTable
+    from tframe.utils.summary_viewer.note_table import get_index_path
+    from tframe.utils.summary_viewer.note_table import get_records_path
+
+    index_path = get_index_path(file_path)
+    records_path = get_records_path(file_path)
+    num_indexed = 0
+    if os.path.exists(index_path):
+      with open(index_path, 'r') as f: num_indexed = sum(1 for _ in f)
+    if num_indexed > len(summary):
+      os.remove(index_path)
+      if os.path.exists(records_path): os.remove(records_path)
+      num_indexed = 0
+    notes = summary[num_indexed:]
+    offsets = NoteTable.append_records(records_path, notes)
+    NoteTable.write_index(index_path, notes, offsets)
+
   # endregion : For SummaryViewer
 
   def take_notes(self, content, date_time=True, prompt=None):
@@ -47,6 +47,16 @@ class Context(Nomear):
     # pruner will be initiated in the early stage of model building
     self.pruner = None
 
+    # Active only when Recurrent hoists input projections out of tf.scan
+    self.hoist = None
+
+    # Whether batch norm layers should update moving averages while linking,
+    #   set to False when linking replica towers (see Model._define_towers)
+    self.update_bn_moving_averages = True
+
+    # tf.data pipeline will be initiated in Input._link if hub.use_tf_data
+    self.data_pipeline = None
+
     # Sparse tensor list
     self.weights_list = []
     self.sparse_weights_list = []
@@ -49,8 +49,9 @@ class Group(object):
       if slot.activated and not slot.sleep: fetches.append(slot)
 
     with self._model.graph.as_default():
-      results = self._model.session.run(
-        [slot.op for slot in fetches], feed_dict=feed_dict)
+      results = self._model.agent.tracer.run(
+        self._model.session, [slot.op for slot in fetches],
+        feed_dict=feed_dict, name=self.name)
 
     # Check results
     tensor_dict = collections.OrderedDict()
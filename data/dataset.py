@@ -244,9 +244,14 @@ class DataSet(TFRData, Nomear):
     if training: self._set_dynamic_round_len(round_len)
     return round_len
 
-  def gen_batches(self, batch_size, shuffle=False, is_training=False):
-    """Yield batches of data with the specific size"""
-    round_len = self.get_round_length(batch_size, training=is_training)
+  def gen_batches(self, batch_size, shuffle=False, is_training=False,
+                  round_len=None):
+    """Yield batches of data with the specific size. If round_len is given,
+       e.g., by trainer which has set dynamic round length itself, dynamic
+       round length will not be touched by this generator"""
+    set_round_len = round_len is None
+    if set_round_len:
+      round_len = self.get_round_length(batch_size, training=is_training)
     if batch_size == -1: batch_size = self.size
 
     # Generate batches
@@ -264,7 +269,7 @@ class DataSet(TFRData, Nomear):
       yield data_batch
 
     # Clear dynamic_round_len if necessary
-    if is_training: self._clear_dynamic_round_len()
+    if is_training and set_round_len: self._clear_dynamic_round_len()
 
   def gen_rnn_batches(self, batch_size=1, num_steps=-1, shuffle=False,
                       is_training=False, act_lens=None):
@@ -0,0 +1,192 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import numpy as np
+
+from tframe import tf
+from tframe import hub
+from tframe import checker
+
+from tframe.data.dataset import DataSet
+from tframe.data.bigdata import BigData
+from tframe.data.sequences.seq_set import SequenceSet
+
+
+class DataPipeline(object):
+  """DataPipeline wraps a reinitializable tf.data iterator. Its outputs
+     (features, targets) are used as default values of the input and targets
+     placeholders of a model (see Input._link and Predictor._plug_target_in)
+     so that training steps can be run without feeding data. Validation and
+     evaluation still feed numpy arrays into these placeholders, which
+     overrides the iterator outputs.
+
+     tf.data.Dataset instances can be created from
+     (1) a DataSet in memory, arrays will be fed at initialization so that
+         they will not be embedded into graph as constants. Batches are
+         repeated endlessly thus the consumer decides the round length;
+     (2) a SequenceSet, sequences will be padded to equal-length in each
+         batch;
+     (3) a BigData, shards will be loaded in parallel via interleave;
+     (4) any DataSet with batch_preprocessor, batches will be generated by
+         data_set.gen_batches in a background thread.
+  """
+
+  def __init__(self, feature_shape, feature_dtype, target_dtype=None):
+    if target_dtype is None: target_dtype = hub.dtype
+    self.feature_dtype = tf.as_dtype(feature_dtype)
+    self.target_dtype = tf.as_dtype(target_dtype)
+    self.feature_shape = tf.TensorShape(feature_shape)
+
+    with tf.name_scope('DataPipeline'):
+      self._iterator = tf.data.Iterator.from_structure(
+        (self.feature_dtype, self.target_dtype),
+        (self.feature_shape, tf.TensorShape(None)))
+      self.features, self.targets = self._iterator.get_next()
+
+    # Initializers are cached, keys are (id(data_set), batch_size, shuffle)
+    self._initializers = {}
+
+  # region : Public Methods
+
+  def initialize(self, session, data_set, batch_size, shuffle=False):
+    """Make iterator ready to generate batches of data_set for one round.
+       tf.errors.OutOfRangeError will be raised when a finite source is
+       exhausted."""
+    key = (id(data_set), batch_size, shuffle)
+    if key not in self._initializers:
+      with session.graph.as_default():
+        dataset, feed_dict = self.to_tf_dataset(data_set, batch_size, shuffle)
+        self._initializers[key] = (
+          self._iterator.make_initializer(dataset), feed_dict)
+    init_op, feed_dict = self._initializers[key]
+    session.run(init_op, feed_dict=feed_dict)
+
+  def to_tf_dataset(self, data_set, batch_size, shuffle=False):
+    """Convert data_set to a batched and prefetched tf.data.Dataset.
+
+    :return: (dataset, feed_dict) where feed_dict should be fed when the
+             corresponding iterator initializer is run
+    """
+    checker.check_positive_integer(batch_size)
+    feed_dict = {}
+    if isinstance(data_set, BigData):
+      dataset = self._from_big_data(data_set, batch_size, shuffle)
+    elif not isinstance(data_set, DataSet):
+      raise TypeError('!! Can not convert {} to tf.data.Dataset'.format(
+        type(data_set)))
+    elif data_set.batch_preprocessor is not None:
+      dataset = self._from_batch_generator(data_set, batch_size, shuffle)
+    elif isinstance(data_set, SequenceSet):
+      dataset = self._from_sequence_set(data_set, batch_size, shuffle)
+    else:
+      dataset, feed_dict = self._from_memory(data_set, batch_size, shuffle)
+
+    # Prefetch so that input preparation overlaps with training steps
+    buffer_size = hub.tf_data_prefetch
+    if buffer_size != 0:
+      if buffer_size < 0: buffer_size = tf.data.experimental.AUTOTUNE
+      dataset = dataset.prefetch(buffer_size)
+    return dataset, feed_dict
+
+  # endregion : Public Methods
+
+  # region : Private Methods
+
+  @property
+  def _num_parallel_calls(self):
+    n = hub.tf_data_parallel_calls
+    return tf.data.experimental.AUTOTUNE if n < 0 else max(n, 1)
+
+  def _get_shuffle_buffer_size(self, size):
+    buffer_size = hub.tf_data_shuffle_buffer
+    if buffer_size <= 0: return size
+    return min(buffer_size, size)
+
+  def _map(self, dataset):
+    """Apply hub.tf_data_map_func to each batch if provided"""
+    map_func = hub.tf_data_map_func
+    if map_func is None: return dataset
+    assert callable(map_func)
+    return dataset.map(map_func, num_parallel_calls=self._num_parallel_calls)
+
+  def _from_memory(self, data_set, batch_size, shuffle):
+    assert isinstance(data_set, DataSet)
+    features, targets = data_set.features, data_set.targets
+    if targets is None: raise ValueError(
+      '!! Targets must be provided for training with tf.data')
+
+    x = tf.placeholder(self.feature_dtype, features.shape, 'features_source')
+    y = tf.placeholder(self.target_dtype, targets.shape, 'targets_source')
+    dataset = tf.data.Dataset.from_tensor_slices((x, y))
+    if shuffle: dataset = dataset.shuffle(
+      self._get_shuffle_buffer_size(data_set.size),
+      reshuffle_each_iteration=True)
+    # Repeat so that rounds longer than an epoch (hub.updates_per_round) can
+    #   be generated. Trainer stops after round length updates
+    dataset = self._map(dataset.batch(batch_size)).repeat()
+    return dataset, {x: features, y: targets}
+
+  def _from_sequence_set(self, data_set, batch_size, shuffle):
+    assert isinstance(data_set, SequenceSet)
+    features, targets = data_set.features, data_set.targets
+    if targets is None: targets = data_set.summ_dict.get(DataSet.TARGETS)
+    if targets is None: raise ValueError(
+      '!! Targets must be provided for training with tf.data')
+
+    def gen():
+      indices = np.arange(data_set.size)
+      if shuffle: np.random.shuffle(indices)
+      for i in indices: yield features[i], targets[i]
+
+    target_shape = [None] * (len(np.shape(targets[0])))
+    dataset = tf.data.Dataset.from_generator(
+      gen, (self.feature_dtype, self.target_dtype),
+      (tf.TensorShape(self.feature_shape[1:]), tf.TensorShape(target_shape)))
+    dataset = dataset.padded_batch(
+      batch_size, (self.feature_shape[1:], target_shape))
+    return self._map(dataset)
+
+  def _from_batch_generator(self, data_set, batch_size, shuffle):
+    def gen():
+      # Dynamic round length should have been set by trainer, which owns it
+      round_len = (data_set.dynamic_round_len or
+                   data_set.get_round_length(batch_size))
+      for batch in data_set.gen_batches(
+          batch_size, shuffle=shuffle, is_training=True, round_len=round_len):
+        yield batch.features, batch.targets
+
+    dataset = tf.data.Dataset.from_generator(
+      gen, (self.feature_dtype, self.target_dtype),
+      (self.feature_shape, tf.TensorShape(None)))
+    return self._map(dataset)
+
+  def _from_big_data(self, data_set, batch_size, shuffle):
+    assert isinstance(data_set, BigData)
+    file_paths = [os.path.join(data_set.data_dir, f)
+                  for f in data_set.files.keys()]
+
+    def gen(file_path):
+      if isinstance(file_path, bytes): file_path = file_path.decode()
+      shard = data_set._load_data_set(file_path)
+      data_set._check_data_set(shard)
+      for batch in shard.gen_batches(
+          batch_size, shuffle=shuffle, is_training=True):
+        yield batch.features, batch.targets
+
+    def load_shard(file_path):
+      return tf.data.Dataset.from_generator(
+        gen, (self.feature_dtype, self.target_dtype),
+        (self.feature_shape, tf.TensorShape(None)), args=(file_path,))
+
+    dataset = tf.data.Dataset.from_tensor_slices(file_paths)
+    if shuffle: dataset = dataset.shuffle(len(file_paths))
+    cycle_length = hub.tf_data_parallel_calls
+    if cycle_length <= 0: cycle_length = min(len(file_paths), 4)
+    dataset = dataset.interleave(
+      load_shard, cycle_length=cycle_length,
+      num_parallel_calls=self._num_parallel_calls)
+    return self._map(dataset)
+
+  # endregion : Private Methods
@@ -50,6 +50,19 @@ class ReberGrammar(object):
   # Generate observation table
   OB_TABLE = np.eye(len(Symbol), dtype=np.float32)
 
+  # Tables used by vectorized generator
+  # .. NEXT_SYMBOL[stat, choice], NEXT_STAT[stat, choice]. -1 means end
+  NEXT_SYMBOL = np.full((len(TRANSFER), 2), Symbol.E.value, np.int32)
+  NEXT_STAT = np.full((len(TRANSFER), 2), -1, np.int32)
+  for i, choices in enumerate(TRANSFER[:-1]):
+    NEXT_SYMBOL[i] = (choices[0][0].value, choices[1][0].value)
+    NEXT_STAT[i] = (choices[0][1], choices[1][1])
+  # .. ROW_TABLE[:7] is TRANSFER_MATRIX, ROW_TABLE[7]/[8] are transfer
+  #    probabilities of embedded token T/P
+  ROW_TABLE = np.concatenate(
+    [TRANSFER_MATRIX, OB_TABLE[[Symbol.T.value, Symbol.P.value]]])
+  SYMBOLS = tuple(Symbol)
+
   def __init__(self, embedded=False, multiple=1, specification=None):
     assert specification in (None, 'T', 'P')
     self._symbol_list = [Symbol.B]
@@ -158,22 +171,32 @@ class ReberGrammar(object):
 
   @classmethod
   def make_strings(cls, num, unique=True, exclusive=None, embedded=False,
-                   multiple=1, verbose=False, interleave=True):
+                   multiple=1, verbose=False, interleave=True,
+                   vectorized=True):
     # Check input
     if exclusive is None: exclusive = []
     elif not isinstance(exclusive, list):
       raise TypeError('!! exclusive must be a list of Reber strings')
-    # Make strings
+    # Make strings using vectorized generator
+    if vectorized:
+      arrays = cls.make_arrays(
+        num, unique, exclusive, embedded, multiple, interleave)
+      return cls.arrays_to_strings(*arrays, embedded, multiple)
+    # Make strings one by one
     reber_list = []
+    # Hash sets of strings
+    reber_keys, exclusive = set(), set([str(r) for r in exclusive])
     long_token = None
     for i in range(num):
       if interleave: long_token = 'T' if long_token in ('P', None) else 'P'
       while True:
         string = ReberGrammar(
           embedded, multiple=multiple, specification=long_token)
-        if unique and string in reber_list: continue
-        if string in exclusive: continue
+        key = str(string)
+        if unique and key in reber_keys: continue
+        if key in exclusive: continue
         reber_list.append(string)
+        reber_keys.add(key)
         break
       if verbose:
         console.clear_line()
@@ -182,6 +205,80 @@ class ReberGrammar(object):
     # Return a list of Reber string
     return reber_list
 
+  @classmethod
+  def make_arrays(cls, num, unique=True, exclusive=None, embedded=False,
+                  multiple=1, interleave=True):
+    """Vectorized version of make_strings. Transitions of many strings are
+       sampled at once from transfer tables and strings are de-duplicated
+       with a hash set of encoded strings.
+
+    :param exclusive: a list of ReberGrammar or symbol value arrays
+    :return: (symbols, rows, lengths), in which symbols[i, :lengths[i]] are
+             symbol values of the i-th string and rows[i, :lengths[i] - 1]
+             are indices of ROW_TABLE, i.e., transfer probabilities
+    """
+    checker.check_positive_integer(num)
+    # Encoded strings to be excluded
+    seen = set([np.asarray(getattr(r, 'value', r), np.int8).tobytes()
+                for r in (exclusive or [])])
+
+    def sample(n, second):
+      """Sample n strings with second token `second` (None for random)"""
+      batches, total = [], 0
+      while total < n:
+        size = max(2 * (n - total), 16)
+        symbols, rows, lengths = cls._sample_arrays(size, multiple)
+        if embedded:
+          if second is None: sec = np.random.choice(
+            [Symbol.T.value, Symbol.P.value], size=size).astype(np.int32)
+          else: sec = np.full(size, second.value, np.int32)
+          symbols, rows, lengths = cls._embed_arrays(
+            symbols, rows, lengths, sec)
+        # Pick out strings not seen before
+        keep = []
+        for i, l in enumerate(lengths):
+          key = symbols[i, :l].astype(np.int8).tobytes()
+          if key in seen: continue
+          if unique: seen.add(key)
+          keep.append(i)
+          if total + len(keep) == n: break
+        batches.append((symbols[keep], rows[keep], lengths[keep]))
+        total += len(keep)
+      return cls._concat_arrays(batches)
+
+    if embedded and interleave:
+      # Even strings use T as embedded token while odd strings use P
+      t_arrays = sample((num + 1) // 2, Symbol.T)
+      if num == 1: return t_arrays
+      p_arrays = sample(num // 2, Symbol.P)
+      symbols, rows, lengths = cls._concat_arrays([t_arrays, p_arrays])
+      order = np.empty(num, np.int64)
+      order[0::2] = np.arange((num + 1) // 2)
+      order[1::2] = np.arange((num + 1) // 2, num)
+      return symbols[order], rows[order], lengths[order]
+    return sample(num, None)
+
+  @classmethod
+  def arrays_to_tensors(cls, symbols, rows, lengths):
+    """Convert arrays generated by make_arrays to padded tensors.
+
+    :return: (features, transfer_prob, observed_prob), all of shape
+             [num, max_length - 1, len(Symbol)]. Padded steps are all zeros
+    """
+    x_ids, y_ids = symbols[:, :-1], symbols[:, 1:]
+    mask = (y_ids >= 0)[..., None]
+    features = cls.OB_TABLE[np.maximum(x_ids, 0)] * mask
+    observed_prob = cls.OB_TABLE[np.maximum(y_ids, 0)] * mask
+    transfer_prob = cls.ROW_TABLE[np.maximum(rows, 0)] * mask
+    return features, transfer_prob, observed_prob
+
+  @classmethod
+  def arrays_to_strings(cls, symbols, rows, lengths, embedded=False,
+                        multiple=1):
+    """Wrap arrays generated by make_arrays into ReberGrammar objects"""
+    return [cls._from_arrays(s[:l], r[:l-1], embedded, multiple)
+            for s, r, l in zip(symbols, rows, lengths)]
+
   def check_grammar_amu18(self, probs):
     """Return lists of match situations for both RC and ERC criteria
        ref: AMU, 2018"""
@@ -233,6 +330,80 @@ class ReberGrammar(object):
   def _transfer(cls, stat):
     return random.choice(cls.TRANSFER[stat])
 
+  @classmethod
+  def _sample_arrays(cls, num, multiple):
+    """Sample num (non-embedded) strings in lockstep"""
+    B, restart_row = Symbol.B.value, len(cls.TRANSFER)
+    stat = np.zeros(num, np.int32)
+    count = np.zeros(num, np.int32)
+    active = np.ones(num, bool)
+    # Strings to emit B after E when multiple > 1
+    restart = np.zeros(num, bool)
+    symbol_cols, row_cols = [np.full(num, B, np.int32)], []
+    while active.any():
+      choice = np.random.randint(0, 2, size=num)
+      symbol = cls.NEXT_SYMBOL[stat, choice]
+      row = stat.copy()
+      next_stat = cls.NEXT_STAT[stat, choice]
+      symbol[restart], row[restart], next_stat[restart] = B, restart_row, 0
+      symbol[~active], row[~active] = -1, -1
+      symbol_cols.append(symbol)
+      row_cols.append(row)
+
+      ended = active & (next_stat < 0)
+      count[ended] += 1
+      restart = ended & (count < multiple)
+      active &= ~(ended & ~restart)
+      stat = np.maximum(next_stat, 0)
+
+    symbols = np.stack(symbol_cols, axis=1)
+    return symbols, np.stack(row_cols, axis=1), np.sum(symbols >= 0, axis=1)
+
+  @classmethod
+  def _embed_arrays(cls, symbols, rows, lengths, second):
+    """Wrap strings as B + second + string + second + E"""
+    n, L = symbols.shape
+    index = np.arange(n)
+    new_symbols = np.full((n, L + 4), -1, np.int32)
+    new_symbols[:, 0], new_symbols[:, 1] = Symbol.B.value, second
+    new_symbols[:, 2:L+2] = symbols
+    new_symbols[index, lengths + 2] = second
+    new_symbols[index, lengths + 3] = Symbol.E.value
+
+    new_rows = np.full((n, L + 3), -1, np.int32)
+    new_rows[:, 0], new_rows[:, 1] = 0, len(cls.TRANSFER)
+    new_rows[:, 2:L+1] = rows
+    new_rows[index, lengths + 1] = np.where(
+      second == Symbol.T.value, len(cls.TRANSFER) + 1, len(cls.TRANSFER) + 2)
+    new_rows[index, lengths + 2] = len(cls.TRANSFER) - 1
+    return new_symbols, new_rows, lengths + 4
+
+  @staticmethod
+  def _concat_arrays(arrays_list):
+    L = max([a[0].shape[1] for a in arrays_list])
+    pad = lambda a, l: np.pad(
+      a, ((0, 0), (0, l - a.shape[1])), constant_values=-1)
+    return (np.concatenate([pad(a[0], L) for a in arrays_list]),
+            np.concatenate([pad(a[1], L - 1) for a in arrays_list]),
+            np.concatenate([a[2] for a in arrays_list]))
+
+  @classmethod
+  def _from_arrays(cls, symbols, rows, embedded, multiple):
+    """Create a ReberGrammar from arrays without sampling"""
+    reber = cls.__new__(cls)
+    reber._symbol_list = [cls.SYMBOLS[v] for v in symbols]
+    reber._multiple = multiple
+    reber.transfer_prob = cls.ROW_TABLE[rows]
+    reber.observed_prob = cls.OB_TABLE[symbols[1:]]
+    # Split inner string into sub-strings
+    inner = reber._symbol_list[2:-2] if embedded else reber._symbol_list
+    reber._sub_rebers = [[]]
+    for symbol in inner:
+      if symbol is Symbol.B and reber._sub_rebers[-1]:
+        reber._sub_rebers.append([])
+      reber._sub_rebers[-1].append(symbol)
+    return reber
+
   # endregion : Private Methods
 
 
@@ -270,27 +441,30 @@ class ERG(DataAgent):
     console.show_status('Making data ...')
 
     if rule == 'pau19':
-      erg_list = ReberGrammar.make_strings(
-        train_size + test_size, True, embedded=True, multiple=multiple,
-        verbose=True)
+      erg_arrays = ReberGrammar.make_arrays(
+        train_size + test_size, True, embedded=True, multiple=multiple)
     elif rule == 'lstm97':
-      train_list = ReberGrammar.make_strings(
-        train_size, False, embedded=True, verbose=True, multiple=multiple)
-      test_list = ReberGrammar.make_strings(
-        test_size, False, embedded=True, exclusive=train_list, verbose=True,
+      train_arrays = ReberGrammar.make_arrays(
+        train_size, False, embedded=True, multiple=multiple)
+      exclusive = [s[:l] for s, l in zip(train_arrays[0], train_arrays[2])]
+      test_arrays = ReberGrammar.make_arrays(
+        test_size, False, embedded=True, exclusive=exclusive,
         multiple=multiple)
-      erg_list = train_list + test_list
+      erg_arrays = ReberGrammar._concat_arrays([train_arrays, test_arrays])
     else:
-      erg_list = ReberGrammar.make_strings(
-        train_size + test_size, unique_, embedded=True, verbose=True,
-        multiple=multiple)
+      erg_arrays = ReberGrammar.make_arrays(
+        train_size + test_size, unique_, embedded=True, multiple=multiple)
 
     # Wrap erg into a DataSet
-    features = [erg.one_hot for erg in erg_list]
-    val_targets = [erg.local_binary if local_binary else erg.transfer_prob
-                   for erg in erg_list]
-    targets = ([erg.observed_prob for erg in erg_list]
-               if not cheat else val_targets)
+    features, transfer_prob, observed_prob = ReberGrammar.arrays_to_tensors(
+      *erg_arrays)
+    if local_binary: transfer_prob = (transfer_prob > 0).astype(np.float32)
+    lengths = erg_arrays[2] - 1
+    unpad = lambda tensor: [t[:l] for t, l in zip(tensor, lengths)]
+    features, val_targets = unpad(features), unpad(transfer_prob)
+    targets = unpad(observed_prob) if not cheat else val_targets
+    erg_list = ReberGrammar.arrays_to_strings(
+      *erg_arrays, embedded=True, multiple=multiple)
     # targets = [erg.transfer_prob for erg in erg_list]
     data_set = SequenceSet(
       features, targets, data_dict={'val_targets': val_targets},
@@ -2,7 +2,13 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import hashlib
+import json
+import multiprocessing
 import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
 from tframe import tf
 
 import numpy as np
@@ -21,6 +27,7 @@ from tframe import checker
 from tframe import Classifier
 from tframe.layers.layer import Layer, single_input
 from tframe.trainers.trainer import Trainer
+from tframe.core.agent import Agent
 from tframe import hub as th
 
 
@@ -56,6 +63,11 @@ class FI2010(DataAgent):
       [39512, 38397, 28535, 37023, 34785, 39152, 37346, 55478, 52172, 31937]}
   STOCK_IDs = ['KESBV', 'OUT1V', 'SAMPO', 'RTRKS', 'WRT1V']
   LEN_PER_DAY_PER_STOCK = 'LEN_PER_DAY_PER_STOCK'
+  CACHE_DIR = 'fi2010_cache'
+  CACHE_META = 'meta.json'
+  # Fewer raw files than this are parsed in this process, since spawning
+  # .. workers costs more than parsing them
+  MIN_FILES_TO_SPAWN = 4
 
   @classmethod
   def load(cls, data_dir, auction=False, norm_type='zscore', setup=2,
@@ -64,6 +76,16 @@ class FI2010(DataAgent):
                              'force_norm' in th.developer_code])
     # Sanity check
     assert setup in [1, 2]
+    # Load preprocessed data sets from cache if raw files are not changed
+    stage = cls._get_stage_name(
+      auction, norm_type, setup, horizon, should_apply_norm)
+    cache_dir = cls._get_cache_dir(data_dir, auction, stage)
+    validate = all([kwargs.get('validate_setup2'), setup == 2,
+                    norm_type == 'zscore'])
+    if os.path.exists(os.path.join(cache_dir, cls.CACHE_META)):
+      train_set, test_set = cls._load_cache(cache_dir)
+      if validate: cls._validate_setup2(data_dir, auction, train_set)
+      return train_set, test_set
     # Load raw LOB data
     lob_set = cls.load_raw_LOBs(data_dir, auction=auction)
     lob_set = cls._init_features_and_targets(lob_set, horizon)
@@ -72,8 +94,11 @@ class FI2010(DataAgent):
     if should_apply_norm:
       train_set, test_set = cls._apply_normalization(
         train_set, test_set, norm_type)
-    if kwargs.get('validate_setup2') and setup == 2 and norm_type == 'zscore':
-      cls._validate_setup2(data_dir, auction, train_set)
+    if validate: cls._validate_setup2(data_dir, auction, train_set)
+    # Save cache. Key is calculated again since .tfds files may be created
+    # .. during loading
+    cls._save_cache(
+      cls._get_cache_dir(data_dir, auction, stage), train_set, test_set)
     return  train_set, test_set
 
   @classmethod
@@ -368,33 +393,27 @@ class FI2010(DataAgent):
       assert len(file_slices) == 2
       train_slice, test_slice = file_slices
     data_paths = train_paths[train_slice] + test_paths[test_slice]
-    for i, path in enumerate(data_paths):
-      # Create day slot for features and targets
-      features.append([])
-      for h in horizons: targets[h].append([])
-      console.show_status('Reading data from `{}` ...'.format(
-        os.path.basename(path)))
-      with open(path, 'r') as f: lines = f.readlines()
-      # Sanity check
-      assert len(lines) == dim + len(horizons)
-      # Parse data
-      data = [[s for s in line.split(' ') if s] for line in lines]
-      total = len(data[0])
-      assert [len(d) == total for d in data]
-      bar = ProgressBar(total)
-      # Put data appropriately
-      for j, str_list in enumerate(zip(*data)):
-        col = np.array(str_list, dtype=np.float)
-        features[-1].append(col[:dim])
-        for k, h in enumerate(horizons): targets[h][-1].append(col[dim + k])
-        # Refresh progress bar
-        bar.show(j + 1)
-      # Stack list
-      features[-1] = np.stack(features[-1], axis=0)
+    # Parse files in parallel. Workers are spawned rather than forked since
+    # .. forking after TensorFlow has been imported may deadlock. Since each
+    # .. spawned worker imports tframe (and TensorFlow), a few files are
+    # .. parsed serially
+    console.show_status('Reading data from {} files ...'.format(
+      len(data_paths)))
+    num_rows = [dim + len(horizons)] * len(data_paths)
+    workers = min(len(data_paths), Agent.get_available_cores())
+    if workers < 2 or len(data_paths) < cls.MIN_FILES_TO_SPAWN:
+      results = list(map(_parse_data_file, data_paths, num_rows))
+    else:
+      with ProcessPoolExecutor(
+          max_workers=workers,
+          mp_context=multiprocessing.get_context('spawn')) as executor:
+        results = list(executor.map(_parse_data_file, data_paths, num_rows))
+    for path, data in zip(data_paths, results):
+      features.append(data[:, :dim])
       for k, h in enumerate(horizons):
-        targets[h][-1] = np.array(
-          np.stack(targets[h][-1], axis=0), dtype=np.int64) - 1
-      console.show_status('Successfully read {} event blocks'.format(total))
+        targets[h].append(np.array(data[:, dim + k], dtype=np.int64) - 1)
+      console.show_status('Successfully read {} event blocks from `{}`'.format(
+        len(data), os.path.basename(path)))
     # Sanity check and return
     total = sum([len(x) for x in features])
     console.show_status('Totally {} event blocks read.'.format(total))
@@ -493,6 +512,70 @@ class FI2010(DataAgent):
     # for i in range(10): lob_list[i] = new_lob_list[i] TODO
     assert False
 
+  @classmethod
+  def _get_stage_name(cls, auction, norm_type, setup, horizon, norm_applied):
+    """Options affecting preprocessed features and targets"""
+    return '{}Auction-{}{}-Setup{}-H{}-L{}{}{}'.format(
+      '' if auction else 'No', norm_type, '' if norm_applied else '(raw)',
+      setup, horizon, th.max_level, '-vol' if th.volume_only else '',
+      '-log' if 'use_log' in th.developer_code else '')
+
+  @classmethod
+  def _get_cache_dir(cls, data_dir, auction, stage):
+    """Cache directory name contains a hash of sizes and modification times of
+       raw files, thus caches are invalidated when raw files change"""
+    file_list = [os.path.join(data_dir, fn) for fn in (
+      os.listdir(data_dir) if os.path.exists(data_dir) else [])
+                 if fn.startswith('FI-2010-') and fn.endswith('.tfds')]
+    raw_dir = os.path.join(data_dir, 'BenchmarkDatasets',
+                           'Auction' if auction else 'NoAuction')
+    for root, _, file_names in os.walk(raw_dir):
+      file_list += [os.path.join(root, fn) for fn in file_names]
+    md5 = hashlib.md5()
+    for path in sorted(file_list):
+      stat = os.stat(path)
+      md5.update('{}:{}:{};'.format(
+        os.path.relpath(path, data_dir), stat.st_size,
+        stat.st_mtime_ns).encode())
+    return os.path.join(
+      data_dir, cls.CACHE_DIR, '{}-{}'.format(stage, md5.hexdigest()[:12]))
+
+  @classmethod
+  def _save_cache(cls, cache_dir, *data_sets):
+    """Save each data set as memory-mappable features and targets arrays with
+       its boundary index"""
+    if not os.path.exists(cache_dir): os.makedirs(cache_dir)
+    meta = []
+    for i, data_set in enumerate(data_sets):
+      assert isinstance(data_set, SequenceSet)
+      for key, seqs in (('x', data_set.features), ('y', data_set.targets)):
+        np.save(os.path.join(cache_dir, '{}_{}.npy'.format(i, key)),
+                np.concatenate(seqs))
+      meta.append({
+        'name': data_set.name, 'structure': data_set.structure,
+        cls.LEN_PER_DAY_PER_STOCK: [
+          [int(n) for n in s] for s in data_set[cls.LEN_PER_DAY_PER_STOCK]]})
+    # Meta file is written last and marks the cache as complete
+    with open(os.path.join(cache_dir, cls.CACHE_META), 'w') as f:
+      json.dump(meta, f)
+    console.show_status('Preprocessed data cached to `{}`'.format(cache_dir))
+
+  @classmethod
+  def _load_cache(cls, cache_dir):
+    with open(os.path.join(cache_dir, cls.CACHE_META), 'r') as f:
+      meta = json.load(f)
+    data_sets = []
+    for i, info in enumerate(meta):
+      boundaries = np.cumsum(info['structure'])[:-1]
+      x, y = [np.split(np.load(os.path.join(
+        cache_dir, '{}_{}.npy'.format(i, key)), mmap_mode='c'), boundaries)
+        for key in ('x', 'y')]
+      data_sets.append(SequenceSet(
+        x, y, name=info['name'], **{cls.LEN_PER_DAY_PER_STOCK: info[
+          cls.LEN_PER_DAY_PER_STOCK]}))
+    console.show_status('Preprocessed data loaded from `{}`'.format(cache_dir))
+    return tuple(data_sets)
+
   @classmethod
   def _get_data_path(cls, data_dir, auction, norm_type=None, setup=None):
     assert isinstance(auction, bool)
@@ -523,22 +606,12 @@ class FI2010(DataAgent):
     L = int(sum(data_set.structure) / batch_size)
     assert L < min(data_set.structure) and L == th.sub_seq_len
     rad = int(th.random_shift_pct * L)
-    # Distribute batch_size to stocks
-    # [23336, 44874, 38549, 54675, 93316]
-    num_sequences = wise_man.apportion(data_set.structure, batch_size)
-    # Generate feature list and target list
-    features, targets = [], []
-    for num, x, y in zip(num_sequences, data_set.features, data_set.targets):
-      # Find starts for each sequence to sample
-      starts = wise_man.spread(len(x), num, L, rad)
-      # Sanity check
-      assert len(starts) == num
-      # Put the sub-sequences into corresponding lists
-      for s in starts:
-        features.append(x[s:s+L])
-        targets.append(y[s:s+L])
-    # Stack features and targets
-    features, targets = np.stack(features), np.stack(targets)
+    # Get sampler of this data set, which is created only once
+    key = (batch_size, L, rad)
+    samplers = _SAMPLERS.setdefault(data_set, {})
+    if key not in samplers:
+      samplers[key] = _SubSequenceSampler(data_set, batch_size, L, rad)
+    features, targets = samplers[key].next_epoch()
     data_set = DataSet(features, targets, is_rnn_input=True)
     assert data_set.size == batch_size
     # Generate RNN batches using DataSet.gen_rnn_batches
@@ -554,7 +627,6 @@ class FI2010(DataAgent):
         '!! counter = {} while round_len = {}. (batch_size = {}, num_steps={})'
         ''.format(counter, round_len, batch_size, num_steps))
 
-
   # endregion : RNN batch generator for Sequence Set
 
   # region : Probe and evaluate
@@ -722,6 +794,79 @@ class FI2010(DataAgent):
   # endregion : Deprecated
 
 
+def _parse_data_file(path, num_rows):
+  """Parse a raw .txt file in which each column is an event block"""
+  with open(path, 'r') as f: data = np.array(f.read().split(), np.float64)
+  assert data.size % num_rows == 0
+  return np.transpose(np.reshape(data, [num_rows, -1]))
+
+
+# Samplers used by FI2010.rnn_batch_generator, {data_set: {key: sampler}}
+_SAMPLERS = weakref.WeakKeyDictionary()
+
+
+class _SubSequenceSampler(object):
+  """Vectorized version of sampling with wise_man.apportion and wise_man.spread.
+     Sequences are concatenated once into float32 arrays, and sections of
+     each batch row are planned once. Sub-sequences of each epoch are gathered
+     into one of two preallocated buffers, the next of which is filled in
+     background while the current one is being consumed."""
+
+  def __init__(self, data_set, batch_size, L, radius):
+    assert isinstance(data_set, SequenceSet)
+    self._x = np.concatenate(data_set.features).astype(np.float32, copy=False)
+    self._y = np.concatenate(data_set.targets)
+    self._radius = radius
+    self._steps = np.arange(L)
+
+    # Plan sections for each batch row as in wise_man.spread
+    lengths = data_set.structure
+    offsets = np.cumsum([0] + lengths[:-1])
+    plan = []
+    for length, offset, N in zip(
+        lengths, offsets, wise_man.apportion(lengths, batch_size)):
+      SL = int(length / N)
+      starts = np.arange(N) * SL
+      ends = np.append(starts[1:], length)
+      fit = ends - starts >= L
+      low = np.where(fit, starts, ends - L)
+      high = np.where(fit, ends - L + 1, starts + 1)
+      plan.append(np.stack([low, high, np.full(N, length - L),
+                            np.full(N, offset)], axis=1))
+    self._low, self._high, self._bound, self._offset = np.transpose(
+      np.concatenate(plan))
+
+    # Double buffers
+    self._buffers = [
+      (np.empty((batch_size, L) + self._x.shape[1:], self._x.dtype),
+       np.empty((batch_size, L) + self._y.shape[1:], self._y.dtype))
+      for _ in range(2)]
+    self._cursor = 0
+    self._thread = None
+    self._fill(0)
+
+  def next_epoch(self):
+    """Return features and targets of current epoch and fill buffers of the
+       next epoch in background"""
+    if self._thread is not None: self._thread.join()
+    current = self._buffers[self._cursor]
+    self._cursor = 1 - self._cursor
+    self._thread = threading.Thread(
+      target=self._fill, args=(self._cursor,), daemon=True)
+    self._thread.start()
+    return current
+
+  def _fill(self, cursor):
+    starts = np.random.randint(self._low, self._high)
+    starts = np.clip(starts, 0, self._bound)
+    if self._radius > 0: starts = np.clip(starts + np.random.randint(
+      -self._radius, self._radius, size=len(starts)), 0, self._bound)
+    indices = (starts + self._offset)[:, None] + self._steps
+    x, y = self._buffers[cursor]
+    np.take(self._x, indices, axis=0, out=x)
+    np.take(self._y, indices, axis=0, out=y)
+
+
 class Extract(Layer):
 
   full_name = 'extract'
@@ -0,0 +1,60 @@
+"""
+This script compares per-request Classifier.classify calls with a
+dynamic-batching BatchServer under concurrent load.
+
+SYNTAX: python bm_serving.py
+"""
+import mn_core as core
+import mn_du as du
+import t00_mlp
+from tframe import tf
+from tframe import console
+from tframe import DataSet
+from tframe.utils.serving import BatchServer, load_test
+
+
+NUM_CLIENTS = 16
+REQUESTS_PER_CLIENT = 200
+MAX_BATCH_SIZE = 64
+MAX_LATENCY_MS = 2.0
+
+
+def show(title, od):
+  console.show_info(title)
+  for k, v in od.items(): console.supplement('{}: {:.2f}'.format(k, v), 2)
+
+
+def main(_):
+  th = core.th
+  th.model = t00_mlp.model
+  th.spatial_activation = 'relu'
+  th.use_batchnorm = True
+  th.archi_string = '200-100'
+  th.mark = 'serving_bm'
+  th.save_model = False
+  th.gather_note = False
+  th.export_note = False
+
+  _, _, test_set = du.load_data(th.data_dir)
+  samples = test_set.features
+  model = th.model(th)
+  model.launch_model(overwrite=True)
+
+  # Baseline: one classify call per request, under the same concurrency
+  show('Per-request classify ({} clients)'.format(NUM_CLIENTS), load_test(
+    lambda x, _: model.classify(DataSet(features=x[None])),
+    samples, NUM_CLIENTS, REQUESTS_PER_CLIENT))
+
+  # Dynamic batching
+  with BatchServer(model, max_batch_size=MAX_BATCH_SIZE,
+                   max_latency_ms=MAX_LATENCY_MS) as server:
+    show('BatchServer ({} clients)'.format(NUM_CLIENTS), load_test(
+      server.predict, samples, NUM_CLIENTS, REQUESTS_PER_CLIENT))
+    show('BatchServer counters', server.stats)
+
+  model.shutdown()
+
+
+if __name__ == '__main__':
+  console.suppress_logging()
+  tf.app.run()
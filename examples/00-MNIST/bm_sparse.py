@@ -0,0 +1,24 @@
+"""
+This script benchmarks dense vs sparse execution of etched kernels on CPU.
+
+SYNTAX: python bm_sparse.py
+
+Kernel shapes correspond to a hidden hyper Dense layer of an MLP on MNIST
+and a hyper Conv2D layer of a small CNN. Latencies of masked dense kernels
+(used during training) are compared with CSR and block-sparse kernels (used
+in sparse inference graphs) across weight fractions.
+"""
+from tframe import console
+from tframe.utils import benchmark
+
+
+FRACTIONS = (100, 50, 20, 10, 5, 2)
+
+
+if __name__ == '__main__':
+  console.suppress_logging()
+  # Hyper Dense layer, 784 -> 800
+  benchmark.sparse_latency([784, 800], [784], FRACTIONS, batch_size=128)
+  # Hyper Conv2D layer, 3x3, 32 -> 64 channels on 28x28 feature maps
+  benchmark.sparse_latency([3, 3, 32, 64], [28, 28, 32], FRACTIONS,
+                           block_shape=(4, 4), batch_size=32)
@@ -0,0 +1,51 @@
+"""
+This script benchmarks multi-tower data-parallel training on CPU.
+
+SYNTAX: python bm_towers.py
+
+Each tower count in TOWERS is benchmarked in a separate process by running
+this script with `--num_towers=N`, and a scaling table will be printed.
+Set inter-op threads to at least the largest tower count for towers to run
+concurrently.
+"""
+import sys
+
+import cf10_core as core
+import cf10_du as du
+import t01_alex
+from tframe import tf
+from tframe import console
+from tframe.utils import benchmark
+
+
+TOWERS = (1, 2, 4, 8)
+BATCH_SIZE = 256
+STEPS = 20
+
+
+def main(_):
+  th = core.th
+  th.model = t01_alex.model
+  th.dropout = 0.0
+  th.centralize_data = False
+  th.batch_size = BATCH_SIZE
+  th.learning_rate = 0.001
+  th.mark = 'towers_bm'
+  th.save_model = False
+  th.gather_note = False
+  th.export_note = False
+
+  train_set, _, _ = du.load_data(th.data_dir)
+  model = th.model(th)
+  model.launch_model(overwrite=True)
+  benchmark.report_tower_result(th.num_towers, benchmark.time_update_steps(
+    model, train_set, th.batch_size, steps=STEPS))
+  model.shutdown()
+
+
+if __name__ == '__main__':
+  if not any([arg.startswith('--num_towers') for arg in sys.argv]):
+    benchmark.tower_scaling(__file__, TOWERS, extra_args=sys.argv[1:])
+  else:
+    console.suppress_logging()
+    tf.app.run()
@@ -0,0 +1,15 @@
+"""
+This script benchmarks start-up time of `import tframe`.
+
+SYNTAX: python bm_import.py
+
+Each statement is executed 5 times in fresh interpreters. Models, trainers,
+the organizer and data sets are imported lazily, so that the bare import
+should be notably cheaper than the statements accessing them.
+"""
+from tframe.utils import benchmark
+
+
+if __name__ == '__main__':
+  benchmark.import_time(
+    'tframe', attributes=('', 'DataSet', 'models', 'DefaultHub', 'mu'))
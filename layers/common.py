@@ -275,7 +275,15 @@ class Input(Layer):
     # This method is only accessible by Function.__call__ thus a None will
     #   be given as input
     assert len(args) == 0 and len(kwargs) == 0
-    input_ = tf.placeholder(
+    if hub.use_tf_data and tfr.context.data_pipeline is None:
+      # Use outputs of tf.data iterator as default input. Data fed through
+      #   feed_dict (e.g., during validation) will override these outputs
+      from tframe.data.pipeline import DataPipeline
+      pipeline = DataPipeline(self.input_shape, self.dtype, hub.target_dtype)
+      tfr.context.data_pipeline = pipeline
+      input_ = tf.placeholder_with_default(
+        pipeline.features, shape=self.input_shape, name=self.name)
+    else: input_ = tf.placeholder(
       dtype=self.dtype, shape=self.input_shape, name=self.name)
     # Update neuron scale
     self.neuron_scale = get_scale(input_)
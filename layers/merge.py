@@ -56,6 +56,8 @@ class ShortCut(Layer):
       assert len(transforms) == len(self.definitions)
       for t in transforms: checker.check_type(t, Function)
     self._transforms = transforms
+    # ids of definitions linked by this layer
+    self._linked_definitions = set()
 
   @single_input
   def _link(self, input_, **kwargs):
@@ -63,9 +65,12 @@ class ShortCut(Layer):
     if len(self.definitions) == 0: return input_
     # Get tensor list to merge
     tensors = [input_]
-    # Execute definitions if not executed
+    # Execute definitions if not executed. Definitions linked by this layer
+    #  should be re-linked on current input each time this layer is linked
     for f in self.definitions:
-      if f.output_tensor is None: _ = f(input_)
+      if f.output_tensor is None or id(f) in self._linked_definitions:
+        _ = f(input_)
+        self._linked_definitions.add(id(f))
     if self._transforms is None:
       tensors += [f.output_tensor for f in self.definitions]
     else:
@@ -147,6 +147,10 @@ class BatchNormalization(Layer):
       with tf.control_dependencies(update_ops + [sentry]):
         return tf.identity(batch_mean), tf.identity(batch_variance)
 
+    # Moving averages should be updated only once per training step
+    if not tfr.context.update_bn_moving_averages:
+      mean_var_with_update = lambda: (batch_mean, batch_variance)
+
     # Get mean variance according to is_training
     mean, variance = tf.cond(
       is_training, mean_var_with_update, lambda: (moving_mean, moving_var))
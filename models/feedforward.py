@@ -95,7 +95,9 @@ class Feedforward(Model, Net):
 
     # Run session
     feed_dict = self._get_default_feed_dict(data_batch, is_training=False)
-    batch_outputs = self.session.run(fetch_list, feed_dict)
+    batch_outputs = self.agent.tracer.run(
+      self.session, fetch_list, feed_dict, name='evaluate',
+      training_step=False)
 
     return batch_outputs
 
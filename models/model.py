@@ -85,6 +85,16 @@ class Model(object):
       self, self._loss, self._train_step, self._train_step_summary,
       name='Update-group')
 
+    # Slots for executing `th.steps_per_run` updates in a single session.run
+    self._loop_losses = TensorSlot(self, 'Loop-losses')
+    self._loop_update_group = Group(
+      self, self._loop_losses, name='Loop-update-group')
+    self._loop_placeholders = None
+
+    # Slots for multi-tower data-parallel training, see _define_towers
+    self._tower_loss = TensorSlot(self, 'Loss')
+    self._tower_losses = None
+
     # Slots for exporting np values to note
     self.grads_slot = NestedTensorSlot(self, 'Gradients')
     self.general_tensor_slot = NestedTensorSlot(self, 'General-Tensor')
@@ -289,8 +299,109 @@ class Model(object):
       self.set_train_step(var_list)
 
   def set_train_step(self, var_list=None):
-    self._train_step.plug(
-      self._optimizer.minimize(self._loss.op, var_list=var_list))
+    if self._tower_losses is not None:
+      # Gradients of towers will be averaged before being applied
+      losses, weights = self._tower_losses
+      update = self._optimizer.minimize(
+        losses, var_list=var_list, tower_weights=weights)
+    else: update = self._optimizer.minimize(self._loss.op, var_list=var_list)
+    self._train_step.plug(update)
+
+  @with_graph
+  def _define_towers(self, input_, targets, loss_function):
+    """Split each batch into N = th.num_towers slices, each of which is
+       consumed by a replica of the net sharing variables with the original
+       one. Replicas are independent sub-graphs thus can be executed in
+       parallel by the inter-op thread pool. Should be called before
+       self._define_train_step so that tower gradients can be averaged.
+
+       The original net (fed with the whole batch) is kept for validation
+       and evaluation, while the weighted sum of tower losses replaces the
+       loss slot in update group.
+
+    :param input_: input placeholder of shape [batch_size, *sample_shape]
+    :param targets: targets placeholder of shape [batch_size, *target_shape]
+    :param loss_function: a callable which maps (input_tensor, targets_tensor,
+                          tower_index) to a scalar loss tensor
+    """
+    N = checker.check_positive_integer(hub.num_towers)
+    if N == 1: return
+    assert callable(loss_function)
+
+    losses, sizes = [], []
+    with tf.name_scope('Towers'):
+      batch_size = tf.shape(input_)[0]
+      for i in range(N):
+        with tf.name_scope('Tower_{}'.format(i)):
+          # Slices are never empty, they overlap when batch_size < N
+          begin = batch_size * i // N
+          end = tf.maximum(begin + 1, batch_size * (i + 1) // N)
+          losses.append(loss_function(
+            input_[begin:end], targets[begin:end], i))
+          sizes.append(tf.cast(end - begin, hub.dtype))
+
+      total = tf.add_n(sizes)
+      weights = [size / total for size in sizes]
+      loss = tf.add_n([w * l for w, l in zip(weights, losses)], name='loss')
+
+    self._tower_losses = (losses, weights)
+    self._tower_loss.plug(loss)
+    # Replace loss slot in update group so that the original net will not be
+    #   executed during training
+    self._update_group.remove(self._loss)
+    self._update_group.add(self._tower_loss)
+    console.show_status(
+      'Each batch will be split into {} towers.'.format(N), '++')
+
+  @with_graph
+  def _define_loop_train_step(self, input_, targets, loss_function):
+    """Define K = th.steps_per_run updates inside a tf.while_loop so that
+       K stacked batches can be consumed within a single session.run call.
+       Should be called after self._define_train_step so that slots of
+       tf optimizer have already been created.
+
+    :param input_: input placeholder of shape [batch_size, *sample_shape]
+    :param targets: targets placeholder of shape [batch_size, *target_shape]
+    :param loss_function: a callable which maps (input_tensor, targets_tensor)
+                          to a scalar loss tensor
+    """
+    from tframe.optimizers.optimizer import Optimizer
+
+    K = checker.check_positive_integer(hub.steps_per_run)
+    if K == 1 or self._optimizer is None: return
+    assert isinstance(self._optimizer, Optimizer) and callable(loss_function)
+
+    with tf.name_scope('LoopTrainStep'):
+      stacked_input = tf.placeholder(
+        input_.dtype, [K] + input_.shape.as_list(), name='stacked_input')
+      stacked_targets = tf.placeholder(
+        targets.dtype, [K] + targets.shape.as_list(), name='stacked_targets')
+
+      def body(i, losses):
+        loss = loss_function(stacked_input[i], stacked_targets[i])
+        update = self._optimizer.get_update_op(loss)
+        with tf.control_dependencies([update]):
+          return i + 1, losses.write(i, loss)
+
+      _, losses = tf.while_loop(
+        lambda i, _: tf.less(i, K), body,
+        (tf.constant(0), tf.TensorArray(hub.dtype, size=K)),
+        parallel_iterations=1)
+      losses = losses.stack(name='losses')
+
+      # Increase lr global step by K after all updates have been applied.
+      #   Note that lr is read once per session.run, i.e., lr decays in a
+      #   staircase manner with stair width K.
+      if hub.lr_decay_enabled:
+        with tf.control_dependencies([losses]):
+          inc = tf.assign_add(tfr.context.lr_global_step, float(K))
+        with tf.control_dependencies([inc]):
+          losses = tf.identity(losses)
+
+    self._loop_losses.plug(losses)
+    self._loop_placeholders = (stacked_input, stacked_targets)
+    console.show_status(
+      '{} updates will be executed in each session.run call.'.format(K), '++')
 
   def reset_optimizer(self):
     from tframe.optimizers.optimizer import Optimizer
@@ -334,8 +445,14 @@ class Model(object):
     trainer.train(hub=trainer_hub, **kwargs)
 
   def update_model(self, data_batch, **kwargs):
-    """Default model updating method, should be overrode"""
-    feed_dict = self._get_default_feed_dict(data_batch, is_training=True)
+    """Default model updating method, should be overrode.
+       If data_batch is None, input and targets will be generated by
+       tf.data pipeline (see tframe.data.pipeline).
+    """
+    if data_batch is None:
+      assert tfr.context.data_pipeline is not None
+      feed_dict = self.agent.get_status_feed_dict(is_training=True)
+    else: feed_dict = self._get_default_feed_dict(data_batch, is_training=True)
     results = self._update_group.run(feed_dict, data=data_batch)
 
     # Clip weights if necessary
@@ -343,6 +460,29 @@ class Model(object):
 
     return results
 
+  def update_model_in_loop(self, data_batches):
+    """Update model using K = th.steps_per_run batches in a single
+       session.run call. All batches should have the same size.
+
+    :return: a list of K loss dictionaries, each of which has the same
+             structure as the loss dictionary returned by update_model
+    """
+    if not self._loop_losses.activated:
+      raise AssertionError('!! Loop train step has not been defined')
+    assert len(data_batches) == hub.steps_per_run
+    stacked_input, stacked_targets = self._loop_placeholders
+
+    feed_dict = {
+      stacked_input: np.stack([b[pedia.features] for b in data_batches]),
+      stacked_targets: np.stack([b.targets for b in data_batches])}
+    feed_dict.update(self.agent.get_status_feed_dict(is_training=True))
+    losses = self._loop_update_group.run(feed_dict)[self._loop_losses]
+
+    # Clip weights if necessary
+    self._clip_weights()
+
+    return [OrderedDict([(self._loss, loss)]) for loss in losses]
+
   def get_data_batches(self, data_set, batch_size, num_steps=None,
                        shuffle=False, is_training=False):
     """ Get batch generator. This method is used both in training and
@@ -614,8 +754,8 @@ class Model(object):
   def shutdown(self):
     self.agent.shutdown()
 
-  def launch_model(self, overwrite=False):
-    results = self.agent.launch_model(overwrite)
+  def launch_model(self, overwrite=False, tune_batches=None):
+    results = self.agent.launch_model(overwrite, tune_batches)
     # Clip weights if necessary
     self._clip_weights()
     return results
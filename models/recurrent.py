@@ -14,10 +14,11 @@ from tframe.nets import RNet
 from tframe.layers import Input
 
 from tframe.core.decorators import with_graph
-from tframe.core import NestedTensorSlot
+from tframe.core import NestedTensorSlot, OperationSlot
 
 from tframe.utils.misc import transpose_tensor
 from tframe.utils.misc import ravel_nested_stuff
+from tframe.utils.hoist import InputHoist
 
 from tframe.data.dataset import DataSet
 
@@ -34,10 +35,15 @@ class Recurrent(Model, RNet):
     self._default_net = self
     # Attributes
     self._state_slot = NestedTensorSlot(self, 'State')
+    # Used only when hub.keep_state_in_graph is True
+    self._train_state_update = OperationSlot(self, 'StateUpdate')
+    self._eval_state_update = None
     # mascot will be initiated as a placeholder with no shape specified
     # .. and will be put into initializer argument of tf.scan
     self._mascot = None
     self._while_loop_free_output = None
+    # How each scan output is gathered over time, used by tf.while_loop
+    self._result_modes = None
 
     # TODO: BETA
     self.last_scan_output = None
@@ -68,6 +74,7 @@ class Recurrent(Model, RNet):
         input_placeholder = (input_placeholder, self._mascot)
       self._while_loop_free_output = self(
         pre_outputs, input_placeholder, pseudo=True)
+      self._result_modes = self._get_result_modes()
 
     # Plug targets tensor into targets slot if necessary
     if self.loss_in_loop:
@@ -117,6 +124,13 @@ class Recurrent(Model, RNet):
     # Transpose input so as to fit the input of tf.scan
     input_placeholder = self.input_()
 
+    # Keep states in graph if required
+    if hub.keep_state_in_graph: self._create_persistent_states()
+
+    # Record input projections to be hoisted while building the shadow
+    if hub.hoist_input_projection:
+      context.hoist = InputHoist(self.input_.rnn_single_step_input)
+
     # Build a shadow in order to foreknow the nested structure of `initializer`
     initializer = self._build_while_free()
 
@@ -128,8 +142,28 @@ class Recurrent(Model, RNet):
       targets_placeholder = self._targets.tensor
       elems = (elems, transpose_tensor(targets_placeholder, [1, 0]))
 
-    # Send stuff into tf.scan and get results
-    results = tf.scan(self, elems, initializer=initializer, name='Scan')
+    # Calculate input projections for the whole sequence if required
+    fn = self
+    if context.hoist is not None:
+      if context.hoist.weights:
+        fn, elems = context.hoist.wrap(
+          self, elems, elems[0] if self.loss_in_loop else elems)
+        console.show_status('{} input projection(s) hoisted out of '
+                            'scan'.format(len(context.hoist.weights)),
+                            '[Recurrent]')
+      else: console.warning('No input projection can be hoisted')
+
+    # Send stuff into tf.scan (or tf.while_loop) and get results
+    if hub.rnn_while_loop:
+      results = self._while_loop(fn, elems, initializer)
+    else:
+      if hub.rnn_final_output_only: raise AssertionError(
+        '!! rnn_final_output_only works only when rnn_while_loop is True')
+      results = tf.scan(
+        fn, elems, initializer=initializer, name='Scan',
+        parallel_iterations=hub.rnn_parallel_iterations,
+        swap_memory=hub.rnn_swap_memory)
+    context.hoist = None
     scan_outputs, state_sequences = self._unwrap_outputs(results)
 
     # Activate state slot
@@ -142,7 +176,14 @@ class Recurrent(Model, RNet):
 
     # Plug last state to corresponding slot
     self._state_slot.plug(last_state)
-    self._update_group.add(self._state_slot)
+    if self.state_in_graph:
+      # States are updated inside graph instead of being fetched
+      self._train_state_update.plug(
+        self._get_state_assign_op(last_state, is_training=True))
+      self._eval_state_update = self._get_state_assign_op(
+        last_state, is_training=False)
+      self._update_group.add(self._train_state_update)
+    else: self._update_group.add(self._state_slot)
 
     # TODO: BETA
     if hub.use_rtrl: self._update_group.add(self.grad_buffer_slot)
@@ -155,6 +196,94 @@ class Recurrent(Model, RNet):
     self.outputs.plug(outputs)
     self.val_outputs.plug(outputs)   # BATCH
 
+  def _get_result_modes(self):
+    """Decide how each element of the result tuple in _link is gathered over
+       time: `stack` for sequences, `last` for the last step and `sum` for
+       summation. The order should be the same as that in RNet._link"""
+    seq = 'last' if hub.rnn_final_output_only else 'stack'
+    # 1&2. Outputs and states (only the last states are used)
+    modes = [seq, 'last']
+    # 3. Logits
+    if self.logits_tensor is not None: modes.append(seq)
+    # 4. Tensors to export
+    if hub.export_tensors_to_note: modes.append('stack')
+    # 5. Extra losses will be summed up
+    if context.loss_tensor_list: modes.append('sum')
+    # 6. RTRL gradients (only the last ones are used)
+    if hub.use_rtrl: modes.append('last')
+    # 7&8. Loss related tensors
+    modes += ['stack'] * (len(self._while_loop_free_output) - len(modes))
+    return modes
+
+  def _while_loop(self, fn, elems, initializer):
+    """An alternative to tf.scan built on tf.while_loop. States are carried
+       as loop variables instead of being stacked so that activation memory
+       does not grow with sequence length in forward pass. Elements gathered
+       in `last` or `sum` mode have a time dimension of length 1 so that the
+       results can be unwrapped in the same way as those of tf.scan."""
+    if hub.rnn_final_output_only and hub.use_gather_indices:
+      raise AssertionError(
+        '!! rnn_final_output_only can not be used with gather indices')
+    shadow = self._while_loop_free_output
+    assert len(self._result_modes) == len(shadow)
+
+    elems_flat = tf.nest.flatten(elems)
+    num_steps = tf.shape(elems_flat[0])[0]
+    batch_size = tf.shape(elems_flat[0])[1]
+
+    def zeros(tensor):
+      shape = tensor.shape.as_list()
+      if None in shape[1:]: raise AssertionError(
+        '!! Shape of `{}` should be known except for the batch '
+        'dimension'.format(tensor.name))
+      return tf.zeros([batch_size] + shape[1:] if shape else [], tensor.dtype)
+
+    def init_acc(mode, source):
+      if mode == 'stack': return tf.nest.map_structure(
+        lambda t: tf.TensorArray(t.dtype, size=num_steps), source)
+      return tf.nest.map_structure(zeros, source)
+
+    def update_acc(t, mode, acc, output):
+      output = tf.nest.pack_sequence_as(acc, tf.nest.flatten(output))
+      if mode == 'stack': return tf.nest.map_structure(
+        lambda ta, o: ta.write(t, o), acc, output)
+      if mode == 'sum': return tf.nest.map_structure(tf.add, acc, output)
+      return output
+
+    with tf.name_scope('WhileLoop'):
+      elems_ta = [tf.TensorArray(e.dtype, size=num_steps,
+                                 element_shape=e.shape[1:]).unstack(e)
+                  for e in elems_flat]
+      modes = [m for i, m in enumerate(self._result_modes) if i != 1]
+      accs = tuple(init_acc(m, src) for m, src in zip(
+        modes, [src for i, src in enumerate(shadow) if i != 1]))
+
+      def body(t, states, accs):
+        step_elems = tf.nest.pack_sequence_as(
+          elems, [ta.read(t) for ta in elems_ta])
+        pre_outputs = (initializer[0], states) + tuple(initializer[2:])
+        outputs = list(fn(pre_outputs, step_elems))
+        new_states = tf.nest.pack_sequence_as(
+          states, tf.nest.flatten(outputs.pop(1)))
+        new_accs = tuple(update_acc(t, m, acc, o)
+                         for m, acc, o in zip(modes, accs, outputs))
+        return t + 1, new_states, new_accs
+
+      _, states, accs = tf.while_loop(
+        lambda t, *_: t < num_steps, body,
+        (tf.constant(0), initializer[1], accs),
+        parallel_iterations=hub.rnn_parallel_iterations,
+        swap_memory=hub.rnn_swap_memory)
+
+      # Gather results
+      results = [
+        tf.nest.map_structure(lambda ta: ta.stack(), acc) if m == 'stack'
+        else tf.nest.map_structure(lambda v: tf.expand_dims(v, 0), acc)
+        for m, acc in zip(modes, accs)]
+      results.insert(1, tf.nest.map_structure(
+        lambda v: tf.expand_dims(v, 0), states))
+    return tuple(results)
+
   @staticmethod
   def _extract_tensors(tensors, extract):
     """This method is used specifically for the tf.scan output"""
@@ -447,16 +576,23 @@ class Recurrent(Model, RNet):
     # Fetch states if partition
     if partition:
       # fetch_list is mutable, do not append!
-      fetch_list = fetch_list + [self._state_slot.op]
+      # If states are kept in graph, run state update op instead
+      state_op = (self._eval_state_update if self.state_in_graph
+                  else self._state_slot.op)
+      fetch_list = fetch_list + [state_op]
 
     # Run session
     assert data_batch.is_rnn_input
     feed_dict = self._get_default_feed_dict(data_batch, is_training=False)
-    batch_outputs = self.session.run(fetch_list, feed_dict)
+    batch_outputs = self.agent.tracer.run(
+      self.session, fetch_list, feed_dict, name='evaluate',
+      training_step=False)
     assert isinstance(batch_outputs, list)
 
     # Set buffer if necessary
-    if partition: self.set_buffers(batch_outputs.pop(-1), is_training=False)
+    if partition:
+      state = batch_outputs.pop(-1)
+      if not self.state_in_graph: self.set_buffers(state, is_training=False)
 
     # Clear up outputs
     outputs, al = [], data_batch.active_length
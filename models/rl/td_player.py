@@ -2,6 +2,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import copy
 import numpy as np
 import time
 import tensorflow as tf
@@ -26,6 +27,12 @@ class TDPlayer(Feedforward, Player):
     self._next_value = None
     self._update_op = None
 
+    # For batched TD(lambda) updates
+    self._lamda = None
+    self._lambda_return = None
+    self._batch_update_op = None
+    self._batch_summary = None
+
     self._opponent = None
 
   # region : Properties
@@ -72,6 +79,22 @@ class TDPlayer(Feedforward, Player):
       # Group ops into a single op
       self._update_op = tf.group(*update_op, name='train')
 
+    # Define batched update op for offline TD(lambda), i.e.,
+    #   w += lr * sum_t (G_t - V(s_t)) * dV(s_t)/dw
+    #   in which G_t are lambda-returns calculated after episodes end
+    self._lamda = lamda
+    self._lambda_return = tf.placeholder(
+      self._outputs.dtype, self._outputs.get_shape(), name='lambda_return')
+    with tf.name_scope('Batch_Update'):
+      batch_delta = tf.stop_gradient(self._lambda_return - self._outputs)
+      batch_loss = 0.5 * tf.reduce_sum(tf.square(batch_delta))
+      self._batch_summary = tf.summary.merge([tf.summary.scalar(
+        'batch_loss_sum', batch_loss, collections=[pedia.invisible])])
+      grads = tf.gradients(self._outputs, vars, grad_ys=batch_delta)
+      self._batch_update_op = tf.group(
+        *[var.assign_add(learning_rate * grad)
+          for var, grad in zip(vars, grads)], name='batch_train')
+
     # Print status and model structure
     self._show_building_info(FeedforwardNet=self)
 
@@ -84,7 +107,7 @@ class TDPlayer(Feedforward, Player):
 
   def train(self, agent, episodes=500, print_cycle=0, snapshot_cycle=0,
              match_cycle=0, rounds=100, rate_thresh=1.0, shadow=None,
-             save_cycle=100, snapshot_function=None):
+             save_cycle=100, snapshot_function=None, summary_cycle=1):
     # Validate agent
     if not isinstance(agent, FMDPAgent):
       raise TypeError('Agent should be a FMDP-agent')
@@ -114,15 +137,7 @@ class TDPlayer(Feedforward, Player):
         self._merged_summary = tf.summary.merge_all()
 
     # Set opponent
-    if match_cycle > 0:
-      if shadow is None:
-        self._opponent = FMDRandomPlayer()
-        self._opponent.player_name = 'Random Player'
-      elif isinstance(shadow, TDPlayer):
-        self._opponent = shadow
-        self._opponent.player_name = 'Shadow_{}'.format(self._opponent.counter)
-      else:
-        raise TypeError('Opponent should be an instance of TDPlayer')
+    self._set_opponent(match_cycle, shadow)
 
     # Begin training iteration
     assert isinstance(agent, FMDPAgent)
@@ -138,6 +153,9 @@ class TDPlayer(Feedforward, Player):
 
       state = agent.state
       summary = None
+      # Summary will be fetched only in the last step of episodes on cycle
+      write_summary = summary_cycle > 0 and np.mod(
+        self.counter + 1, summary_cycle) == 0
       # Begin current episode
       while not agent.terminated:
         # Make a move
@@ -149,8 +167,10 @@ class TDPlayer(Feedforward, Player):
         feed_dict = {self.input_[0]: state, self._next_value: next_value}
         feed_dict.update(self._get_status_feed_dict(is_training=True))
         assert isinstance(self._session, tf.Session)
-        summary, _ = self._session.run(
-          [self._merged_summary, self._update_op], feed_dict)
+        if write_summary and agent.terminated:
+          summary, _ = self._session.run(
+            [self._merged_summary, self._update_op], feed_dict)
+        else: self._session.run(self._update_op, feed_dict)
 
         state = agent.state
 
@@ -158,7 +178,8 @@ class TDPlayer(Feedforward, Player):
       self.counter += 1
 
       assert isinstance(self._summary_writer, tf.summary.FileWriter)
-      self._summary_writer.add_summary(summary, self.counter)
+      if summary is not None:
+        self._summary_writer.add_summary(summary, self.counter)
 
       if print_cycle > 0 and np.mod(self.counter, print_cycle) == 0:
         self._print_progress(epi, start_time, steps, total=episodes)
@@ -174,6 +195,123 @@ class TDPlayer(Feedforward, Player):
     self._summary_writer.flush()
     self.shutdown()
 
+  def train_parallel(self, agents, episodes=500, print_cycle=0,
+                     snapshot_cycle=0, match_cycle=0, rounds=100,
+                     rate_thresh=1.0, shadow=None, save_cycle=100,
+                     summary_cycle=100, snapshot_function=None,
+                     match_agent=None):
+    """Self-play on several FMDP-agents (environments) running in lockstep.
+       In each step, candidate states of all environments are evaluated in
+       a single `estimate` call. When episodes end, their states and
+       lambda-returns are applied in a single batched TD(lambda) update,
+       which is the offline equivalent of eligibility traces. Summaries are
+       written every `summary_cycle` episodes. Training matches are played
+       on `match_agent`, which must not be one of the lockstep environments
+       (a deep copy of agents[0] is used by default).
+    """
+    # Validate agents
+    agents = list(agents)
+    if not agents or not all([isinstance(a, FMDPAgent) for a in agents]):
+      raise TypeError('Agents should be a list of FMDP-agents')
+    if match_cycle > 0:
+      if match_agent is None: match_agent = copy.deepcopy(agents[0])
+      if not isinstance(match_agent, FMDPAgent):
+        raise TypeError('match_agent should be an FMDP-agent')
+      if any([match_agent is a for a in agents]):
+        raise ValueError(
+          '!! match_agent should not be one of the lockstep environments')
+    if snapshot_function is not None:
+      if not callable(snapshot_function):
+        raise ValueError('snapshot_function must be callable')
+      self._snapshot_function = snapshot_function
+    self._set_opponent(match_cycle, shadow)
+
+    # Show configurations
+    console.show_status('Configurations:')
+    console.supplement('episodes: {}'.format(episodes))
+    console.supplement('parallel environments: {}'.format(len(agents)))
+
+    if self._session is None: self.launch_model()
+
+    def restart(agent):
+      agent.restart()
+      if hasattr(agent, 'default_first_move'): agent.default_first_move()
+
+    # Begin training iteration
+    console.section('Begin episodes')
+    active = agents[:episodes]
+    for agent in active: restart(agent)
+    trajectories = [[] for _ in active]
+    started, finished, start_time = len(active), 0, time.time()
+    while active:
+      states = [agent.state for agent in active]
+      targets = self.next_steps(active)
+
+      # Record transitions and restart terminated environments
+      next_active, next_trajectories, episodes_to_learn = [], [], []
+      for agent, traj, state, target in zip(
+          active, trajectories, states, targets):
+        traj.append((state, target))
+        if agent.terminated:
+          episodes_to_learn.append(traj)
+          if started == episodes: continue
+          restart(agent)
+          started, traj = started + 1, []
+        next_active.append(agent)
+        next_trajectories.append(traj)
+      active, trajectories = next_active, next_trajectories
+      if not episodes_to_learn: continue
+
+      # Update model with finished episodes
+      prev_counter = self.counter
+      self._update_on_episodes(episodes_to_learn, summary_cycle)
+      finished += len(episodes_to_learn)
+      crossed = lambda cycle: (
+          cycle > 0 and self.counter // cycle > prev_counter // cycle)
+      if crossed(print_cycle):
+        console.clear_line()
+        console.show_status(
+          'Episode {} [{} total], {:.1f} episodes/sec'.format(
+            finished, self.counter, finished / (time.time() - start_time)))
+        console.print_progress(finished, episodes)
+      if crossed(snapshot_cycle): self._snapshot(finished / episodes)
+      if crossed(match_cycle): self._training_match(
+        match_agent, rounds, finished / episodes, rate_thresh)
+      if crossed(save_cycle): self._save(self.counter)
+
+    # End training
+    console.clear_line()
+    console.show_status('{} episodes finished, {:.1f} episodes/sec'.format(
+      finished, finished / (time.time() - start_time)))
+    self._summary_writer.flush()
+    self.shutdown()
+
+  def _update_on_episodes(self, trajectories, summary_cycle):
+    """Apply a batched TD(lambda) update on finished episodes"""
+    states, returns = [], []
+    for traj in trajectories:
+      # G_t = (1 - lambda) * target_t + lambda * G_{t+1}, in which target_t
+      # .. is V(s_{t+1}) or the final reward
+      g = traj[-1][1]
+      for state, target in reversed(traj):
+        g = (1 - self._lamda) * target + self._lamda * g
+        states.append(state)
+        returns.append(g)
+
+    feed_dict = {self.input_[0]: np.stack(states),
+                 self._lambda_return: np.reshape(returns, (-1, 1))}
+    feed_dict.update(self._get_status_feed_dict(is_training=True))
+
+    prev_counter = self.counter
+    self.counter += len(trajectories)
+    write_summary = summary_cycle > 0 and (
+        self.counter // summary_cycle > prev_counter // summary_cycle)
+    fetches = [self._batch_update_op]
+    if write_summary: fetches.append(self._batch_summary)
+    results = self._session.run(fetches, feed_dict)
+    if write_summary:
+      self._summary_writer.add_summary(results[-1], self.counter)
+
   def _print_progress(self, epi, start_time, steps, **kwargs):
     """Use a awkward way to avoid IDE warning :("""
     console.clear_line()
@@ -182,6 +320,17 @@ class TDPlayer(Feedforward, Player):
         epi, self.counter, steps, time.time() - start_time))
     console.print_progress(epi, kwargs.get('total'))
 
+  def _set_opponent(self, match_cycle, shadow):
+    if match_cycle <= 0: return
+    if shadow is None:
+      self._opponent = FMDRandomPlayer()
+      self._opponent.player_name = 'Random Player'
+    elif isinstance(shadow, TDPlayer):
+      self._opponent = shadow
+      self._opponent.player_name = 'Shadow_{}'.format(self._opponent.counter)
+    else:
+      raise TypeError('Opponent should be an instance of TDPlayer')
+
   def _snapshot(self, progress):
     if self._snapshot_function is None:
       return
@@ -232,6 +381,20 @@ class TDPlayer(Feedforward, Player):
     reward = agent.act(action_index)
     return reward if agent.terminated else values[action_index]
 
+  def next_steps(self, agents):
+    """Vectorized next_step for agents running in lockstep. Candidate states
+       of all agents are evaluated in a single `estimate` call"""
+    candidates = [np.asarray(agent.candidate_states) for agent in agents]
+    values = self.estimate(np.concatenate(candidates, axis=0))
+    sections = np.cumsum([len(c) for c in candidates])[:-1]
+    targets = []
+    for agent, v in zip(agents, np.split(values, sections)):
+      action_index = agent.action_index(v)
+      reward = agent.act(action_index)
+      targets.append(float(np.squeeze(
+        reward if agent.terminated else v[action_index])))
+    return targets
+
   def estimate(self, states):
     if self._outputs is None:
       raise ValueError('Model not built yet')
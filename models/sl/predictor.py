@@ -128,6 +128,14 @@ class Predictor(Feedforward, Recurrent):
       # Plug in
       self.loss.plug(loss_tensor, quantity_def=self.loss_quantity)
 
+    # Build towers if required
+    if hub.num_towers > 1:
+      self._check_relink_compatibility('num_towers > 1')
+      self._define_towers(
+        self.input_tensor, self._targets.tensor, self._get_tower_loss)
+      # Tower loss will be used in training
+      loss_tensor = self._tower_loss.tensor
+
     # <monitor_grad_step_02: register loss and plug grad_ops in>
     if hub.monitor_weight_grads:
       context.monitor.register_loss(loss_tensor)
@@ -157,6 +165,54 @@ class Predictor(Feedforward, Recurrent):
     # Define train step
     self._define_train_step(optimizer)
 
+    # Define loop train step if required
+    if hub.steps_per_run > 1:
+      self._check_relink_compatibility(
+        'steps_per_run > 1', allow_regularizers=False)
+      self._define_loop_train_step(
+        self.input_tensor, self._targets.tensor, self._get_relinked_loss)
+
+  def _check_relink_compatibility(self, option, allow_regularizers=True):
+    if self.master is not Feedforward: raise AssertionError(
+      '!! {} is only supported by feed-forward predictors'.format(option))
+    # Losses which can not be re-calculated inside a tf.while_loop
+    if not allow_regularizers and tf.get_collection(
+        tf.GraphKeys.REGULARIZATION_LOSSES):
+      raise AssertionError('!! Variable regularizers are not supported when '
+                           '{}, use global_l2_penalty instead'.format(option))
+    if callable(context.customized_loss_f_net) or self.output_slots:
+      raise AssertionError('!! Customized or injected losses are not '
+                           'supported when {}'.format(option))
+
+  def _get_tower_loss(self, input_, targets, index):
+    """Used as loss_function in Model._define_towers"""
+    # Batch norm moving averages should be updated only by the first tower
+    context.update_bn_moving_averages = index == 0
+    loss_tensor = self._get_relinked_loss(input_, targets)
+    context.update_bn_moving_averages = True
+    # Regularization losses are shared by all towers whose weights sum to 1
+    reg_losses = tf.get_collection(tf.GraphKeys.REGULARIZATION_LOSSES)
+    if reg_losses: loss_tensor = tf.add(loss_tensor, tf.add_n(reg_losses))
+    return loss_tensor
+
+  def _get_relinked_loss(self, input_, targets):
+    """Re-link net on input_ (variables are reused) and calculate loss.
+       Used as loss_function in Model._define_loop_train_step"""
+    # Losses registered to context during re-linking should be picked out
+    n_losses = len(context.loss_tensor_list)
+    # Re-linking overwrites output tensors which are used elsewhere
+    outputs = self.snapshot_output_tensors()
+    try: loss_tensor = self.loss_quantity(targets, self(input_))
+    finally: self.restore_output_tensors(outputs)
+    extra_losses = context.loss_tensor_list[n_losses:]
+    del context.loss_tensor_list[n_losses:]
+    # Global l2 penalty should be re-calculated inside loop
+    if hub.global_l2_penalty > 0:
+      extra_losses.append(hub.global_l2_penalty * tf.add_n(
+        [tf.nn.l2_loss(v) for v in self.decayable_vars]))
+    if extra_losses: loss_tensor = tf.add(loss_tensor, tf.add_n(extra_losses))
+    return loss_tensor
+
   def _plug_target_in(self, shape):
     dtype = hub.dtype
     if hub.target_dim != 0: shape[-1] = hub.target_dim
@@ -171,7 +227,11 @@ class Predictor(Feedforward, Recurrent):
       #   method
       assert self.master == Recurrent
       return
-    target_tensor = tf.placeholder(dtype, shape, name='targets')
+    if context.data_pipeline is not None:
+      # Use targets generated by tf.data iterator as default value
+      target_tensor = tf.placeholder_with_default(
+        tf.cast(context.data_pipeline.targets, dtype), shape, name='targets')
+    else: target_tensor = tf.placeholder(dtype, shape, name='targets')
     self._targets.plug(target_tensor, collection=pedia.default_feed_dict)
 
   def _plug_val_target_in(self, val_targets):
@@ -199,7 +259,8 @@ class Predictor(Feedforward, Recurrent):
     # Update recurrent model
     feed_dict = self._get_default_feed_dict(data_batch, is_training=True)
     results = self._update_group.run(feed_dict)
-    self.set_buffers(results.pop(self._state_slot), is_training=True)
+    if not self.state_in_graph:
+      self.set_buffers(results.pop(self._state_slot), is_training=True)
 
     # TODO: BETA
     assert not hub.use_rtrl
@@ -219,6 +280,67 @@ class Predictor(Feedforward, Recurrent):
     return self.evaluate(
       self.val_outputs.tensor, data, batch_size, extractor, **kwargs)
 
+  @with_graph
+  def export_inference(self, path, optimize=True, sparse=False, fmt='csr',
+                       block_shape=None):
+    """Export a frozen inference-only GraphDef to path. Variables are
+       converted to constants, is_training is fixed to False so that
+       training branches (e.g., batch-norm updates) are removed, and
+       training-only ops such as optimizer slots and summaries are stripped.
+       If optimize is True, weight masks and batch norms are folded into
+       weights. If sparse is True, etched kernels will be exported in `fmt`
+       format and executed with sparse matmul (see get_sparse_outputs).
+       The exported file can be loaded by tframe.utils.frozen.FrozenModel.
+    """
+    from tframe.utils import frozen
+    from tframe.models.sl.classifier import Classifier
+
+    if not self.launched: raise AssertionError(
+      '!! Model should be launched before being exported')
+    if self.input_type is not InputTypes.BATCH: raise AssertionError(
+      '!! Only feed-forward models can be exported for inference')
+
+    output_tensor = self.val_outputs.tensor
+    if sparse: output_tensor = self.get_sparse_outputs(fmt, block_shape)
+    frozen.export(
+      self.session, path, self._inference_input, output_tensor,
+      is_training=tf.get_collection(pedia.is_training)[0],
+      signature=dict(mark=self.mark, classifier=isinstance(self, Classifier),
+                     sparse=fmt if sparse else None),
+      optimize=optimize)
+    console.show_status('Inference graph exported to `{}`'.format(path))
+
+  @with_graph
+  def get_sparse_outputs(self, fmt='csr', block_shape=None):
+    """Convert etched weights to CSR or block-sparse (`bsr`) weights and
+       re-link net to build a sparse inference graph, in which etched dense
+       and convolutional kernels are executed with sparse matmul. The
+       returned tensor takes the same input as val_outputs and can be
+       evaluated via self.evaluate.
+    """
+    if not self.launched: raise AssertionError(
+      '!! Model should be launched before being sparsified')
+    if self.master is not Feedforward: raise AssertionError(
+      '!! Sparse execution is only supported by feed-forward predictors')
+    pruner = context.pruner
+    if pruner is None or not pruner.variable_dict: raise AssertionError(
+      '!! No etched kernel found in this model')
+
+    pruner.sparsify(fmt, block_shape)
+    # Variables are reused and no batch-norm update op should be created
+    pruner.use_sparse_weights = True
+    context.update_bn_moving_averages = False
+    outputs = self(self._inference_input)
+    context.update_bn_moving_averages = True
+    pruner.use_sparse_weights = False
+    return outputs
+
+  @property
+  def _inference_input(self):
+    shadow_input = getattr(self, '_shadow_input', None)
+    if shadow_input is None: return self.input_tensor
+    return shadow_input.place_holder
+
   @with_graph
   def evaluate_model(self, data, batch_size=None, dynamic=False, **kwargs):
     """The word `evaluate` in this method name is different from that in
@@ -438,6 +438,24 @@ class Net(Function, Nomear):
     if return_net: return container
     else: return f
 
+  def snapshot_output_tensors(self):
+    """Return a list of (function, output_tensor) pairs of all functions
+       in this net, which can be restored after this net is re-linked"""
+    pairs, visited, stack = [], set(), [self]
+    while stack:
+      f = stack.pop()
+      if not isinstance(f, Function) or id(f) in visited: continue
+      visited.add(id(f))
+      pairs.append((f, f.output_tensor))
+      stack.extend(getattr(f, 'children', None) or [])
+      stack.extend(getattr(f, 'definitions', None) or [])
+      for t_list in getattr(f, '_transforms', None) or []: stack.extend(t_list)
+    return pairs
+
+  @staticmethod
+  def restore_output_tensors(pairs):
+    for f, tensor in pairs: f.output_tensor = tensor
+
   # endregion : Public Methods
 
 
@@ -55,6 +55,14 @@ class RNet(Net):
     # Gate activations should be registered here
     self._gate_dict = OrderedDict()
 
+    # Persistent states, used only when hub.keep_state_in_graph is True
+    # .. key: is_training, value: nested state variables
+    self._state_vars = {}
+    # .. key: (op_name, is_training)
+    self._state_ops = {}
+    self._state_feeds = {}
+    self._state_batch_size = {True: None, False: None}
+
   # region : Properties
 
   @property
@@ -77,6 +85,11 @@ class RNet(Net):
                 else len(cell.init_state)
                 for cell in self.rnn_cells])
 
+  @property
+  def state_in_graph(self):
+    """Whether states are kept in non-trainable variables"""
+    return bool(self._state_vars)
+
   @property
   def init_state(self):
     if self._init_state is not None: return self._init_state
@@ -220,7 +233,10 @@ class RNet(Net):
 
   def reset_buffers(self, batch_size, is_training=True):
     assert self.is_root
-    if is_training: self._train_state_buffer = self._get_zero_state(batch_size)
+    if self.state_in_graph: self._run_state_op(
+      'reset', is_training, batch_size, batch_size=batch_size)
+    elif is_training:
+      self._train_state_buffer = self._get_zero_state(batch_size)
     else: self._eval_state_buffer = self._get_zero_state(batch_size)
     if 'reset_buffer' in hub.verbose_config:
       prefix = 'Train' if is_training else 'Eval'
@@ -253,7 +269,10 @@ class RNet(Net):
     #   self._train_state_buffer = _decrease(self._train_state_buffer)
     # else: self._eval_state_buffer = _decrease(self._eval_state_buffer)
 
-    if is_training:
+    if self.state_in_graph: self._run_state_op(
+      'edit', is_training, len(indices), indices=indices,
+      scale=np.ones(self._state_batch_size[is_training]))
+    elif is_training:
       self._train_state_buffer = self._apply_to_nested_array(
         self._train_state_buffer, _decrease)
     else: self._eval_state_buffer = self._apply_to_nested_array(
@@ -296,6 +315,15 @@ class RNet(Net):
     #   else:
     #     raise TypeError('!! Unknown type of states: {}'.format(type(state)))
 
+    # Reset and delete rows of state variables inside graph
+    if self.state_in_graph:
+      size = self._state_batch_size[True]
+      scale = np.ones(size)
+      if len(zero_indices) > 0: scale[np.array(zero_indices)] = 0
+      keep = [i for i in range(size) if i not in none_indices]
+      self._run_state_op('edit', True, len(keep), indices=keep, scale=scale)
+      return
+
     # self._train_state_buffer = _reset(self._train_state_buffer)
     self._train_state_buffer = self._apply_to_nested_array(
       self._train_state_buffer, _reset)
@@ -307,6 +335,84 @@ class RNet(Net):
 
   # endregion : Public Methods
 
+  # region : Persistent States
+
+  def _create_persistent_states(self):
+    """Create non-trainable variables to hold train and eval states, and
+       replace init_state with placeholders whose default values are read
+       from these variables. Thus states need not be fed or fetched, and
+       buffer operations are executed as small ops inside graph.
+       Should be called by root net before init_state is used."""
+    from tframe import pedia
+    assert self.is_root
+    is_training = tf.get_collection(pedia.is_training)[0]
+
+    def create_var(holder, prefix):
+      shape = holder.shape.as_list()[1:]
+      var = tf.Variable(
+        tf.zeros([0] + shape, dtype=holder.dtype), trainable=False,
+        use_resource=True, shape=tf.TensorShape([None] + shape),
+        name='{}_state'.format(prefix))
+      tf.add_to_collection(pedia.do_not_save, var)
+      return var
+
+    with tf.name_scope('PersistentStates'):
+      for mode, prefix in ((True, 'train'), (False, 'eval')):
+        self._state_vars[mode] = _map_nested(
+          lambda h: create_var(h, prefix), self.init_state)
+
+      # Feeds for buffer operations
+      self._state_feeds = dict(
+        batch_size=tf.placeholder(tf.int32, (), 'batch_size'),
+        indices=tf.placeholder(tf.int32, [None], 'indices'),
+        scale=tf.placeholder(hub.dtype, [None], 'scale'))
+      for mode in (True, False):
+        state_vars = ravel_nested_stuff(self._state_vars[mode])
+        self._state_ops['reset', mode] = tf.group(*[
+          self._reset_state_var(v) for v in state_vars])
+        self._state_ops['edit', mode] = tf.group(*[
+          self._edit_state_var(v) for v in state_vars])
+
+      # Replace init_state
+      self._init_state = _map_nested(
+        lambda h, vt, ve: tf.placeholder_with_default(
+          tf.cond(is_training, vt.read_value, ve.read_value), h.shape,
+          name='init_state'),
+        self.init_state, self._state_vars[True], self._state_vars[False])
+
+  def _get_state_assign_op(self, new_state, is_training):
+    """Get op assigning new_state to state variables"""
+    def assign(var, state):
+      if hub.state_nan_protection:
+        # Reset states in batches containing NaN
+        axis = list(range(1, len(state.shape)))
+        nan_rows = tf.reduce_any(tf.is_nan(state), axis=axis)
+        state = tf.where(nan_rows, tf.zeros_like(state), state)
+      return var.assign(state)
+    return tf.group(*ravel_nested_stuff(
+      _map_nested(assign, self._state_vars[is_training], new_state)),
+      name='{}_state_update'.format('train' if is_training else 'eval'))
+
+  def _reset_state_var(self, var):
+    shape = var.shape.as_list()[1:]
+    return var.assign(tf.zeros([self._state_feeds['batch_size']] + shape,
+                               dtype=var.dtype))
+
+  def _edit_state_var(self, var):
+    """Scale each row (0 for reset) and gather rows to keep"""
+    scale = tf.reshape(self._state_feeds['scale'],
+                       [-1] + [1] * (len(var.shape) - 1))
+    return var.assign(tf.gather(
+      var.read_value() * tf.cast(scale, var.dtype),
+      self._state_feeds['indices']))
+
+  def _run_state_op(self, name, is_training, new_size, **kwargs):
+    feed_dict = {self._state_feeds[k]: v for k, v in kwargs.items()}
+    self.session.run(self._state_ops[name, is_training], feed_dict)
+    self._state_batch_size[is_training] = new_size
+
+  # endregion : Persistent States
+
   # region : Private Methods
 
   @staticmethod
@@ -356,6 +462,8 @@ class RNet(Net):
     assert self.is_root and isinstance(is_training, bool)
 
     rnn_dict = {}
+    # States kept in graph will be used as default value of init_state
+    if self.state_in_graph: return rnn_dict
     if is_training:
       state = self._train_state_buffer
       assert state is not None
@@ -724,3 +832,8 @@ class RNet(Net):
 
   # endregion : Export dL/dx
 
+
+def _map_nested(f, *nested):
+  """Apply f to leaves of nested tuples (or lists) of the same structure"""
+  if not isinstance(nested[0], (tuple, list)): return f(*nested)
+  return tuple([_map_nested(f, *leaves) for leaves in zip(*nested)])
@@ -85,8 +85,11 @@ class KernelBase(object):
         'provided.'.format(self.kernel_key, len(arg_names), len(self.kwargs)))
 
 
-  def _get_weights(self, name, shape, dtype=None, initializer=None):
-    """This method is crucial for pruning algorithm"""
+  def _get_weights(self, name, shape, dtype=None, initializer=None,
+                   allow_sparse=False):
+    """This method is crucial for pruning algorithm. If allow_sparse is True
+       and the pruner is linking a sparse inference graph, a SparseWeights
+       will be returned instead of masked weights"""
 
     if initializer is None: initializer = self.initializer
     else: initializer = initializers.get(initializer)
@@ -125,6 +128,11 @@ class KernelBase(object):
     # Register etch kernel to pruner
     masked_weights = context.pruner.register_to_dense(weights, self.etch)
 
+    # Return sparse weights if available
+    if allow_sparse:
+      sparse_weights = context.pruner.get_sparse_weights(weights)
+      if sparse_weights is not None: return sparse_weights
+
     # Return
     assert isinstance(masked_weights, tf.Tensor)
     return masked_weights
@@ -67,7 +67,7 @@ class NeuronArray(NeuroBase):
         if len(input_list) > 1: x = tf.concat(input_list, axis=-1)
         else: x = input_list[0]
         # Add kernel
-        self.add_kernel(x)
+        self.add_kernel(x, input_parts=input_list)
 
     # Make sure psi_kernel is not empty
     assert self.psi_kernels
@@ -105,7 +105,7 @@ class NeuronArray(NeuroBase):
 
   def add_kernel(
       self, input_, kernel_key='fc', suffix=None, weight_initializer=None,
-      prune_frac=0, **kwargs):
+      prune_frac=0, input_parts=None, **kwargs):
     """Add a psi kernel to self. Final neuron activation will be
        y = \phi(\Sigma_k(psi_k()) + bias)
     :param input_: psi input
@@ -116,6 +116,8 @@ class NeuronArray(NeuroBase):
     :param weight_initializer: if not provided, will be set to self's
     :param prune_frac: if positive, weights got inside kernel will be masked
                        and may be pruned in `lottery` style
+    :param input_parts: tensors concatenated to produce input_, used by
+                        InputHoist to reuse input projections
     :param kwargs: additional arguments to call kernel, will be checked during
                    PsiKernel instantiating
     """
@@ -131,7 +133,7 @@ class NeuronArray(NeuroBase):
       weight_initializer=weight_initializer, prune_frac=prune_frac,
       LN=self._layer_normalization and self._normalize_each_psi,
       gain_initializer=self._gain_initializer, etch=self.etch,
-      weight_dropout=self._weight_dropout, **kwargs)
+      weight_dropout=self._weight_dropout, input_parts=input_parts, **kwargs)
 
     self.psi_kernels.append(psi_kernel)
 
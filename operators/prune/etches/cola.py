@@ -3,6 +3,7 @@ from __future__ import division
 from __future__ import print_function
 
 import numpy as np
+from tframe import tf
 
 from tframe import console
 from tframe import context
@@ -24,6 +25,9 @@ class Cola(EtchKernel):
     self.ratio = ratio
     self.max_flip = hub.max_flip
 
+    # Placeholder for flip counts used in in-graph etching
+    self._flips_placeholder = None
+
 
   def _get_new_mask(self):
 
@@ -35,6 +39,21 @@ class Cola(EtchKernel):
     return mask
 
 
+  def get_new_mask_tensor(self):
+    assert hub.monitor_weight_flips
+    # Flip counts are kept by monitor on host thus should be fed
+    self._flips_placeholder = tf.placeholder(
+      hub.dtype, self.mask.shape, name='flip_count')
+    mask = tf.cast(self._flips_placeholder < self.max_flip, self.mask.dtype)
+    if hub.flip_irreversible: mask *= self.mask
+    return mask
+
+
+  def get_etch_feed_dict(self):
+    flips = monitor.get_weight_flip_count(self.weights)
+    return {self._flips_placeholder: flips}
+
+
   # # Back up
   # def _get_new_mask(self):
   #   # Get corresponding grads stats
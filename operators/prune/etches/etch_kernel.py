@@ -59,6 +59,39 @@ class EtchKernel(MaskedWeights):
   def _get_new_mask(self):
     raise NotImplementedError
 
+  # region : In-graph Etching
+
+  def get_new_mask_tensor(self):
+    """Return a tensor of new mask calculated inside graph, which will be
+       assigned to mask in Pruner's etch op. Return None if this kernel can
+       only be etched in NumPy via _get_new_mask."""
+    return None
+
+  def get_etch_feed_dict(self):
+    """Return feed_dict for statistics kept on host (if any) required by
+       new mask tensor"""
+    return {}
+
+  @staticmethod
+  def quantile(x, q, mask=None):
+    """Calculate q-quantile of x (over entries where mask is True) inside
+       graph. Linear interpolation is used as in np.percentile. Zero is
+       returned if no entry is left, e.g., for a fully pruned kernel."""
+    x = tf.reshape(x, [-1])
+    if mask is not None: x = tf.boolean_mask(x, tf.reshape(mask, [-1]))
+
+    def _quantile():
+      sorted_x = tf.sort(x)
+      pos = q * tf.cast(tf.size(sorted_x) - 1, x.dtype)
+      lo, hi = tf.floor(pos), tf.ceil(pos)
+      x_lo = tf.gather(sorted_x, tf.cast(lo, tf.int32))
+      x_hi = tf.gather(sorted_x, tf.cast(hi, tf.int32))
+      return x_lo + (pos - lo) * (x_hi - x_lo)
+
+    return tf.cond(tf.size(x) > 0, _quantile, lambda: tf.zeros([], x.dtype))
+
+  # endregion : In-graph Etching
+
 
   @staticmethod
   def get_etch_kernel(kernel_string):
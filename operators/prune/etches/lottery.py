@@ -29,6 +29,9 @@ class Lottery(EtchKernel):
     self.assign_init = tf.assign(self.init_val, self.weights)
     self.reset_weights = tf.assign(self.weights, self.init_val)
 
+    # Placeholder for gradient statistics used in in-graph g_constraint
+    self._graa_placeholder = None
+
 
   def _get_new_mask(self):
     """self.prune_frac should be global prune_rate_fc * kernel_prune_frac
@@ -83,4 +86,41 @@ class Lottery(EtchKernel):
     # Return mask
     return mask
 
+  # region : In-graph Etching
+
+  def get_new_mask_tensor(self):
+    if hub.lottery_kernel == 'lottery18': return self._lottery18_tensor()
+    elif hub.lottery_kernel == 'g_constraint':
+      return self._g_constraint_tensor()
+    else: raise KeyError(
+      '!! Unknown lottery kernel `{}`'.format(hub.lottery_kernel))
+
+  def get_etch_feed_dict(self):
+    if self._graa_placeholder is None: return {}
+    grad_stats = monitor.get_weight_stats(self.weights)
+    assert isinstance(grad_stats, Statistic)
+    return {self._graa_placeholder: grad_stats.running_abs_average}
 
+  def _g_constraint_tensor(self):
+    assert hub.monitor_weight_grads
+    # Gradient statistics are kept by monitor on host thus should be fed
+    self._graa_placeholder = tf.placeholder(
+      hub.dtype, self.mask.shape, name='grad_running_abs_avg')
+    graa = self._graa_placeholder
+
+    m_bool = self.mask > 0
+    abs_w = tf.abs(self.weights * self.mask)
+    w_mask = abs_w < self.quantile(abs_w, self.prune_frac, m_bool)
+    g_mask = graa < self.quantile(graa, 0.9, m_bool)
+    prune = tf.logical_and(tf.logical_and(w_mask, g_mask), m_bool)
+    return tf.where(prune, tf.zeros_like(self.mask), self.mask)
+
+  def _lottery18_tensor(self):
+    # weights_fraction (%) is calculated from current mask
+    weights_fraction = 100. * tf.reduce_mean(self.mask)
+    weights_fraction = weights_fraction * (1 - self.prune_frac)
+    w = tf.abs(self.weights * self.mask)
+    bound = self.quantile(w, 1. - weights_fraction / 100.)
+    return tf.cast(w > bound, self.mask.dtype)
+
+  # endregion : In-graph Etching
@@ -3,12 +3,14 @@ from __future__ import division
 from __future__ import print_function
 
 from collections import OrderedDict
+import os
 import numpy as np
 
 import tframe as tfr
 from tframe.enums import SaveMode
 
 from tframe.operators.prune.etches.etch_kernel import EtchKernel
+from tframe.operators.prune import sparse
 
 
 class Pruner(object):
@@ -22,6 +24,19 @@ class Pruner(object):
     # key: tf.Variable, value: EtchKernel
     self.variable_dict = OrderedDict()
 
+    # In-graph etch op and fractions of kernels etched by it, created in the
+    # .. first call of etch_all
+    self._etch_op = None
+    self._etch_fractions = None
+    self._in_graph_kernels = []
+
+    # key: tf.Variable, value: SparseWeights, filled by Pruner.sparsify
+    self.sparse_dict = OrderedDict()
+    # If True, KernelBase._get_weights will return SparseWeights when
+    # .. available. This flag is turned on only while linking sparse
+    # .. inference graph
+    self.use_sparse_weights = False
+
     # Show status
     tfr.console.show_status('Pruner created.')
 
@@ -82,6 +97,11 @@ class Pruner(object):
     self._dense_kernels.append(kernel)
     return kernel.masked_weights
 
+  def get_sparse_weights(self, weights):
+    """This method will be called in KernelBase._get_weights"""
+    if not self.use_sparse_weights: return None
+    return self.sparse_dict.get(weights, None)
+
   def clear(self):
     pass
 
@@ -89,18 +109,22 @@ class Pruner(object):
     """This method will only be called during training in Trainer._etch"""
     # Take down frac before pruning
     prev_frac = self.weights_fraction
-    # etching ia based on weights and mask buffers, which should be fetched
-    # here
-    self._write_weight_and_mask_buffer()
-    # Create empty op list and feed_dict
-    ops, feed_dict = [], {}
-    for knl in self._dense_kernels:
-      assert isinstance(knl, EtchKernel)
-      op, d = knl.get_etch_op_dict()
-      ops.append(op)
-      feed_dict.update(d)
-    # Run session to update kernels
-    self._update_kernels(ops, feed_dict)
+    # Etch kernels with in-graph implementation in a single session run
+    kernels = self._dense_kernels
+    if tfr.hub.etch_in_graph: kernels = self._etch_in_graph()
+    # Etch the remaining kernels in NumPy, which is based on weights and mask
+    # .. buffers fetched here
+    if kernels:
+      self._write_weight_and_mask_buffer(kernels=kernels)
+      # Create empty op list and feed_dict
+      ops, feed_dict = [], {}
+      for knl in kernels:
+        assert isinstance(knl, EtchKernel)
+        op, d = knl.get_etch_op_dict()
+        ops.append(op)
+        feed_dict.update(d)
+      # Run session to update kernels
+      self._update_kernels(ops, feed_dict)
     # Show prune result
     curr_frac = self.weights_fraction
     if abs(curr_frac - prev_frac) > 0.006:
@@ -129,6 +153,94 @@ class Pruner(object):
 
   # endregion : Public Methods
 
+  # region : Sparse Execution
+
+  def sparsify(self, fmt=sparse.CSR, block_shape=None):
+    """Convert current masked weights of all etch kernels to SparseWeights,
+       which will be used when linking sparse inference graph.
+
+    :param fmt: `csr` or `bsr`
+    :param block_shape: block shape for `bsr` format. Kernels whose weight
+                        matrix can not be divided by block_shape will be
+                        converted to CSR format
+    """
+    self._write_weight_and_mask_buffer('[Sparse]')
+    self.sparse_dict.clear()
+    for knl in self._dense_kernels:
+      assert isinstance(knl, EtchKernel)
+      masked = knl.weights_buffer * knl.mask_buffer
+      kernel_fmt = fmt
+      if fmt == sparse.BSR:
+        try: sparse.check_block_shape(sparse.as_matrix(masked).shape,
+                                      block_shape)
+        except AssertionError: kernel_fmt = sparse.CSR
+      self.sparse_dict[knl.weights] = sparse.SparseWeights(
+        masked, kernel_fmt, block_shape)
+      knl.clear_buffers()
+    nnz = sum([sw.nnz for sw in self.sparse_dict.values()])
+    tfr.console.show_status('{} kernels converted to sparse weights '
+                            '(weights fraction = {:.2f}%)'.format(
+      len(self.sparse_dict), 100. * nnz / self.total_size), '[Sparse]')
+
+  def save_sparse_checkpoint(self, path, fmt=sparse.CSR, block_shape=None):
+    """Save model variables needed for inference to a compressed .npz file.
+       Etched weights are saved as indices and values, their masks are
+       dropped, and the other variables (e.g., biases, batch-norm statistics)
+       are saved densely. Optimizer variables are not saved.
+    """
+    self._write_weight_and_mask_buffer('[Sparse]')
+    arrays = OrderedDict()
+    skipped = set()
+    for knl in self._dense_kernels:
+      assert isinstance(knl, EtchKernel)
+      masked = knl.weights_buffer * knl.mask_buffer
+      if fmt == sparse.BSR: d = sparse.to_bsr(masked, block_shape)
+      else: d = sparse.to_csr(masked)
+      for key, value in d.items():
+        arrays['{}/{}/{}'.format(fmt, knl.weights.op.name, key)] = value
+      skipped.update([knl.weights, knl.mask])
+      if hasattr(knl, 'init_val'): skipped.add(knl.init_val)
+      knl.clear_buffers()
+
+    dense_vars = [v for v in self._get_inference_variables()
+                  if v not in skipped]
+    for v, value in zip(dense_vars, self._run_op(dense_vars)):
+      arrays['dense/' + v.op.name] = value
+
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory): os.makedirs(directory)
+    with open(path, 'wb') as f: np.savez_compressed(f, **arrays)
+    tfr.console.show_status(
+      'Sparse checkpoint ({:.1f} KB) saved to `{}`'.format(
+        os.path.getsize(path) / 1024, path), '[Sparse]')
+
+  def load_sparse_checkpoint(self, path):
+    """Load checkpoint saved by save_sparse_checkpoint. Etched weights are
+       restored densely with masks set to their non-zero patterns"""
+    with np.load(path) as npz: arrays = {k: npz[k] for k in npz.files}
+    variables = {v.op.name: v for v in self._get_inference_variables()}
+
+    # Group sparse arrays by variable name
+    sparse_dicts = OrderedDict()
+    for key, value in arrays.items():
+      head, tail = key.split('/', 1)
+      if head == 'dense': variables[tail].load(value, self._model.session)
+      else:
+        name, field = tail.rsplit('/', 1)
+        sparse_dicts.setdefault(name, OrderedDict())[field] = value
+
+    kernels = {knl.weights.op.name: knl for knl in self._dense_kernels}
+    for name, d in sparse_dicts.items():
+      knl = kernels[name]
+      weights = sparse.to_dense(d)
+      knl.weights.load(weights, self._model.session)
+      knl.mask.load((weights != 0).astype(weights.dtype), self._model.session)
+      knl.weights_fraction = 100. * np.sum(weights != 0) / weights.size
+    tfr.console.show_status(
+      'Sparse checkpoint loaded from `{}`'.format(path), '[Sparse]')
+
+  # endregion : Sparse Execution
+
   # region : Private Methods
 
   def _run_op(self, ops, feed_dict=None):
@@ -137,21 +249,59 @@ class Pruner(object):
     assert isinstance(model, Model)
     return model.session.run(ops, feed_dict)
 
-  def _write_weight_and_mask_buffer(self, prompt='[Etch]'):
+  def _write_weight_and_mask_buffer(self, prompt='[Etch]', kernels=None):
     """Write weight and mask buffer to each etch kernel"""
-    fetches = [(knl.weights, knl.mask) for knl in self._dense_kernels]
+    if kernels is None: kernels = self._dense_kernels
+    fetches = [(knl.weights, knl.mask) for knl in kernels]
     buffers = self._run_op(fetches)
-    for (w_buffer, m_buffer), knl in zip(buffers, self._dense_kernels):
+    for (w_buffer, m_buffer), knl in zip(buffers, kernels):
       assert isinstance(knl, EtchKernel)
       knl.weights_buffer = w_buffer
       knl.mask_buffer = m_buffer
     if not tfr.hub.etch_quietly:
       tfr.console.show_status('Weights and mask buffers fetched.', prompt)
 
+  def _build_etch_op(self):
+    """Group assign ops of all kernels supporting in-graph etching"""
+    from tframe import tf
+    assign_ops, self._etch_fractions = [], []
+    with self._model.graph.as_default(), tf.name_scope('Etch'):
+      for knl in self._dense_kernels:
+        assert isinstance(knl, EtchKernel)
+        new_mask = knl.get_new_mask_tensor()
+        if new_mask is None: continue
+        self._in_graph_kernels.append(knl)
+        assign_ops.append(tf.assign(knl.mask, new_mask))
+        self._etch_fractions.append(100. * tf.reduce_mean(new_mask))
+      self._etch_op = tf.group(*assign_ops, name='etch_all')
+
+  def _etch_in_graph(self):
+    """Run in-graph etch op and return kernels to be etched in NumPy"""
+    if self._etch_op is None: self._build_etch_op()
+    if self._in_graph_kernels:
+      feed_dict = {}
+      for knl in self._in_graph_kernels:
+        feed_dict.update(knl.get_etch_feed_dict())
+      _, fractions = self._run_op(
+        [self._etch_op, self._etch_fractions], feed_dict)
+      for knl, frac in zip(self._in_graph_kernels, fractions):
+        knl.weights_fraction = frac
+    return [knl for knl in self._dense_kernels
+            if knl not in self._in_graph_kernels]
+
   def _update_kernels(self, ops, feed_dict):
     assert isinstance(ops, list) and isinstance(feed_dict, dict)
     self._run_op(ops, feed_dict)
 
+  def _get_inference_variables(self):
+    """Get variables to save excluding optimizer variables"""
+    from tframe import tf
+    from tframe import pedia
+    with self._model.graph.as_default():
+      variables = self._model.variable_to_save
+    return [v for v in variables if isinstance(v, tf.Variable)
+            and pedia.train_opt not in v.name and 'Optimizer' not in v.name]
+
   # endregion : Private Methods
 
   # region : Lottery 2018
@@ -0,0 +1,238 @@
+"""Sparse representations of etched weights.
+
+An etched kernel keeps dense weights and a dense mask of the same shape.
+When the weights fraction is small, masked weights can be converted to
+
+  (1) CSR: indptr, indices and values of the 2-D weight matrix, or
+  (2) BSR (block-sparse): indices and values of non-zero blocks,
+
+which are used in compact sparse checkpoints and executed with sparse
+matmul in inference graphs. Convolution kernels of shape
+[*filter_size, in_channels, out_channels] are treated as 2-D matrices of
+shape [prod(filter_size) * in_channels, out_channels] and are executed on
+image patches.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from collections import OrderedDict
+
+import numpy as np
+from tframe import tf
+
+
+CSR = 'csr'
+BSR = 'bsr'
+
+
+# region : Conversion
+
+def as_matrix(weights):
+  """Reshape a dense or convolution kernel to a 2-D matrix"""
+  weights = np.asarray(weights)
+  if len(weights.shape) < 2: raise AssertionError(
+    '!! Weights to be sparsified should have at least 2 dimensions')
+  return np.reshape(weights, [-1, weights.shape[-1]])
+
+
+def to_csr(weights):
+  """Convert masked weights to CSR format.
+
+  :param weights: masked weights of rank >= 2
+  :return: an OrderedDict with keys `shape`, `indptr`, `indices`, `values`
+  """
+  matrix = as_matrix(weights)
+  rows, cols = np.nonzero(matrix)
+  od = OrderedDict()
+  od['shape'] = np.array(np.shape(weights), dtype=np.int64)
+  od['indptr'] = np.concatenate(
+    [[0], np.cumsum(np.bincount(rows, minlength=matrix.shape[0]))]).astype(
+    np.int32)
+  od['indices'] = cols.astype(np.int32)
+  od['values'] = matrix[rows, cols]
+  return od
+
+
+def to_bsr(weights, block_shape):
+  """Convert masked weights to block-sparse format. A block is kept if any of
+     its entries is non-zero.
+
+  :param weights: masked weights of rank >= 2
+  :param block_shape: (block_rows, block_cols), should divide the shape of
+                      the 2-D matrix
+  :return: an OrderedDict with keys `shape`, `block_shape`, `block_rows`,
+           `block_cols`, `values`, in which values has shape
+           [num_blocks, *block_shape]
+  """
+  matrix = as_matrix(weights)
+  br, bc = check_block_shape(matrix.shape, block_shape)
+  R, C = matrix.shape[0] // br, matrix.shape[1] // bc
+  blocks = np.transpose(matrix.reshape(R, br, C, bc), [0, 2, 1, 3])
+  rows, cols = np.nonzero(np.any(blocks != 0, axis=(2, 3)))
+  od = OrderedDict()
+  od['shape'] = np.array(np.shape(weights), dtype=np.int64)
+  od['block_shape'] = np.array([br, bc], dtype=np.int64)
+  od['block_rows'] = rows.astype(np.int32)
+  od['block_cols'] = cols.astype(np.int32)
+  od['values'] = blocks[rows, cols]
+  return od
+
+
+def to_dense(sparse_dict):
+  """Convert a CSR or BSR dictionary back to dense weights"""
+  shape = [int(s) for s in sparse_dict['shape']]
+  values = sparse_dict['values']
+  matrix = np.zeros([int(np.prod(shape[:-1])), shape[-1]], dtype=values.dtype)
+  if 'indptr' in sparse_dict:
+    indptr = sparse_dict['indptr']
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    matrix[rows, sparse_dict['indices']] = values
+  else:
+    br, bc = [int(s) for s in sparse_dict['block_shape']]
+    for r, c, block in zip(
+        sparse_dict['block_rows'], sparse_dict['block_cols'], values):
+      matrix[r*br:(r+1)*br, c*bc:(c+1)*bc] = block
+  return matrix.reshape(shape)
+
+
+def get_format(sparse_dict):
+  return CSR if 'indptr' in sparse_dict else BSR
+
+
+def check_block_shape(matrix_shape, block_shape):
+  if not isinstance(block_shape, (tuple, list)) or len(block_shape) != 2:
+    raise TypeError('!! block_shape should be a tuple of 2 integers')
+  br, bc = [int(b) for b in block_shape]
+  if matrix_shape[0] % br != 0 or matrix_shape[1] % bc != 0:
+    raise AssertionError(
+      '!! block_shape {} does not divide weight matrix of shape {}'.format(
+        tuple(block_shape), tuple(matrix_shape)))
+  return br, bc
+
+# endregion : Conversion
+
+
+class SparseWeights(object):
+  """Constant sparse weights used in inference graphs. Instances are created
+     by Pruner.sparsify and returned by KernelBase._get_weights when the
+     pruner is linking a sparse inference graph."""
+
+  def __init__(self, weights, fmt=CSR, block_shape=None):
+    """
+    :param weights: dense masked weights (np.ndarray) or a sparse dict created
+                    by to_csr or to_bsr
+    :param fmt: `csr` or `bsr`, used only when weights is an np.ndarray
+    :param block_shape: block shape for `bsr` format
+    """
+    if isinstance(weights, np.ndarray):
+      if fmt == CSR: weights = to_csr(weights)
+      elif fmt == BSR: weights = to_bsr(weights, block_shape)
+      else: raise KeyError('!! Unknown sparse format `{}`'.format(fmt))
+    assert isinstance(weights, dict)
+    self.sparse_dict = weights
+    self.shape = [int(s) for s in weights['shape']]
+
+  # region : Properties
+
+  @property
+  def format(self):
+    return get_format(self.sparse_dict)
+
+  @property
+  def matrix_shape(self):
+    return [int(np.prod(self.shape[:-1])), self.shape[-1]]
+
+  @property
+  def nnz(self):
+    return int(self.sparse_dict['values'].size)
+
+  @property
+  def weights_fraction(self):
+    return 100. * self.nnz / np.prod(self.shape)
+
+  @property
+  def dense_tensor(self):
+    """Dense constant used by operations without sparse implementation"""
+    return tf.constant(to_dense(self.sparse_dict), name='dense_weights')
+
+  # endregion : Properties
+
+  # region : Public Methods
+
+  def matmul(self, x):
+    """Calculate x @ W for x of shape [..., input_dim]"""
+    n_in, n_out = self.matrix_shape
+    rank = len(x.shape)
+    with tf.name_scope('sparse_matmul'):
+      x_2d = tf.reshape(x, [-1, n_in]) if rank > 2 else x
+      if self.format == CSR: y = self._csr_matmul(x_2d)
+      else: y = self._bsr_matmul(x_2d)
+      if rank > 2:
+        # Keep static shape if only batch dimension is unknown
+        shape = x.shape.as_list()[1:-1]
+        if None in shape: shape = tf.concat(
+          [tf.shape(x)[:-1], [n_out]], axis=0)
+        else: shape = [-1] + shape + [n_out]
+        y = tf.reshape(y, shape)
+    return y
+
+  def conv(self, x, strides, dilations, padding):
+    """Perform 1-D or 2-D convolution as sparse matmul on image patches.
+       x should be channel-last."""
+    kernel_dim = len(self.shape) - 2
+    if kernel_dim not in (1, 2): raise AssertionError(
+      '!! Sparse convolution supports only 1-D and 2-D kernels')
+    strides, dilations = list(strides), list(dilations)
+    filter_size = self.shape[:-2]
+    # Treat 1-D convolution as 2-D convolution with height 1
+    if kernel_dim == 1:
+      x = tf.expand_dims(x, 1)
+      strides, dilations = [1] + strides, [1] + dilations
+      filter_size = [1] + filter_size
+
+    with tf.name_scope('sparse_conv'):
+      sizes, strides = [1] + filter_size + [1], [1] + strides + [1]
+      rates = [1] + dilations + [1]
+      # tf.image.extract_patches is not available before TF 1.14
+      if hasattr(tf.image, 'extract_patches'):
+        patches = tf.image.extract_patches(
+          x, sizes=sizes, strides=strides, rates=rates, padding=padding)
+      else: patches = tf.extract_image_patches(
+        x, ksizes=sizes, strides=strides, rates=rates, padding=padding)
+      y = self.matmul(patches)
+
+    if kernel_dim == 1: y = tf.squeeze(y, axis=1)
+    return y
+
+  # endregion : Public Methods
+
+  # region : Private Methods
+
+  def _csr_matmul(self, x):
+    """x @ W = (W^T @ x^T)^T, in which W^T is a SparseTensor"""
+    n_in, n_out = self.matrix_shape
+    sd = self.sparse_dict
+    rows = np.repeat(np.arange(n_in), np.diff(sd['indptr']))
+    cols = sd['indices']
+    # Indices of SparseTensor should be in canonical row-major order
+    order = np.lexsort((rows, cols))
+    w_t = tf.SparseTensor(
+      indices=np.stack([cols[order], rows[order]], axis=1).astype(np.int64),
+      values=sd['values'][order], dense_shape=[n_out, n_in])
+    return tf.transpose(
+      tf.sparse.sparse_dense_matmul(w_t, x, adjoint_b=True))
+
+  def _bsr_matmul(self, x):
+    """Gather input blocks, multiply them with non-zero weight blocks and sum
+       the results into output blocks"""
+    n_in, n_out = self.matrix_shape
+    sd = self.sparse_dict
+    br, bc = [int(s) for s in sd['block_shape']]
+    x = tf.reshape(x, [-1, n_in // br, br])
+    x = tf.gather(x, sd['block_rows'], axis=1)
+    y = tf.einsum('bki,kio->kbo', x, tf.constant(sd['values']))
+    y = tf.unsorted_segment_sum(y, sd['block_cols'], n_out // bc)
+    return tf.reshape(tf.transpose(y, [1, 0, 2]), [-1, n_out])
+
+  # endregion : Private Methods
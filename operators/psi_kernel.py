@@ -14,6 +14,8 @@ from tframe import initializers
 from typing import Optional
 
 from .kernel_base import KernelBase
+from .prune.sparse import SparseWeights
+from tframe.utils.hoist import hoisted_matmul
 
 
 class PsiKernel(KernelBase):
@@ -33,6 +35,7 @@ class PsiKernel(KernelBase):
                strides=1,
                padding='SAME',
                dilations=1,
+               input_parts=None,
                **kwargs):
 
     # Call parent's initializer
@@ -43,6 +46,8 @@ class PsiKernel(KernelBase):
     self.suffix = checker.check_type(suffix, str)
     self.LN = checker.check_type(LN, bool)
     self.gain_initializer = initializers.get(gain_initializer)
+    # Tensors concatenated to produce input_, see tframe.utils.hoist
+    self.input_parts = input_parts
 
     # Attributes for convolutional operators
     # Check filter size for convolutional operations
@@ -124,7 +129,12 @@ class PsiKernel(KernelBase):
     else: filter_shape += [self.input_dim, self.num_units]
 
     # Get filter if not provided
-    if kernel is None: kernel = self._get_weights('kernel', shape=filter_shape)
+    if kernel is None:
+      kernel = self._get_weights(
+        'kernel', shape=filter_shape, allow_sparse=not transpose)
+      # Execute etched kernel with sparse matmul in sparse inference graph
+      if isinstance(kernel, SparseWeights): return kernel.conv(
+        self.input_, self.strides, self.dilations, self.padding)
 
     # Define convolution method
     if conv.__name__ == 'conv1d':
@@ -188,10 +198,15 @@ class PsiKernel(KernelBase):
     return y
 
   def dense(self):
-    W = self._get_weights('W', shape=[self.input_dim, self.num_units])
+    W = self._get_weights(
+      'W', shape=[self.input_dim, self.num_units], allow_sparse=True)
+    if isinstance(W, SparseWeights): return W.matmul(self.input_)
     rank = len(self.input_.shape)
     if rank > 2: return tf.tensordot(self.input_, W, [[rank - 1], [0]])
-    return self.input_ @ W
+    # Random weight dropout masks can not be shared across steps
+    return hoisted_matmul(
+      self.input_, W, self.input_parts or [self.input_],
+      hoistable=self.weight_dropout == 0)
 
   def sparse_sog(self, axis, group_size):
     """Given x of shape (bs, dim_x)
@@ -24,9 +24,26 @@ class Optimizer(object):
     self.reset_tf_optimizer = None
 
 
-  def minimize(self, loss, var_list=None):
+  def minimize(self, loss, var_list=None, tower_weights=None):
+    update = self.get_update_op(loss, var_list, tower_weights)
+    # Set reset_tf_optimizer if necessary
+    if th.reset_optimizer_after_resurrection and th.lives > 0:
+      self.reset_tf_optimizer = tf.variables_initializer(
+        self.tf_optimizer.variables())
+    return update
+
+
+  def get_update_op(self, loss, var_list=None, tower_weights=None):
+    """Get update operation without touching other attributes of this
+       optimizer. This method can be called inside a tf.while_loop as long as
+       slots of tf_optimizer have been created outside, e.g., by calling
+       `minimize` in advance.
+
+       If loss is a list of tower losses, gradients of each tower will be
+       computed separately and averaged with tower_weights."""
     # Step 1: compute gradients
-    grads_and_vars = self._compute_gradients(loss, var_list=var_list)
+    grads_and_vars = self._compute_gradients(
+      loss, var_list=var_list, tower_weights=tower_weights)
     # Step 2: apply gradients
     update = self.tf_optimizer.apply_gradients(grads_and_vars)
     # Step 3: apply decoupled weight decay if required
@@ -37,20 +54,20 @@ class Optimizer(object):
         update_with_decay = tf.group(*[
           tf.assign_sub(v, v * th.decoupled_l2_penalty) for v in vars_to_decay])
       update = update_with_decay
-    # Set reset_tf_optimizer if necessary
-    if th.reset_optimizer_after_resurrection and th.lives > 0:
-      self.reset_tf_optimizer = tf.variables_initializer(
-        self.tf_optimizer.variables())
     return update
 
 
-  def _compute_gradients(self, loss, var_list=None):
-    # Sanity check
-    assert isinstance(loss, tf.Tensor)
-
-    # Compute gradients using default method
-    grads_and_vars = self.tf_optimizer.compute_gradients(
-      loss, var_list=var_list)
+  def _compute_gradients(self, loss, var_list=None, tower_weights=None):
+    if isinstance(loss, (list, tuple)):
+      # Compute gradients of each tower and average them
+      grads_and_vars = self._average_tower_gradients(
+        loss, tower_weights, var_list=var_list)
+    else:
+      # Sanity check
+      assert isinstance(loss, tf.Tensor)
+      # Compute gradients using default method
+      grads_and_vars = self.tf_optimizer.compute_gradients(
+        loss, var_list=var_list)
 
     # Deal with Nan if required
     if th.opt_nan_protection: grads_and_vars = [
@@ -69,6 +86,40 @@ class Optimizer(object):
     return grads_and_vars
 
 
+  def _average_tower_gradients(self, losses, weights, var_list=None):
+    """Average gradients of tower losses. Since towers share variables,
+       grads_and_vars lists of all towers are aligned."""
+    if weights is None: weights = [1.0 / len(losses)] * len(losses)
+    assert len(weights) == len(losses)
+    tower_grads = []
+    for i, loss in enumerate(losses):
+      assert isinstance(loss, tf.Tensor)
+      with tf.name_scope('Tower_{}_grads'.format(i)):
+        tower_grads.append(self.tf_optimizer.compute_gradients(
+          loss, var_list=var_list))
+
+    grads_and_vars = []
+    with tf.name_scope('Average_grads'):
+      for gvs in zip(*tower_grads):
+        var = gvs[0][1]
+        assert all([v is var for _, v in gvs])
+        pairs = [(g, w) for (g, _), w in zip(gvs, weights) if g is not None]
+        grads_and_vars.append((self._weighted_sum(pairs), var))
+    return grads_and_vars
+
+  @staticmethod
+  def _weighted_sum(pairs):
+    """Sum weighted gradients. Sparse gradients (e.g. of embeddings) are
+       kept sparse by concatenating their values and indices"""
+    if not pairs: return None
+    if all([isinstance(g, tf.IndexedSlices) for g, _ in pairs]):
+      return tf.IndexedSlices(
+        tf.concat([w * g.values for g, w in pairs], axis=0),
+        tf.concat([g.indices for g, _ in pairs], axis=0),
+        pairs[0][0].dense_shape)
+    return tf.add_n([w * tf.convert_to_tensor(g) for g, w in pairs])
+
+
   # region: Static and class methods
 
   @staticmethod
@@ -26,6 +26,8 @@ class DynamicEvaluator(object):
          (2.2) set th.de_max_batches to specify max batches used for calculating
                gradient statistics
          (2.3) specify th.de_eta and th.de_lambda to fix corresponding HP
+         (2.4) set th.de_save_train_stats to save gradient statistics to a
+               DeStat checkpoint, which will be restored in later runs
      (3) set de_num_steps. For character level model it should be approx 20.
          For word level model, it should be approx 5. (according to krause18)
 
@@ -90,7 +92,8 @@ class DynamicEvaluator(object):
     self.optimizer.reset_parameters()
     # Set HP to optimizer
     self.optimizer.set_hyper_parameters(lr, lambd)
-    # Do dynamic evaluation
+    # Do dynamic evaluation. Batch size must be 1 since parameter updates
+    # .. are shared by all sequences in a batch
     output = self.model.evaluate(
       self._dynamic_fetches, data_set, batch_size=1, verbose=True,
       num_steps=th.de_num_steps)[0]
@@ -104,7 +107,9 @@ class DynamicEvaluator(object):
     assert isinstance(data_set, DataSet)
 
   def _search_hp(self, val_set, hp_grid):
-    """TODO: this method is supposed to be put inside KrauseEvaluator"""
+    """TODO: this method is supposed to be put inside KrauseEvaluator.
+       Grid points are evaluated one by one since each of them requires its
+       own copy of model parameters."""
     assert isinstance(val_set, DataSet)
     # Truncate val_set if necessary
     if isinstance(val_set, SequenceSet):
@@ -256,7 +256,17 @@ class Trainer(Nomear):
 
   def _check_model(self):
     if not self.model.launched:
-      self.model.launch_model(self.th.overwrite)
+      # Thread pools are tuned with training batches if required. RNN models
+      #   are excluded since their state buffers would be polluted. Batches
+      #   are generated with is_training=False so that the dynamic round
+      #   length of training set will not be touched
+      tune_batches = None
+      if all([self.th.auto_tune_threads,
+              self.model.input_type is InputTypes.BATCH]):
+        tune_batches = self.model.get_data_batches(
+          self.training_set, self.effective_batch_size, self.th.num_steps,
+          shuffle=False, is_training=False)
+      self.model.launch_model(self.th.overwrite, tune_batches=tune_batches)
     # Check model.epoch
     if not self.is_online and self.model.rounds is None: self.model.rounds = 0
 
@@ -311,6 +321,8 @@ class Trainer(Nomear):
         break_flag = False
       # Break if needed to
       if break_flag: break
+      # Stop if this trial is not promoted by ASHA scroll
+      if self._asha_stop(rnd): break
 
     # Out of loop
     if hub.gather_note:
@@ -358,51 +370,121 @@ class Trainer(Nomear):
     self._record_count = 0
     # Begin iteration
     self.th.cursor = 0
-    for i, batch in enumerate(self._gen_batches()):
-      # Sanity check (make sure sequence batch is equal-length)
-      self._check_data_batch(batch)
+    if self.th.steps_per_run > 1: self._inner_loop_in_graph(rnd)
+    elif self.th.use_tf_data: self._inner_loop_with_tf_data(rnd)
+    else:
+      for i, batch in enumerate(self._gen_batches()):
+        # Sanity check (make sure sequence batch is equal-length)
+        self._check_data_batch(batch)
+        # Increase iteration counter
+        self.th.cursor += 1
+        self.counter += 1
+        # Update model
+        loss_dict = self._update_model(batch)
+        # Increase lr global step if necessary
+        if self.th.lr_decay_enabled: context.increase_lr_global_step()
+        # Validate, etch, probe, etc.
+        if self._end_iteration(rnd, i, loss_dict): break
+    # Check warm up logic
+    if self._warm_up and self._record_count < self.th.warm_up_thres:
+      self._warm_up = False
+
+  def _inner_loop_in_graph(self, rnd):
+    """Each session.run call executes th.steps_per_run updates. Host-side
+       logic such as validation is performed after the loop update for each
+       update step in order, so that counters stay correct."""
+    if self.th.use_dynamic_ground_truth: raise AssertionError(
+      '!! Dynamic ground truth is not supported when steps_per_run > 1')
+    i = 0
+    for batches in self._gen_batch_groups():
+      for batch in batches: self._check_data_batch(batch)
+      if len(batches) == self.th.steps_per_run:
+        loss_dicts = self._update_model_in_loop(batches)
+      else:
+        # The remaining batches are consumed one by one
+        loss_dicts = [None] * len(batches)
+      for j, batch in enumerate(batches):
+        # Increase iteration counter
+        self.th.cursor += 1
+        self.counter += 1
+        loss_dict = loss_dicts[j]
+        if loss_dict is None:
+          loss_dict = self._update_model(batch)
+          if self.th.lr_decay_enabled: context.increase_lr_global_step()
+        # Validate, etch, probe, etc.
+        if self._end_iteration(rnd, i, loss_dict): return
+        i += 1
+
+  def _inner_loop_with_tf_data(self, rnd):
+    """Training batches are generated by context.data_pipeline inside the
+       graph so that input preparation overlaps with training steps. A round
+       ends after round length updates or when the iterator is exhausted."""
+    if self.model.input_type is not InputTypes.BATCH: raise AssertionError(
+      '!! tf.data input path only supports feed-forward models')
+    if context.data_pipeline is None: raise AssertionError(
+      '!! Data pipeline not found. Model should be built with use_tf_data on')
+    # Round length is set by gen_batches in the feed_dict path. Here it is
+    #   set only by trainer, generators in pipeline will not touch it
+    training_set, round_len = self.training_set, None
+    if isinstance(training_set, DataSet):
+      round_len = training_set.get_round_length(
+        self.effective_batch_size, training=True)
+    context.data_pipeline.initialize(
+      self.session, training_set, self.effective_batch_size, self.th.shuffle)
+    i = 0
+    while round_len is None or i < round_len:
       # Increase iteration counter
       self.th.cursor += 1
       self.counter += 1
       # Update model
-      loss_dict = self._update_model(batch)
+      try: loss_dict = self._update_model(None)
+      except tf.errors.OutOfRangeError:
+        self.th.cursor -= 1
+        self.counter -= 1
+        break
       # Increase lr global step if necessary
       if self.th.lr_decay_enabled: context.increase_lr_global_step()
-      # Print progress
-      self._print_progress(rnd, loss_dict)
-
-      # Validation
-      if self._validate_model(rnd) and self._save_model_when_record_appears:
-        if not self.is_online: assert np.isscalar(self.th.round_progress)
-        self._save_model(inter_cut=True, progress=self.th.round_progress)
-      # Etch (i begins from 0, while rnd begins from 1)
-      if self.is_online:
-        if i >= self.th.etch_warm_up_steps: self._etch()
-      elif rnd > self.th.etch_warm_up_rounds: self._etch()
-      # Probe
-      self._run_probe()
-      # Take notes
-      self._take_notes_for_export()
-
-      # Check early stop condition
-      if self.is_online:
-        if self.th.max_iterations is not None:
-          if i + 1 >= self.th.max_iterations:
-            self.th.force_terminate = True
-        if self.th.early_stop:
-          if self.key_metric.get_idle_counts(self.counter) > self.th.patience:
-            self.th.force_terminate = True
-      # After probing, training process may be terminated
-      if self.th.force_terminate:
-        # If model will be resurrected later, dynamic_round_len if train_set
-        # should be set to None. Otherwise error may occur TODO
-        if hasattr(self.training_set, '_clear_dynamic_round_len'):
-          # Perpetual Machine does not have this method
-          self.training_set._clear_dynamic_round_len()
-        break
-    # Check warm up logic
-    if self._warm_up and self._record_count < self.th.warm_up_thres:
-      self._warm_up = False
+      # Validate, etch, probe, etc.
+      if self._end_iteration(rnd, i, loss_dict): break
+      i += 1
+    if isinstance(training_set, DataSet):
+      training_set._clear_dynamic_round_len()
+
+  def _end_iteration(self, rnd, i, loss_dict):
+    """Called after each update. Returns True if inner loop should break."""
+    # Print progress
+    self._print_progress(rnd, loss_dict)
+
+    # Validation
+    if self._validate_model(rnd) and self._save_model_when_record_appears:
+      if not self.is_online: assert np.isscalar(self.th.round_progress)
+      self._save_model(inter_cut=True, progress=self.th.round_progress)
+    # Etch (i begins from 0, while rnd begins from 1)
+    if self.is_online:
+      if i >= self.th.etch_warm_up_steps: self._etch()
+    elif rnd > self.th.etch_warm_up_rounds: self._etch()
+    # Probe
+    self._run_probe()
+    # Take notes
+    self._take_notes_for_export()
+
+    # Check early stop condition
+    if self.is_online:
+      if self.th.max_iterations is not None:
+        if i + 1 >= self.th.max_iterations:
+          self.th.force_terminate = True
+      if self.th.early_stop:
+        if self.key_metric.get_idle_counts(self.counter) > self.th.patience:
+          self.th.force_terminate = True
+    # After probing, training process may be terminated
+    if self.th.force_terminate:
+      # If model will be resurrected later, dynamic_round_len if train_set
+      # should be set to None. Otherwise error may occur TODO
+      if hasattr(self.training_set, '_clear_dynamic_round_len'):
+        # Perpetual Machine does not have this method
+        self.training_set._clear_dynamic_round_len()
+      return True
+    return False
 
   def _reset_lr_decay_variables(self):
     if not self.th.lr_decay_enabled: return
@@ -513,7 +595,9 @@ class Trainer(Nomear):
 
     # Update model
     loss_dict = self.model.update_model(data_batch=data_batch)
+    return self._process_loss_dict(loss_dict)
 
+  def _process_loss_dict(self, loss_dict):
     # Get and process loss slots
     # assert len(loss_slots) > 0
     loss_slots = [s for s in loss_dict.keys() if s.name == 'Loss']
@@ -547,6 +631,11 @@ class Trainer(Nomear):
 
     return loss_dict
 
+  def _update_model_in_loop(self, data_batches):
+    if self.th.tic_toc: self.th.tic(key='__update')
+    loss_dicts = self.model.update_model_in_loop(data_batches)
+    return [self._process_loss_dict(d) for d in loss_dicts]
+
   def _check_data(self, data_set=None, name='dataset'):
     if data_set is None:
       data_set = self._training_set
@@ -578,6 +667,22 @@ class Trainer(Nomear):
       self.training_set, self.effective_batch_size, self.th.num_steps,
       self.th.shuffle, is_training=True)
 
+  def _gen_batch_groups(self):
+    """Group batches into lists of length th.steps_per_run so that they can
+       be stacked and fed into model in a single session.run call. A batch
+       whose size differs from the previous ones (e.g., the last batch in an
+       epoch) will close the current group."""
+    group = []
+    for batch in self._gen_batches():
+      if group and batch.size != group[0].size:
+        yield group
+        group = []
+      group.append(batch)
+      if len(group) == self.th.steps_per_run:
+        yield group
+        group = []
+    if group: yield group
+
   @staticmethod
   def _check_data_batch(batch):
     assert isinstance(batch, DataSet)
@@ -586,6 +691,22 @@ class Trainer(Nomear):
     #   if max(batch.active_length) > min(batch.active_length):
     #     raise ValueError('!! Sequence batches must be equal-length')
 
+  def _asha_stop(self, rnd):
+    """Report best record to ASHA rung board and decide whether to stop"""
+    from tframe.alchemy.scrolls.asha import RungBoard
+    if self.th.asha_board is None or self.is_online: return False
+    if rnd not in RungBoard.get_rungs(self.th.asha_rungs): return False
+    value = self.metrics_manager.early_stop_criterion
+    if value is None: return False
+    board = RungBoard(self.th.asha_board, self.th.asha_eta)
+    if board.report(self.th.asha_trial, rnd, value,
+                    self.key_metric.lower_is_better):
+      console.show_status('Promoted at rung {}'.format(rnd), '[ASHA]')
+      return False
+    console.show_status('Stopped at rung {}'.format(rnd), '[ASHA]')
+    self.model.agent.take_notes('Stopped by ASHA at round {}'.format(rnd))
+    return True
+
   def _advanced_strategy(self, rnd):
     """Should be overridden"""
     pass
@@ -734,9 +855,12 @@ class Trainer(Nomear):
 
     # Validate val_set and record
     if self.th.tic_toc: self.th.tic('__validate')
+    tracer = self.model.agent.tracer
+    tracer.begin_validation()
     val_dict = self.model.validate_model(
       self.validation_set, self.th.val_batch_size, allow_sum=self.th.summary,
       verbose=self.th.val_progress_bar, seq_detail=self.th.val_info_splits > 0)
+    tracer.end_validation()
 
     if self.th.tic_toc:
       time_elapsed = self.th.toc('__validate') * 1000
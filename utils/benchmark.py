@@ -0,0 +1,199 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import re
+import subprocess
+import sys
+import time
+
+from tframe import console
+
+
+def time_update_steps(model, data_set, batch_size, steps=50, warm_up=5):
+  """Time model.update_model on batches generated from data_set.
+
+  :param model: a built and launched model
+  :param data_set: a DataSet from which training batches will be drawn
+  :param batch_size: batch size
+  :param steps: number of timed update steps
+  :param warm_up: number of update steps run before timing
+  :return: average seconds per update step
+  """
+  def gen_batches():
+    while True:
+      for batch in data_set.gen_batches(batch_size, shuffle=True):
+        yield batch
+
+  batches = gen_batches()
+  for _ in range(warm_up): model.update_model(next(batches))
+  tic = time.time()
+  for _ in range(steps): model.update_model(next(batches))
+  return (time.time() - tic) / steps
+
+
+# region : Tower scaling benchmark
+
+_RESULT_PATTERN = r'\[Benchmark\] towers = (\d+), sec/step = ([0-9.e-]+)'
+
+
+def report_tower_result(num_towers, sec_per_step):
+  """Called by child process to report result to tower_scaling"""
+  print('[Benchmark] towers = {}, sec/step = {}'.format(
+    num_towers, sec_per_step))
+
+
+def tower_scaling(script_path, tower_counts=(1, 2, 4, 8), batch_size=None,
+                  extra_args=()):
+  """Run script_path with --num_towers=N for each N in tower_counts. Each run
+     is executed in a separate process (so that each model is built in a
+     fresh graph) and should call report_tower_result. A scaling table will
+     be printed in the end.
+
+  :return: a list of (N, sec_per_step) tuples
+  """
+  results = []
+  for n in tower_counts:
+    cmd = [sys.executable, script_path, '--num_towers={}'.format(n)]
+    if batch_size is not None: cmd.append('--batch_size={}'.format(batch_size))
+    cmd += list(extra_args)
+    console.show_status('Executing `{}` ...'.format(' '.join(cmd)))
+    output = subprocess.run(
+      cmd, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    matches = re.findall(_RESULT_PATTERN, output)
+    if not matches:
+      console.warning('No result found for {} towers'.format(n))
+      continue
+    results.append((int(matches[-1][0]), float(matches[-1][1])))
+
+  # Show scaling table
+  if not results: return results
+  base = results[0][1]
+  console.section('Tower Scaling')
+  console.supplement('{:>6}  {:>12}  {:>8}'.format('Towers', 'ms/step',
+                                                   'Speedup'), level=2)
+  for n, sec in results:
+    console.supplement('{:>6}  {:>12.2f}  {:>8.2f}'.format(
+      n, sec * 1000, base / sec), level=2)
+  return results
+
+# endregion : Tower scaling benchmark
+
+# region : Sparse execution benchmark
+
+def sparse_latency(kernel_shape, sample_shape,
+                   fractions=(100, 50, 20, 10, 5, 2), block_shape=(4, 4),
+                   batch_size=32, steps=50, warm_up=5):
+  """Compare latency of masked dense kernels, which is how etched hyper Dense
+     and Conv2D layers are executed during training, with CSR and block-sparse
+     (BSR) kernels executed by SparseWeights. Masks for dense and CSR kernels
+     are unstructured (by weight magnitude) while masks for BSR kernels are
+     block-structured with the same weights fraction.
+
+  :param kernel_shape: [input_dim, output_dim] for dense layers or
+                       [height, width, in_channels, out_channels] for conv2d
+  :param sample_shape: shape of each input sample
+  :param fractions: weights fractions (%) to be benchmarked
+  :return: a list of (fraction, dense_ms, csr_ms, bsr_ms, dense_kb, csr_kb)
+  """
+  import numpy as np
+  from tframe import tf
+  from tframe.operators.prune import sparse
+
+  is_conv = len(kernel_shape) == 4
+  w = np.random.randn(*kernel_shape).astype(np.float32)
+  x = np.random.randn(batch_size, *sample_shape).astype(np.float32)
+
+  def block_mask(frac):
+    matrix = sparse.as_matrix(w)
+    br, bc = sparse.check_block_shape(matrix.shape, block_shape)
+    R, C = matrix.shape[0] // br, matrix.shape[1] // bc
+    keep = np.random.rand(R, C) < frac / 100.
+    mask = np.kron(keep, np.ones([br, bc], dtype=np.float32))
+    return mask.reshape(kernel_shape).astype(np.float32)
+
+  def time_op(sess, op, feed_dict):
+    for _ in range(warm_up): sess.run(op, feed_dict)
+    tic = time.time()
+    for _ in range(steps): sess.run(op, feed_dict)
+    return (time.time() - tic) / steps * 1000
+
+  results = []
+  for frac in fractions:
+    mask = (np.abs(w) >= np.percentile(np.abs(w), 100 - frac)).astype(
+      np.float32)
+    with tf.Graph().as_default():
+      x_ph = tf.placeholder(tf.float32, [None] + list(sample_shape))
+      masked = tf.Variable(w) * tf.Variable(mask)
+      csr = sparse.SparseWeights(w * mask, sparse.CSR)
+      bsr = sparse.SparseWeights(w * block_mask(frac), sparse.BSR, block_shape)
+      if is_conv:
+        ops = [tf.nn.conv2d(x_ph, masked, [1, 1, 1, 1], 'SAME')] + [
+          sw.conv(x_ph, [1, 1], [1, 1], 'SAME') for sw in (csr, bsr)]
+      else: ops = [x_ph @ masked] + [sw.matmul(x_ph) for sw in (csr, bsr)]
+      with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        ms = [time_op(sess, op, {x_ph: x}) for op in ops]
+    dense_kb = 2 * w.nbytes / 1024
+    csr_kb = sum([a.nbytes for a in csr.sparse_dict.values()]) / 1024
+    results.append((frac, ms[0], ms[1], ms[2], dense_kb, csr_kb))
+
+  # Show table
+  console.section('Sparse Execution {}'.format(list(kernel_shape)))
+  fmt = '{:>8}  {:>10}  {:>10}  {:>10}  {:>10}  {:>10}'
+  console.supplement(fmt.format('Frac(%)', 'Dense(ms)', 'CSR(ms)', 'BSR(ms)',
+                                'Dense(KB)', 'CSR(KB)'), level=2)
+  fmt = '{:>8.1f}  {:>10.3f}  {:>10.3f}  {:>10.3f}  {:>10.1f}  {:>10.1f}'
+  for r in results: console.supplement(fmt.format(*r), level=2)
+  return results
+
+# endregion : Sparse execution benchmark
+
+# region : Import time benchmark
+
+_IMPORT_SNIPPET = """
+import time
+tic = time.perf_counter()
+import {module}
+{access}
+print('[Benchmark] sec = {{}}'.format(time.perf_counter() - tic))
+"""
+
+
+def import_time(module='tframe', attributes=('', 'models', 'DefaultHub'),
+                repeats=5):
+  """Measure start-up cost of `import module` in fresh interpreters. For each
+     attribute in attributes, the module is imported and the attribute is
+     accessed afterwards, so that the cost of lazily imported attributes can
+     be compared with that of the bare import (attribute '').
+
+  :return: a list of (statement, median seconds)
+  """
+  import numpy as np
+
+  results = []
+  for attr in attributes:
+    access = '{}.{}'.format(module, attr) if attr else ''
+    code = _IMPORT_SNIPPET.format(module=module, access=access)
+    seconds = []
+    for _ in range(repeats):
+      output = subprocess.run(
+        [sys.executable, '-c', code], stdout=subprocess.PIPE,
+        universal_newlines=True).stdout
+      matches = re.findall(r'\[Benchmark\] sec = ([0-9.e-]+)', output)
+      if matches: seconds.append(float(matches[-1]))
+    if not seconds:
+      console.warning('Failed to import `{}`'.format(module))
+      continue
+    statement = 'import {}'.format(module) + (
+      '; ' + access if access else '')
+    results.append((statement, float(np.median(seconds))))
+
+  # Show table
+  console.section('Import Time (median of {})'.format(repeats))
+  for statement, sec in results:
+    console.supplement('{:<40}  {:>8.1f} ms'.format(statement, sec * 1000),
+                       level=2)
+  return results
+
+# endregion : Import time benchmark
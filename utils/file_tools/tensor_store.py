@@ -0,0 +1,528 @@
+"""Disk storage of tensor histories in notes.
+
+Each leaf of a (nested) tensor dict, i.e., a list of numpy arrays with the
+same shape and dtype taken down at each note step, is appended to a raw
+binary file inside a store directory. Leaves are described in `meta.json`
+and are mapped from disk on demand by MappedTensors, so that tensor viewer
+does not need to materialize the whole history in memory. Leaves whose
+arrays differ in shape or dtype are kept inline in the pickled note.
+
+A StoragePolicy can be assigned to each leaf to store arrays in float16 or
+quantized form, to encode differences between consecutive arrays and to
+downsample old steps. Such leaves are read by EncodedTensors, which has the
+same length as the note steps so that policies are transparent to viewers.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import bisect
+import fnmatch
+import json
+import os
+import shutil
+from collections import OrderedDict
+
+import numpy as np
+
+
+# region : Storage policies
+
+PARAMS_SUFFIX = '.params'
+
+
+class StoragePolicy(object):
+  """How a tensor history is stored in a tensor store, described by a
+     comma-separated string of options:
+
+       f16       store arrays in float16
+       q8, q16   quantize each stored array linearly to 8 or 16 bits
+       delta=K   store differences between consecutive stored arrays with a
+                 key array every K arrays (K = 16 by default)
+       log=R     keep the latest R steps and thin older steps by factors of 2
+                 (R = 10 by default)
+       budget=N  keep at most N steps, thinning old steps evenly
+
+     Differences are taken against reconstructed arrays so that errors do not
+     accumulate. Encodings apply only to floating-point arrays.
+  """
+
+  def __init__(self, spec=''):
+    self.spec = spec
+    self.float16 = False
+    self.bits = 0
+    self.delta = 0
+    self.log = 0
+    self.budget = 0
+    for option in [o.strip() for o in spec.split(',') if o.strip()]:
+      name, _, value = option.partition('=')
+      if name in ('f16', 'float16'): self.float16 = True
+      elif name in ('q8', 'q16'): self.bits = int(name[1:])
+      elif name == 'delta': self.delta = int(value) if value else 16
+      elif name == 'log': self.log = int(value) if value else 10
+      elif name == 'budget': self.budget = int(value)
+      else: raise KeyError(
+        '!! Unknown tensor storage option `{}`'.format(option))
+    # Sanity check
+    if self.float16 and self.bits: raise AssertionError(
+      '!! f16 and quantization can not be used together')
+    if self.log and self.budget: raise AssertionError(
+      '!! log and budget can not be used together')
+    if min(self.delta, self.log, self.budget) < 0 or self.budget == 1:
+      raise AssertionError(
+        '!! Illegal tensor storage policy `{}`'.format(spec))
+
+  @property
+  def downsamples(self):
+    return self.log > 0 or self.budget > 0
+
+  def encodes(self, dtype):
+    return (bool(self.float16 or self.bits or self.delta) and
+            np.issubdtype(np.dtype(dtype), np.floating))
+
+  def get_store_dtype(self, dtype):
+    if not self.encodes(dtype): return np.dtype(dtype).str
+    if self.float16: return np.dtype(np.float16).str
+    if self.bits: return np.dtype('uint{}'.format(self.bits)).str
+    return np.dtype(dtype).str
+
+  def kept(self, steps, n):
+    """Return steps (ascending) to be kept when there are n steps in total.
+       A step dropped will never be kept again as n grows."""
+    if self.log > 0:
+      return [i for i in steps if i % 2 ** (
+        ((n - 1 - i) // self.log + 1).bit_length() - 1) == 0]
+    if self.budget > 0:
+      stride = 1
+      while (n - 1) // stride + 2 > self.budget: stride *= 2
+      return [i for i in steps if i % stride == 0 or i == n - 1]
+    return list(steps)
+
+  def encode(self, x, store_dtype, prev=None):
+    """Encode array x against the reconstruction of previous stored array
+       (None for key arrays).
+
+    :return: (stored array, (offset, scale), reconstruction in float64)
+    """
+    target = np.asarray(x, dtype=np.float64)
+    if prev is not None: target = target - prev
+    params = (0., 1.)
+    if self.bits:
+      lo, hi = np.min(target), np.max(target)
+      scale = (hi - lo) / (2 ** self.bits - 1)
+      if scale == 0: scale = 1.
+      stored = np.round((target - lo) / scale).astype(store_dtype)
+      params = (lo, scale)
+    else: stored = target.astype(store_dtype)
+    return stored, params, self.decode(stored, params, prev)
+
+  @staticmethod
+  def decode(stored, params, prev=None):
+    lo, scale = params
+    x = np.asarray(stored, dtype=np.float64) * scale + lo
+    return x if prev is None else prev + x
+
+
+def parse_policies(config):
+  """Parse a string like '*/W*:q8,delta;*grads*:f16,log' into a function
+     mapping key paths of leaves to StoragePolicy (or None). Rules are matched
+     in order against '/'.join(keys) using fnmatch. A rule without pattern
+     applies to all leaves."""
+  rules = []
+  for rule in (config or '').split(';'):
+    if not rule.strip(): continue
+    pattern, spec = rule.rsplit(':', 1) if ':' in rule else ('*', rule)
+    rules.append((pattern.strip(), StoragePolicy(spec.strip())))
+
+  def get_policy(keys):
+    name = '/'.join([str(k) for k in keys])
+    for pattern, policy in rules:
+      if fnmatch.fnmatchcase(name, pattern): return policy
+    return None
+
+  return get_policy
+
+# endregion : Storage policies
+
+
+# region : Lazy sequences
+
+class TensorSequence(object):
+  """Base class of read-only sequences of numpy arrays which are loaded or
+     calculated on demand. Recently accessed items are cached."""
+
+  CACHE_SIZE = 8
+
+  def __init__(self):
+    self._cache = OrderedDict()
+    self._range = None
+
+  def __len__(self): raise NotImplementedError
+
+  def _get(self, i): raise NotImplementedError
+
+  def __getitem__(self, i):
+    if isinstance(i, slice):
+      return [self[j] for j in range(*i.indices(len(self)))]
+    if i < 0: i += len(self)
+    if not 0 <= i < len(self): raise IndexError(
+      '!! Index {} out of range [0, {})'.format(i, len(self)))
+    if i in self._cache:
+      self._cache.move_to_end(i)
+      return self._cache[i]
+    value = self._get(i)
+    self._cache[i] = value
+    if len(self._cache) > self.CACHE_SIZE: self._cache.popitem(last=False)
+    return value
+
+  def __iter__(self):
+    for i in range(len(self)): yield self[i]
+
+  @property
+  def value_range(self):
+    """(min, max) over all arrays, calculated by streaming through steps"""
+    if self._range is None:
+      lo, hi = np.inf, -np.inf
+      for i in range(len(self)):
+        a = self._get(i)
+        lo, hi = min(lo, np.min(a)), max(hi, np.max(a))
+      self._range = (lo, hi)
+    return self._range
+
+
+class MappedTensors(TensorSequence):
+  """Arrays mapped from a raw binary file of shape [length, *shape]"""
+
+  def __init__(self, path, dtype, shape, length):
+    super(MappedTensors, self).__init__()
+    self.path = path
+    self.dtype = np.dtype(dtype)
+    self.shape = tuple(shape)
+    self.length = length
+    self._memmap = None
+
+  def __len__(self):
+    return self.length
+
+  def __getstate__(self):
+    state = self.__dict__.copy()
+    state['_memmap'], state['_cache'] = None, OrderedDict()
+    return state
+
+  def _get(self, i):
+    if self._memmap is None:
+      self._memmap = np.memmap(self.path, dtype=self.dtype, mode='r',
+                               shape=(self.length,) + self.shape)
+    return np.array(self._memmap[i])
+
+
+class MappedSequence(TensorSequence):
+  """f(s1[i], s2[i], ...) calculated on demand"""
+
+  def __init__(self, f, *sequences):
+    super(MappedSequence, self).__init__()
+    assert callable(f) and len(sequences) > 0
+    self.f = f
+    self.sequences = sequences
+
+  def __len__(self):
+    return len(self.sequences[0])
+
+  def _get(self, i):
+    return self.f(*[s[i] for s in self.sequences])
+
+
+class EncodedTensors(TensorSequence):
+  """Arrays stored under a StoragePolicy. Step i shows the latest stored
+     array whose step is not after i."""
+
+  def __init__(self, path, dtype, shape, length, store_dtype, rows, policy):
+    super(EncodedTensors, self).__init__()
+    self.path = path
+    self.dtype = np.dtype(dtype)
+    self.shape = tuple(shape)
+    self.length = length
+    self.store_dtype = np.dtype(store_dtype)
+    # Steps of stored arrays, None if all steps are stored
+    self.rows = rows
+    self.policy = StoragePolicy(policy)
+    self._memmap = None
+    self._params = None
+    # (row, reconstruction) of last decoded row, used in delta decoding
+    self._last = None
+
+  @property
+  def num_rows(self):
+    return self.length if self.rows is None else len(self.rows)
+
+  def __len__(self):
+    return self.length
+
+  def __getstate__(self):
+    state = self.__dict__.copy()
+    state['_memmap'], state['_params'], state['_last'] = None, None, None
+    state['_cache'] = OrderedDict()
+    return state
+
+  def row_of(self, i):
+    """Index of the stored array shown at step i"""
+    if self.rows is None: return i
+    return bisect.bisect_right(self.rows, i) - 1
+
+  def decode_row(self, r):
+    """Return the r-th stored array in float64 (or in its original dtype if
+       the array is not encoded)"""
+    if self._memmap is None:
+      self._memmap = np.memmap(self.path, dtype=self.store_dtype, mode='r',
+                               shape=(self.num_rows,) + self.shape)
+      if self.policy.bits: self._params = np.fromfile(
+        self.path + PARAMS_SUFFIX, dtype=np.float64).reshape(-1, 2)
+    if not self.policy.encodes(self.dtype): return np.array(self._memmap[r])
+
+    params = lambda j: self._params[j] if self.policy.bits else (0., 1.)
+    if not self.policy.delta:
+      return self.policy.decode(self._memmap[r], params(r))
+    key = r - r % self.policy.delta
+    if self._last is not None and key <= self._last[0] <= r:
+      j, x = self._last
+    else: j, x = key, self.policy.decode(self._memmap[key], params(key))
+    for j in range(j + 1, r + 1):
+      x = self.policy.decode(self._memmap[j], params(j), x)
+    self._last = (r, x)
+    return x
+
+  def _get(self, i):
+    return self.decode_row(self.row_of(i)).astype(self.dtype)
+
+  @property
+  def value_range(self):
+    """(min, max) over all arrays, calculated by streaming through rows"""
+    if self._range is None:
+      lo, hi = np.inf, -np.inf
+      for r in range(self.row_of(self.length - 1) + 1):
+        a = self.decode_row(r).astype(self.dtype)
+        lo, hi = min(lo, np.min(a)), max(hi, np.max(a))
+      self._range = (lo, hi)
+    return self._range
+
+
+def is_sequence(value):
+  return isinstance(value, (list, TensorSequence))
+
+
+def lazy_map(f, *sequences):
+  """Map sequences lazily if any of them is a TensorSequence"""
+  if any([isinstance(s, TensorSequence) for s in sequences]):
+    return MappedSequence(f, *sequences)
+  return [f(*args) for args in zip(*sequences)]
+
+
+def value_range(sequence):
+  """Return (min, max) of a list or a TensorSequence of arrays"""
+  if isinstance(sequence, TensorSequence): return sequence.value_range
+  return np.min(sequence), np.max(sequence)
+
+# endregion : Lazy sequences
+
+
+class TensorStore(object):
+  """A directory holding tensor histories of a note"""
+
+  META_FILE = 'meta.json'
+
+  def __init__(self, path):
+    self.path = path
+    # Each leaf is a dict with keys `keys`, `file`, `dtype`, `shape`, `length`
+    # .. `file` is None for inline leaves. Leaves stored under a policy have
+    # .. extra keys `policy`, `store_dtype` and `rows`
+    self.leaves = []
+    if os.path.exists(self.meta_path):
+      with open(self.meta_path, 'r') as f: self.leaves = json.load(f)
+
+  @property
+  def meta_path(self):
+    return os.path.join(self.path, self.META_FILE)
+
+  # region : Public Methods
+
+  def clear(self):
+    if os.path.exists(self.path): shutil.rmtree(self.path)
+    self.leaves = []
+
+  def append(self, tensors, get_policy=None):
+    """Append arrays which have not been written to store.
+
+    :param tensors: a nested OrderedDict whose leaves are lists of arrays
+    :param get_policy: a function returned by `parse_policies`, used when a
+                       leaf is created
+    :return: a nested OrderedDict of leaves to be kept inline
+    """
+    if not os.path.exists(self.path): os.makedirs(self.path)
+    leaf_dict = OrderedDict([(tuple(d['keys']), d) for d in self.leaves])
+    inline = OrderedDict()
+    for keys, arrays in flatten_dict(tensors):
+      leaf = leaf_dict.get(keys, None)
+      if leaf is None:
+        leaf = self._create_leaf(keys, arrays, len(leaf_dict), get_policy)
+        leaf_dict[keys] = leaf
+
+      if leaf['file'] is not None:
+        # Sync data files with meta in case saving was interrupted
+        self._truncate(leaf, min(leaf['length'], len(arrays)))
+        if not self._is_storable(
+            arrays[leaf['length']:], leaf['dtype'], leaf['shape']):
+          # Move leaf inline
+          for path, _ in self._data_files(leaf):
+            if os.path.exists(path): os.remove(path)
+          leaf['file'] = None
+
+      if leaf['file'] is None:
+        _set_leaf(inline, keys, arrays)
+        leaf['length'] = len(arrays)
+      elif 'policy' in leaf: self._append_encoded(leaf, arrays)
+      else: self._append_raw(leaf, arrays)
+
+    # Write meta file after data has been written
+    self.leaves = list(leaf_dict.values())
+    tmp_path = self.meta_path + '.tmp'
+    with open(tmp_path, 'w') as f: json.dump(self.leaves, f)
+    os.replace(tmp_path, self.meta_path)
+    return inline
+
+  def load(self, inline=None, length=None):
+    """Return a nested OrderedDict whose leaves are MappedTensors or
+       EncodedTensors (or lists from inline dict) in the order they were
+       taken down.
+
+    :param inline: inline leaves returned by `append`
+    :param length: number of steps in note, used to ignore extra steps
+    """
+    inline = OrderedDict(flatten_dict(inline)) if inline else {}
+    tensors = OrderedDict()
+    for leaf in self.leaves:
+      keys = tuple(leaf['keys'])
+      if leaf['file'] is None:
+        if keys in inline: _set_leaf(tensors, keys, inline[keys])
+        continue
+      path = os.path.join(self.path, leaf['file'])
+      n = leaf['length'] if length is None else min(length, leaf['length'])
+      if 'policy' in leaf:
+        rows = leaf['rows']
+        if rows is not None: rows = [i for i in rows if i < n]
+        value = EncodedTensors(path, leaf['dtype'], leaf['shape'], n,
+                               leaf['store_dtype'], rows, leaf['policy'])
+      else: value = MappedTensors(path, leaf['dtype'], leaf['shape'], n)
+      _set_leaf(tensors, keys, value)
+    return tensors
+
+  # endregion : Public Methods
+
+  # region : Private Methods
+
+  @staticmethod
+  def _create_leaf(keys, arrays, index, get_policy):
+    leaf = {'keys': list(keys), 'file': None, 'length': 0}
+    if len(arrays) == 0 or not TensorStore._is_storable(arrays): return leaf
+    leaf['file'] = '{}.bin'.format(index)
+    leaf['dtype'] = np.asarray(arrays[0]).dtype.str
+    leaf['shape'] = list(np.shape(arrays[0]))
+    policy = get_policy(keys) if callable(get_policy) else None
+    if policy is not None and (
+        policy.downsamples or policy.encodes(leaf['dtype'])):
+      leaf['policy'] = policy.spec
+      leaf['store_dtype'] = policy.get_store_dtype(leaf['dtype'])
+      leaf['rows'] = [] if policy.downsamples else None
+    return leaf
+
+  @staticmethod
+  def _is_storable(arrays, dtype=None, shape=None):
+    if len(arrays) == 0: return True
+    if dtype is None: dtype = np.asarray(arrays[0]).dtype.str
+    if shape is None: shape = list(np.shape(arrays[0]))
+    if np.dtype(dtype) == object: return False
+    return all([np.asarray(a).dtype.str == dtype and
+                list(np.shape(a)) == shape for a in arrays])
+
+  def _data_files(self, leaf):
+    """Return a list of (path, row_size) of files holding data of leaf"""
+    size = int(np.prod(leaf['shape']))
+    path = os.path.join(self.path, leaf['file'])
+    dtype = np.dtype(leaf.get('store_dtype', leaf['dtype']))
+    files = [(path, dtype.itemsize * size)]
+    policy = StoragePolicy(leaf['policy']) if 'policy' in leaf else None
+    if policy is not None and policy.bits and policy.encodes(leaf['dtype']):
+      files.append((path + PARAMS_SUFFIX, 16))
+    return files
+
+  def _truncate(self, leaf, length):
+    """Drop steps after `length` and bytes not described by meta"""
+    num_rows = length
+    if leaf.get('rows', None) is not None:
+      leaf['rows'] = [i for i in leaf['rows'] if i < length]
+      num_rows = len(leaf['rows'])
+    leaf['length'] = length
+    for path, row_size in self._data_files(leaf):
+      if os.path.exists(path) and os.path.getsize(path) > num_rows * row_size:
+        os.truncate(path, num_rows * row_size)
+
+  def _append_raw(self, leaf, arrays):
+    with open(os.path.join(self.path, leaf['file']), 'ab') as f:
+      for a in arrays[leaf['length']:]:
+        f.write(np.ascontiguousarray(a, dtype=leaf['dtype']).tobytes())
+    leaf['length'] = len(arrays)
+
+  def _append_encoded(self, leaf, arrays):
+    policy, n = StoragePolicy(leaf['policy']), len(arrays)
+    rows = leaf['rows']
+    if rows is None: rows = list(range(leaf['length']))
+    kept = policy.kept(rows + list(range(leaf['length'], n)), n)
+    if kept[:len(rows)] == rows:
+      # Append new rows
+      prev = None
+      if policy.delta and len(rows) % policy.delta != 0:
+        prev = EncodedTensors(
+          os.path.join(self.path, leaf['file']), leaf['dtype'],
+          leaf['shape'], leaf['length'], leaf['store_dtype'], rows,
+          leaf['policy']).decode_row(len(rows) - 1)
+      self._write_rows(leaf, policy, [arrays[i] for i in kept[len(rows):]],
+                       len(rows), prev, 'ab')
+    else:
+      # Some rows are dropped, rewrite the whole leaf from arrays
+      self._write_rows(leaf, policy, [arrays[i] for i in kept], 0, None, 'wb',
+                       suffix='.tmp')
+      for path, _ in self._data_files(leaf): os.replace(path + '.tmp', path)
+    leaf['rows'] = kept if policy.downsamples else None
+    leaf['length'] = n
+
+  def _write_rows(self, leaf, policy, arrays, row, prev, mode, suffix=''):
+    """Encode arrays as stored rows starting from `row`"""
+    encodes, params = policy.encodes(leaf['dtype']), []
+    path = os.path.join(self.path, leaf['file'])
+    with open(path + suffix, mode) as f:
+      for a in arrays:
+        if encodes:
+          if not policy.delta or row % policy.delta == 0: prev = None
+          a, p, prev = policy.encode(a, leaf['store_dtype'], prev)
+          params.append(p)
+        f.write(np.ascontiguousarray(a, dtype=leaf['store_dtype']).tobytes())
+        row += 1
+    if encodes and policy.bits:
+      with open(path + PARAMS_SUFFIX + suffix, mode) as f:
+        f.write(np.array(params, dtype=np.float64).reshape(-1, 2).tobytes())
+
+  # endregion : Private Methods
+
+
+def flatten_dict(tensors, prefix=()):
+  """Yield (keys, leaf) pairs of a nested dict"""
+  for k, v in tensors.items():
+    if isinstance(v, dict):
+      for pair in flatten_dict(v, prefix + (k,)): yield pair
+    else: yield prefix + (k,), v
+
+
+def _set_leaf(tensors, keys, value):
+  for k in keys[:-1]:
+    if k not in tensors: tensors[k] = OrderedDict()
+    tensors = tensors[k]
+  tensors[keys[-1]] = value
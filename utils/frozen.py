@@ -0,0 +1,244 @@
+"""Export and load frozen inference-only graphs.
+
+This module depends only on numpy and tensorflow so that FrozenModel can
+serve predictions without importing model-building modules of tframe.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+import os
+
+import numpy as np
+
+
+SIGNATURE_NODE = 'tframe_signature'
+
+
+def _get_tf():
+  import tensorflow as tf
+  if tf.version.VERSION[0] == '2': tf = tf.compat.v1
+  return tf
+
+
+# region : Export
+
+def export(session, path, input_tensor, output_tensor, is_training=None,
+           signature=None, optimize=True):
+  """Freeze variables to constants and write an inference-only GraphDef.
+
+  :param session: session holding values of variables
+  :param path: path of .pb file to write
+  :param input_tensor: input tensor. If it is a PlaceholderWithDefault (e.g.,
+                       input fed by tf.data pipeline) it will be converted to
+                       a plain Placeholder
+  :param output_tensor: output tensor
+  :param is_training: the is_training placeholder, which will be replaced by
+                      constant False. Branches for training inside tf.cond
+                      (e.g., batch-norm moving average updates) are removed
+  :param signature: a dictionary of extra information to be embedded
+  :param optimize: whether to fold products of variables (e.g., weights *
+                   masks of pruned kernels) into constants, and fold
+                   constants and batch norms using graph transforms if
+                   available
+  :return: the frozen GraphDef
+  """
+  tf = _get_tf()
+  input_name, output_name = input_tensor.op.name, output_tensor.op.name
+
+  graph_def = session.graph.as_graph_def()
+  _replace_input_and_is_training(
+    tf, graph_def, input_name,
+    None if is_training is None else is_training.op.name)
+  _remove_dead_branches(graph_def)
+  if optimize: _fold_variable_products(tf, session, graph_def)
+
+  # Extract sub-graph and convert variables to constants. Optimizer slots,
+  #   summaries, monitor ops, etc. are stripped since they are not needed by
+  #   output_tensor
+  graph_def = tf.graph_util.convert_variables_to_constants(
+    session, graph_def, [output_name])
+  if optimize: graph_def = _fold(graph_def, input_name, output_name)
+
+  # Embed signature
+  signature = dict(signature or {})
+  signature.update(input=input_tensor.name, output=output_tensor.name,
+                   input_dtype=input_tensor.dtype.name,
+                   input_shape=input_tensor.shape.as_list())
+  node = graph_def.node.add()
+  node.name, node.op = SIGNATURE_NODE, 'Const'
+  node.attr['dtype'].type = tf.string.as_datatype_enum
+  node.attr['value'].tensor.CopyFrom(tf.make_tensor_proto(
+    json.dumps(signature).encode()))
+
+  # Write file
+  directory = os.path.dirname(path)
+  if directory and not os.path.exists(directory): os.makedirs(directory)
+  with open(path, 'wb') as f: f.write(graph_def.SerializeToString())
+  return graph_def
+
+
+def _replace_input_and_is_training(tf, graph_def, input_name, is_training):
+  for node in graph_def.node:
+    if node.name == input_name and node.op == 'PlaceholderWithDefault':
+      dtype, shape = node.attr['dtype'], node.attr['shape']
+      node.op = 'Placeholder'
+      del node.input[:]
+      node.attr.clear()
+      node.attr['dtype'].CopyFrom(dtype)
+      node.attr['shape'].CopyFrom(shape)
+    elif node.name == is_training:
+      node.op = 'Const'
+      del node.input[:]
+      node.attr.clear()
+      node.attr['dtype'].type = tf.bool.as_datatype_enum
+      node.attr['value'].tensor.CopyFrom(tf.make_tensor_proto(False))
+
+
+def _remove_dead_branches(graph_def):
+  """Remove branches of Switch nodes whose predicate is constant False.
+     Live Switch nodes are converted to Identity of their data input and
+     Merge nodes with a single live input are converted to Identity."""
+  nodes = {node.name: node for node in graph_def.node}
+  parse = lambda s: (s.split(':')[0], int(s.split(':')[1]) if ':' in s else 0)
+
+  def is_false(name):
+    node = nodes.get(name)
+    while node is not None and node.op == 'Identity':
+      node = nodes.get(parse(node.input[0])[0])
+    if node is None or node.op != 'Const': return False
+    if node.attr['dtype'].type != 10: return False  # DT_BOOL
+    return list(node.attr['value'].tensor.bool_val) == [False]
+
+  # Find switches with constant False predicate
+  switches = set([node.name for node in graph_def.node if node.op == 'Switch'
+                  and is_false(parse(node.input[1])[0])])
+  if not switches: return
+
+  # Propagate dead nodes until a fixed point is reached
+  dead = set()
+  changed = True
+  while changed:
+    changed = False
+    for node in graph_def.node:
+      if node.name in dead: continue
+      data_inputs = [parse(s) for s in node.input if not s.startswith('^')]
+      flags = [(n in switches and i == 1) or n in dead for n, i in data_inputs]
+      if not flags: continue
+      if (node.op == 'Merge' and all(flags)) or (
+          node.op != 'Merge' and any(flags)):
+        dead.add(node.name)
+        changed = True
+
+  # Rewrite live nodes
+  live_nodes = [node for node in graph_def.node if node.name not in dead]
+  for node in live_nodes:
+    if node.name in switches:
+      node.op = 'Identity'
+      node.input[:] = [node.input[0]]
+      for key in list(node.attr.keys()):
+        if key != 'T': del node.attr[key]
+    elif node.op == 'Merge':
+      inputs = [s for s in node.input if s.startswith('^') or not (
+        (parse(s)[0] in switches and parse(s)[1] == 1)
+        or parse(s)[0] in dead)]
+      if len([s for s in inputs if not s.startswith('^')]) == 1:
+        node.op = 'Identity'
+        node.input[:] = inputs
+        for key in list(node.attr.keys()):
+          if key != 'T': del node.attr[key]
+    # Remove control dependencies on dead nodes
+    node.input[:] = [s for s in node.input
+                     if not (s.startswith('^') and s[1:] in dead)]
+
+  del graph_def.node[:]
+  graph_def.node.extend(live_nodes)
+
+
+def _fold_variable_products(tf, session, graph_def):
+  """Replace Mul nodes of two variables (e.g., weights * masks) by Const
+     nodes holding their current values"""
+  nodes = {node.name: node for node in graph_def.node}
+
+  def is_variable(name):
+    node = nodes.get(name.split(':')[0])
+    while node is not None and node.op in ('Identity', 'ReadVariableOp'):
+      node = nodes.get(node.input[0].split(':')[0])
+    return node is not None and node.op in (
+      'Variable', 'VariableV2', 'VarHandleOp')
+
+  products = [node for node in graph_def.node if node.op == 'Mul' and all(
+    [is_variable(s) for s in node.input if not s.startswith('^')])]
+  if not products: return
+  values = session.run(['{}:0'.format(node.name) for node in products])
+  for node, value in zip(products, values):
+    node.op = 'Const'
+    del node.input[:]
+    node.attr.clear()
+    node.attr['dtype'].type = tf.as_dtype(value.dtype).as_datatype_enum
+    node.attr['value'].tensor.CopyFrom(tf.make_tensor_proto(value))
+
+
+def _fold(graph_def, input_name, output_name):
+  try: from tensorflow.tools.graph_transforms import TransformGraph
+  except ImportError:
+    from tframe import console
+    console.warning('TransformGraph is not available, constants and batch '
+                    'norms in the exported graph are not folded')
+    return graph_def
+  transforms = ['fold_constants(ignore_errors=true)', 'fold_batch_norms',
+                'fold_old_batch_norms', 'strip_unused_nodes']
+  return TransformGraph(graph_def, [input_name], [output_name], transforms)
+
+# endregion : Export
+
+# region : Load
+
+class FrozenModel(object):
+  """Lightweight loader of GraphDef exported by Predictor.export_inference"""
+
+  def __init__(self, path, intra_op_threads=0, inter_op_threads=0):
+    tf = _get_tf()
+    graph_def = tf.GraphDef()
+    with open(path, 'rb') as f: graph_def.ParseFromString(f.read())
+
+    # Read signature
+    nodes = [n for n in graph_def.node if n.name == SIGNATURE_NODE]
+    if len(nodes) != 1: raise ValueError(
+      '!! `{}` is not exported by export_inference'.format(path))
+    self.signature = json.loads(
+      nodes[0].attr['value'].tensor.string_val[0].decode())
+
+    # Import graph and create session
+    self.graph = tf.Graph()
+    with self.graph.as_default(): tf.import_graph_def(graph_def, name='')
+    config = tf.ConfigProto(intra_op_parallelism_threads=intra_op_threads,
+                            inter_op_parallelism_threads=inter_op_threads)
+    self.session = tf.Session(graph=self.graph, config=config)
+    self._input = self.graph.get_tensor_by_name(self.signature['input'])
+    self._output = self.graph.get_tensor_by_name(self.signature['output'])
+
+  @property
+  def is_classifier(self):
+    return self.signature.get('classifier', False)
+
+  def predict(self, features, batch_size=None):
+    features = np.asarray(features)
+    if batch_size is None or batch_size >= len(features):
+      return self.session.run(self._output, {self._input: features})
+    return np.concatenate([
+      self.session.run(self._output, {self._input: features[i:i+batch_size]})
+      for i in range(0, len(features), batch_size)], axis=0)
+
+  def classify(self, features, batch_size=None, return_probs=False):
+    if not self.is_classifier:
+      raise AssertionError('!! This model is not a classifier')
+    probs = self.predict(features, batch_size)
+    if return_probs: return probs
+    return np.argmax(probs, axis=-1)
+
+  def close(self):
+    self.session.close()
+
+# endregion : Load
@@ -0,0 +1,118 @@
+"""Hoisting input-to-hidden projections out of tf.scan.
+
+Most RNN cells calculate concat([x_t, s_{t-1}]) @ W (+ b) at each time step,
+in which x_t @ W[:dim_x] depends only on the inputs. When
+th.hoist_input_projection is True,
+
+  (1) such products whose first operand is the step input of the recurrent
+      model are recorded while Recurrent links its while-free shadow step,
+  (2) x @ [W1[:dim_x], W2[:dim_x], ...] is calculated for the whole sequence
+      in one matmul before tf.scan, and
+  (3) inside the loop, the projection of each step is sliced by tf.scan so
+      that only s_{t-1} @ W[dim_x:] remains to be calculated.
+
+Since concat([x, s]) @ W = x @ W[:dim_x] + s @ W[dim_x:], outputs are the
+same as those calculated step by step up to floating-point error.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from tframe import tf
+
+
+class InputHoist(object):
+  """Created by Recurrent._build and put into context.hoist"""
+
+  def __init__(self, x):
+    """:param x: single-step input tensor used in the shadow step"""
+    self.x = x
+    self.recording = True
+    # Weights recorded in shadow step
+    self.weights = []
+    # Projections of current step, fed inside tf.scan
+    self._projections = None
+    self._cursor = 0
+
+  # region : Properties
+
+  @property
+  def input_dim(self):
+    return self.x.shape.as_list()[-1]
+
+  @property
+  def num_units_list(self):
+    return [W.shape.as_list()[-1] for W in self.weights]
+
+  # endregion : Properties
+
+  # region : Public Methods
+
+  def matmul(self, x, W, parts, matmul=tf.matmul):
+    """Calculate x @ W in which x = tf.concat(parts, axis=-1)"""
+    if not self._is_hoistable(parts, W): return matmul(x, W)
+
+    if self.recording:
+      self.weights.append(W)
+      return matmul(x, W)
+
+    if self._cursor >= len(self._projections): raise AssertionError(
+      '!! Cell structure differs from that recorded in shadow step')
+    p = self._projections[self._cursor]
+    self._cursor += 1
+    if len(parts) == 1: return p
+    s = parts[1] if len(parts) == 2 else tf.concat(parts[1:], axis=-1)
+    return p + matmul(s, W[self.input_dim:])
+
+  def project(self, inputs):
+    """Calculate projections of time-major inputs in one matmul.
+
+    :param inputs: a tensor of shape [num_steps, batch_size, input_dim]
+    :return: a tuple of tensors of shape [num_steps, batch_size, num_units]
+    """
+    W = tf.concat([W[:self.input_dim] for W in self.weights], axis=1)
+    with tf.name_scope('HoistedProjection'):
+      p = tf.tensordot(inputs, W, [[2], [0]])
+      return tuple(tf.split(p, self.num_units_list, axis=2))
+
+  def wrap(self, fn, elems, inputs):
+    """Wrap scan function so that projections can be sliced by tf.scan.
+
+    :param fn: the original scan function
+    :param elems: the original elems
+    :param inputs: time-major input tensor in elems
+    :return: (fn, elems) to be fed to tf.scan
+    """
+    self.recording = False
+    projections = self.project(inputs)
+
+    def step(pre_outputs, elems_and_projections):
+      step_elems, self._projections = elems_and_projections
+      self.x = (step_elems[0] if isinstance(step_elems, (tuple, list))
+                else step_elems)
+      self._cursor = 0
+      outputs = fn(pre_outputs, step_elems)
+      assert self._cursor == len(self._projections)
+      return outputs
+
+    return step, (elems, projections)
+
+  # endregion : Public Methods
+
+  # region : Private Methods
+
+  def _is_hoistable(self, parts, W):
+    if not parts or parts[0] is not self.x: return False
+    return len(self.x.shape) == 2 and isinstance(W, (tf.Tensor, tf.Variable))
+
+  # endregion : Private Methods
+
+
+def hoisted_matmul(x, W, parts=None, matmul=tf.matmul, hoistable=True):
+  """Calculate x @ W. If x = tf.concat(parts, axis=-1) and an InputHoist is
+     active, the projection of the step input will be reused."""
+  from tframe import context
+  hoist = context.hoist
+  if hoist is None or not hoistable or parts is None: return matmul(x, W)
+  assert isinstance(hoist, InputHoist)
+  return hoist.matmul(x, W, list(parts), matmul)
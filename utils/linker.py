@@ -13,6 +13,7 @@ from tframe import hub
 from tframe import checker
 from tframe import context
 from tframe import pedia
+from tframe.utils.hoist import hoisted_matmul
 from tframe.utils.maths.periodicals import bit_waves
 
 
@@ -91,7 +92,9 @@ def neurons(num,
     # .. append weights to context, currently only some extractors will use it
     context.weights_list.append(Wx)
     # .. do matrix multiplication
-    net_y = get_matmul(truncate)(x, Wx)
+    parts = [external_input, memory] if should_concate else [external_input]
+    net_y = hoisted_matmul(x, Wx, parts, get_matmul(truncate),
+                           hoistable=not truncate and x_heads == 0)
 
     # - Calculate net input for memory and add to net_y if necessary
     if separate_memory_neurons:
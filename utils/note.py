@@ -2,10 +2,19 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import bisect
+import copy
+import os
+
 import numpy as np
 from collections import OrderedDict
 
 from tframe.utils.file_tools import io_utils
+from tframe.utils.file_tools.tensor_store import TensorStore, is_sequence
+from tframe.utils.file_tools.tensor_store import flatten_dict, parse_policies
+
+
+TENSOR_STORE_SUFFIX = '.tensors'
 
 
 class Note(object):
@@ -25,6 +34,13 @@ class Note(object):
     # Variables for analysis
     self.misc = {}
 
+    # Number of steps whose tensors have been written to each tensor store
+    self._written_steps = {}
+    # Storage policies of tensors, see tensor_store.parse_policies
+    self._tensor_policy = None
+    # Steps kept by downsampling policies for each leaf of _tensors
+    self._kept_steps = {}
+
   # region : Properties
 
   # region : For TensorViewer
@@ -91,7 +107,8 @@ class Note(object):
 
   # region : For TensorViewer
 
-  def take_down_scalars_and_tensors(self, step, scalars, tensors=None):
+  def take_down_scalars_and_tensors(self, step, scalars, tensors=None,
+                                    tensor_policy=None):
     assert isinstance(scalars, dict) and isinstance(tensors, dict)
     # Take down step
     self._steps.append(step)
@@ -100,6 +117,9 @@ class Note(object):
     # Take down parameters
     if tensors is not None:
       self._append_to_dict(self._tensors, tensors)
+    # Downsample tensors if necessary
+    if tensor_policy: self._tensor_policy = tensor_policy
+    if getattr(self, '_tensor_policy', None): self._downsample_tensors()
 
   # endregion : For TensorViewer
 
@@ -120,14 +140,40 @@ class Note(object):
     self._lines.append(line)
 
   def save(self, file_path):
+    """Save note to file_path. Tensor histories are appended to a tensor store
+       (file_path + '.tensors') so that they can be mapped from disk lazily
+       in tensor viewer and need not be rewritten each time note is saved."""
     self._check_before_dump()
-    io_utils.save(self, file_path)
+    note = self
+    if len(self._tensors) > 0:
+      store_path = file_path + TENSOR_STORE_SUFFIX
+      store = TensorStore(store_path)
+      # Clear store if it is not written by this note
+      written_steps = getattr(self, '_written_steps', {})
+      if os.path.abspath(store_path) not in written_steps: store.clear()
+      inline = store.append(
+        self._tensors, parse_policies(getattr(self, '_tensor_policy', None)))
+      self._written_steps = {os.path.abspath(store_path): len(self._steps)}
+      # Dump a shallow copy holding only inline tensors
+      note = copy.copy(self)
+      note._tensors = inline
+      note._tensor_store = os.path.basename(store_path)
+      note._written_steps = {}
+    io_utils.save(note, file_path)
     # with open(file_path, 'wb') as f:
     #   pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
 
   @staticmethod
   def load(file_path):
-    return io_utils.load(file_path)
+    note = io_utils.load(file_path)
+    # Map tensors from tensor store if necessary
+    store_name = getattr(note, '_tensor_store', None)
+    if store_name is not None:
+      store_path = os.path.join(os.path.dirname(file_path), store_name)
+      note._tensors = TensorStore(store_path).load(
+        note._tensors, length=len(note._steps))
+      note._written_steps = {os.path.abspath(store_path): len(note._steps)}
+    return note
     # with open(file_name, 'rb') as f:
     #   return pickle.load(f)
 
@@ -158,7 +204,24 @@ class Note(object):
       if isinstance(v, OrderedDict):
         Note._check_dict(v, l)
       else:
-        assert isinstance(v, list) and len(v) == l
+        assert is_sequence(v) and len(v) == l
+
+  def _downsample_tensors(self):
+    """Let steps dropped by downsampling policies share the array of the
+       latest kept step before them, so that memory usage and pickled size
+       of this note are bounded"""
+    get_policy = parse_policies(self._tensor_policy)
+    if getattr(self, '_kept_steps', None) is None: self._kept_steps = {}
+    for keys, arrays in flatten_dict(self._tensors):
+      policy = get_policy(keys)
+      if policy is None or not policy.downsamples: continue
+      n = len(arrays)
+      steps = self._kept_steps.get(keys, list(range(n - 1)))
+      kept = policy.kept(steps + [n - 1], n)
+      for i in sorted(set(steps) - set(kept)):
+        j = bisect.bisect_right(kept, i)
+        arrays[i:kept[j]] = [arrays[kept[j - 1]]] * (kept[j] - i)
+      self._kept_steps[keys] = kept
 
   def _check_before_dump(self):
     l = len(self._steps)
@@ -13,7 +13,8 @@ for _ in range(2):
 
 import re
 import time
-from subprocess import run
+import tempfile
+from subprocess import Popen
 from collections import OrderedDict
 
 from tframe import console
@@ -71,6 +72,10 @@ class Helper(object):
   BAYESIAN = 'BAYESIAN'
   GRID_SEARCH = 'GRID_SEARCH'
 
+  # Each trial launched by a helper is registered here (as `pid-index`) so
+  #   that trials can divide host cores among siblings (see th.sibling_trials)
+  TRIAL_REGISTRY = os.path.join(tempfile.gettempdir(), 'tframe_trials')
+
   class CONFIG_KEYS(object):
     add_script_suffix = 'add_script_suffix'
     auto_set_hp_properties = 'auto_set_hp_properties'
@@ -216,22 +221,37 @@ class Helper(object):
     #   criterion
     self._auto_config()
     self.pot.set_scroll(self.configs.get('strategy', strategy), **self.configs)
+    # Set claim file shared by sweep processes if necessary
+    if self.pot.scroll.resume and 'gather_summ_name' in self.common_parameters:
+      self.pot.scroll.claim_path = os.path.join(
+        self.root_path, '{}_claims.txt'.format(self.summ_file_name))
+    # Set rung board shared by trials if necessary
+    if self.pot.scroll.board_is_needed and self.pot.scroll.board_path is None:
+      self.pot.scroll.board_path = os.path.join(
+        self.root_path, '{}_rungs.txt'.format(self.summ_file_name))
     # Show common parameters
     self._show_dict('Common Settings', self.common_parameters)
 
-    # Begin iteration
-    for i, hyper_params in enumerate(self.pot.scroll.combinations()):
-      # Show hyper-parameters
-      console.show_info('Hyper-parameters:')
-      for k, v in hyper_params.items():
-        console.supplement('{}: {}'.format(k, v), level=2)
-      # Run process if not rehearsal
-      if rehearsal: continue
-      console.split()
-      # Export log if necessary
-      if self.pot.logging_is_needed: self._export_log()
-      # Run
-      self._run_process(hyper_params, i)
+    # Begin iteration. Up to `scroll.concurrency` trials run at the same time
+    concurrency = max(int(self.pot.scroll.concurrency), 1)
+    running = []
+    try:
+      for i, hyper_params in enumerate(self.pot.scroll.combinations()):
+        # Show hyper-parameters
+        console.show_info('Hyper-parameters:')
+        for k, v in hyper_params.items():
+          console.supplement('{}: {}'.format(k, v), level=2)
+        # Run process if not rehearsal
+        if rehearsal: continue
+        console.split()
+        # Export log if necessary
+        if self.pot.logging_is_needed: self._export_log()
+        # Launch, and wait for the whole batch before the scroll proposes
+        #  more configurations
+        running.append(self._launch_process(
+          hyper_params, i, concurrency - len(running) - 1))
+        if len(running) >= concurrency: self._wait_processes(running)
+    finally: self._wait_processes(running)
 
   # endregion : Public Methods
 
@@ -267,16 +287,63 @@ class Helper(object):
     if self.configs.get(self.CONFIG_KEYS.auto_set_hp_properties, True):
       self.auto_set_hp_properties()
 
-  def _run_process(self, hyper_params, index):
+  def _launch_process(self, hyper_params, index, pending=0):
+    """Launch a trial without blocking. `pending` is the number of trials
+       to be launched by this helper along with this one.
+       Returns a tuple of (process, trial_name)."""
     assert isinstance(hyper_params, dict)
     # Handle script suffix option
     if self.configs.get('add_script_suffix', False):
       self.common_parameters['script_suffix'] = '_{}'.format(index + 1)
     # Run
     configs = self._get_all_configs(hyper_params)
-    cmd = [self._python_cmd, self.module_name] + self._get_hp_strings(configs)
-    run(cmd)
-    print()
+    trial_name = self._register_trial(index)
+    try:
+      if 'sibling_trials' not in configs:
+        configs['sibling_trials'] = self._count_sibling_trials() + pending
+      cmd = [self._python_cmd, self.module_name] + self._get_hp_strings(
+        configs)
+      return Popen(cmd), trial_name
+    except Exception:
+      self._unregister_trial(trial_name)
+      raise
+
+  def _wait_processes(self, running):
+    """Wait for all processes in `running` and empty it"""
+    while running:
+      process, trial_name = running.pop(0)
+      try: process.wait()
+      finally: self._unregister_trial(trial_name)
+      print()
+
+  def _register_trial(self, index):
+    os.makedirs(self.TRIAL_REGISTRY, exist_ok=True)
+    trial_name = '{}-{}'.format(os.getpid(), index)
+    with open(os.path.join(self.TRIAL_REGISTRY, trial_name), 'w') as f:
+      f.write(self.module_name)
+    return trial_name
+
+  def _unregister_trial(self, trial_name):
+    path = os.path.join(self.TRIAL_REGISTRY, trial_name)
+    if os.path.exists(path): os.remove(path)
+
+  def _count_sibling_trials(self):
+    """Count trials running on this host, including this one.
+       Files left by dead helpers are removed."""
+    count = 0
+    for file_name in os.listdir(self.TRIAL_REGISTRY):
+      # os.kill(pid, 0) terminates the process on Windows
+      if os.name == 'nt':
+        count += 1
+        continue
+      try:
+        os.kill(int(file_name.split('-')[0]), 0)
+        count += 1
+      except (ValueError, ProcessLookupError):
+        try: os.remove(os.path.join(self.TRIAL_REGISTRY, file_name))
+        except OSError: pass
+      except PermissionError: count += 1
+    return max(count, 1)
 
   @staticmethod
   def _show_flag_if_necessary(flag_name, value):
@@ -399,6 +466,13 @@ class Helper(object):
     kwargs.get('strategy', None)
     kwargs.get('times', None)
     kwargs.get('python_version', None)
+    kwargs.get('q_size', None)
+    kwargs.get('liar', None)
+    kwargs.get('reduction_factor', None)
+    kwargs.get('min_rounds', None)
+    kwargs.get('n_rungs', None)
+    kwargs.get('rung_board', None)
+    kwargs.get('resume', None)
     self.configure(**kwargs)
 
   def _export_log(self):
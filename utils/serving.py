@@ -0,0 +1,377 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import pickle
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections import deque, OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+from tframe import console
+from tframe.enums import InputTypes
+
+
+class BatchServer(object):
+  """BatchServer queues incoming samples and runs them through a launched
+     model in micro-batches, one session.run per micro-batch. A micro-batch
+     is closed when it reaches max_batch_size or when the first sample in it
+     has waited for max_latency_ms.
+
+     For RNN models, each sample is a sequence chunk of shape
+     [num_steps, *sample_shape] and state buffers are kept for each client.
+     Only chunks with the same length are batched together.
+
+     Usage:
+       with BatchServer(model, max_batch_size=64) as server:
+         y = server.predict(x)
+  """
+
+  def __init__(self, model, fetches=None, max_batch_size=64,
+               max_latency_ms=5.0, history_size=10000):
+    from tframe.models.model import Model
+    assert isinstance(model, Model) and model.launched
+    self._model = model
+    self._fetches = model.val_outputs.tensor if fetches is None else fetches
+    self._input = model.input_tensor
+    self.max_batch_size = max_batch_size
+    self.max_latency = max_latency_ms / 1000.
+
+    self._is_rnn = model.input_type is InputTypes.RNN_BATCH
+    self._states = {}
+
+    self._queue = queue.Queue()
+    self._thread = None
+    self._stopped = threading.Event()
+    # Guards submitting against draining queue on shutdown
+    self._submit_lock = threading.Lock()
+
+    # Counters
+    self._lock = threading.Lock()
+    self._start_time = None
+    self._num_requests = 0
+    self._num_batches = 0
+    self._latencies = deque(maxlen=history_size)
+
+  # region : Properties
+
+  @property
+  def running(self):
+    return self._thread is not None and self._thread.is_alive()
+
+  @property
+  def stats(self):
+    """Throughput and latency counters"""
+    with self._lock:
+      elapsed = time.time() - self._start_time if self._start_time else 0
+      latencies = np.array(self._latencies) * 1000
+      od = OrderedDict()
+      od['requests'] = self._num_requests
+      od['batches'] = self._num_batches
+      od['avg_batch_size'] = self._num_requests / max(self._num_batches, 1)
+      od['throughput'] = self._num_requests / elapsed if elapsed else 0.
+      if latencies.size > 0:
+        od['latency_mean_ms'] = float(np.mean(latencies))
+        od['latency_p50_ms'] = float(np.percentile(latencies, 50))
+        od['latency_p99_ms'] = float(np.percentile(latencies, 99))
+      return od
+
+  # endregion : Properties
+
+  # region : Public Methods
+
+  def start(self):
+    if self.running: return self
+    self._stopped.clear()
+    self._start_time = time.time()
+    self._thread = threading.Thread(target=self._serve, daemon=True)
+    self._thread.start()
+    console.show_status('Batch server started (max_batch_size = {}, '
+                        'max_latency = {}ms)'.format(
+      self.max_batch_size, self.max_latency * 1000), '[Server]')
+    return self
+
+  def stop(self):
+    if not self.running: return
+    self._stopped.set()
+    self._queue.put(None)
+    self._thread.join()
+    self._thread = None
+    console.show_status('Batch server stopped', '[Server]')
+
+  def submit(self, sample, client_id=None):
+    """Put a single sample into queue and return a Future"""
+    future = Future()
+    with self._submit_lock:
+      if not self.running or self._stopped.is_set(): raise AssertionError(
+        '!! Server is not running')
+      self._queue.put((np.asarray(sample), client_id, future, time.time()))
+    return future
+
+  def predict(self, sample, client_id=None, timeout=None):
+    return self.submit(sample, client_id).result(timeout)
+
+  def reset_client(self, client_id):
+    """Clear state buffer of a client (RNN models only)"""
+    self._states.pop(client_id, None)
+
+  def reset_stats(self):
+    with self._lock:
+      self._start_time = time.time()
+      self._num_requests, self._num_batches = 0, 0
+      self._latencies.clear()
+
+  def __enter__(self):
+    return self.start()
+
+  def __exit__(self, *args):
+    self.stop()
+
+  # endregion : Public Methods
+
+  # region : Private Methods
+
+  def _serve(self):
+    pending = []
+    while not self._stopped.is_set():
+      batch = self._collect(pending)
+      if not batch: continue
+      try: self._run_batch(batch)
+      except Exception as e:
+        for _, _, future, _ in batch:
+          if not future.done(): future.set_exception(e)
+    self._drain(pending)
+
+  def _drain(self, pending):
+    """Fail requests left in pending and queue on shutdown so that callers
+       waiting on their futures will not hang"""
+    with self._submit_lock:
+      items = list(pending)
+      del pending[:]
+      while True:
+        try: items.append(self._queue.get_nowait())
+        except queue.Empty: break
+    error = RuntimeError('!! Server stopped before request was served')
+    for item in items:
+      if item is not None and not item[2].done(): item[2].set_exception(error)
+
+  def _collect(self, pending):
+    """Collect a micro-batch. Requests that can not be batched with the
+       current one (e.g. RNN chunks with different length) are kept in
+       pending and served first in the next round."""
+    batch = []
+    if pending: batch.append(pending.pop(0))
+    else:
+      item = self._queue.get()
+      if item is None: return batch
+      batch.append(item)
+
+    # Clients which already have a chunk in batch or an earlier chunk left
+    #   in pending. Their chunks are deferred to keep states in order
+    excluded = set()
+    self._exclude(excluded, batch[0])
+    deadline = batch[0][-1] + self.max_latency
+    # Take compatible pending requests first
+    for item in list(pending):
+      if len(batch) >= self.max_batch_size: break
+      if self._compatible(batch, item, excluded):
+        batch.append(item)
+        pending.remove(item)
+      self._exclude(excluded, item)
+    for item in pending: self._exclude(excluded, item)
+    while len(batch) < self.max_batch_size:
+      timeout = deadline - time.time()
+      if timeout <= 0: break
+      try: item = self._queue.get(timeout=timeout)
+      except queue.Empty: break
+      if item is None:
+        self._stopped.set()
+        break
+      if self._compatible(batch, item, excluded): batch.append(item)
+      else: pending.append(item)
+      self._exclude(excluded, item)
+    return batch
+
+  def _compatible(self, batch, item, excluded):
+    if not self._is_rnn: return True
+    # Chunks in a micro-batch should have the same length and come from
+    #   clients not excluded
+    return len(batch[0][0]) == len(item[0]) and (
+      item[1] is None or item[1] not in excluded)
+
+  @staticmethod
+  def _exclude(excluded, item):
+    if item[1] is not None: excluded.add(item[1])
+
+  def _run_batch(self, batch):
+    samples = np.stack([item[0] for item in batch])
+    feed_dict = {self._input: samples}
+    feed_dict.update(self._model.agent.get_status_feed_dict(False))
+
+    fetches = [self._fetches]
+    if self._is_rnn:
+      model = self._model
+      states = [self._states.get(item[1], None) for item in batch]
+      states = [model._get_zero_state(1) if s is None else s for s in states]
+      feed_dict[model.init_state] = _stack_nested(states)
+      fetches.append(model._state_slot.op)
+
+    results = self._model.session.run(fetches, feed_dict)
+
+    if self._is_rnn:
+      for item, state in zip(batch, _split_nested(results[1], len(batch))):
+        if item[1] is not None: self._states[item[1]] = state
+
+    now = time.time()
+    outputs = results[0]
+    for i, (_, _, future, t) in enumerate(batch): future.set_result(
+      [o[i] for o in outputs] if isinstance(outputs, list) else outputs[i])
+
+    with self._lock:
+      self._num_requests += len(batch)
+      self._num_batches += 1
+      self._latencies.extend([now - item[-1] for item in batch])
+
+  # endregion : Private Methods
+
+  # region : Unix Socket
+
+  def serve_unix(self, path):
+    """Serve requests from UnixClient on a Unix domain socket. Blocks until
+       KeyboardInterrupt. Requests are pickled, thus the socket is made
+       accessible only by the owner (mode 0o600)."""
+    if os.path.exists(path): os.remove(path)
+    server = self
+
+    class Handler(socketserver.BaseRequestHandler):
+      def handle(self):
+        while True:
+          request = _recv(self.request)
+          if request is None: return
+          sample, client_id, command = request
+          try:
+            if command == 'stats': response = (True, server.stats)
+            elif command == 'reset':
+              server.reset_client(client_id)
+              response = (True, None)
+            else: response = (True, server.predict(sample, client_id))
+          except Exception as e: response = (False, str(e))
+          _send(self.request, response)
+
+    self.start()
+    # Restrict the socket to the owner from the moment it is bound
+    umask = os.umask(0o177)
+    try: unix_server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    finally: os.umask(umask)
+    os.chmod(path, 0o600)
+    with unix_server:
+      console.show_status('Serving on `{}` ...'.format(path), '[Server]')
+      try: unix_server.serve_forever()
+      except KeyboardInterrupt: pass
+    self.stop()
+    if os.path.exists(path): os.remove(path)
+
+  # endregion : Unix Socket
+
+
+class UnixClient(object):
+  """Client of BatchServer.serve_unix"""
+
+  def __init__(self, path, client_id=None):
+    self.client_id = client_id
+    self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    self._socket.connect(path)
+
+  def _request(self, sample=None, command='predict'):
+    _send(self._socket, (sample, self.client_id, command))
+    ok, result = _recv(self._socket)
+    if not ok: raise RuntimeError(result)
+    return result
+
+  def predict(self, sample):
+    return self._request(np.asarray(sample))
+
+  def reset(self):
+    return self._request(command='reset')
+
+  def stats(self):
+    return self._request(command='stats')
+
+  def close(self):
+    self._socket.close()
+
+
+def load_test(predict, samples, num_clients=8, requests_per_client=100):
+  """Call predict(sample, client_id) concurrently from num_clients threads.
+
+  :return: an OrderedDict with throughput and latency percentiles
+  """
+  latencies, lock = [], threading.Lock()
+
+  def client(cid):
+    local = []
+    for i in range(requests_per_client):
+      sample = samples[(cid * requests_per_client + i) % len(samples)]
+      tic = time.time()
+      predict(sample, cid)
+      local.append(time.time() - tic)
+    with lock: latencies.extend(local)
+
+  threads = [threading.Thread(target=client, args=(c,))
+             for c in range(num_clients)]
+  tic = time.time()
+  for t in threads: t.start()
+  for t in threads: t.join()
+  elapsed = time.time() - tic
+
+  latencies = np.array(latencies) * 1000
+  od = OrderedDict()
+  od['throughput'] = len(latencies) / elapsed
+  od['latency_mean_ms'] = float(np.mean(latencies))
+  od['latency_p50_ms'] = float(np.percentile(latencies, 50))
+  od['latency_p99_ms'] = float(np.percentile(latencies, 99))
+  return od
+
+
+# region : Utilities
+
+def _stack_nested(arrays):
+  """Concatenate a list of nested state arrays along batch axis"""
+  if isinstance(arrays[0], np.ndarray): return np.concatenate(arrays, axis=0)
+  return tuple([_stack_nested(list(a)) for a in zip(*arrays)])
+
+
+def _split_nested(array, n):
+  """Split a nested state array into n nested arrays of batch size 1"""
+  if isinstance(array, np.ndarray): return [array[i:i+1] for i in range(n)]
+  parts = [_split_nested(a, n) for a in array]
+  return [tuple([p[i] for p in parts]) for i in range(n)]
+
+
+def _send(sock, obj):
+  data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+  sock.sendall(struct.pack('!I', len(data)) + data)
+
+
+def _recv(sock):
+  def recv_exact(n):
+    buf = b''
+    while len(buf) < n:
+      chunk = sock.recv(n - len(buf))
+      if not chunk: return None
+      buf += chunk
+    return buf
+
+  header = recv_exact(4)
+  if header is None: return None
+  data = recv_exact(struct.unpack('!I', header)[0])
+  return None if data is None else pickle.loads(data)
+
+# endregion : Utilities
@@ -278,22 +278,25 @@ class ConfigPanel(BaseControl):
     return self._sorted_hyper
   
   @property
-  def qualified_notes(self):
+  def qualified_rows(self):
+    """Indices of notes having all active flags"""
     if self._candidates is not None: return self._candidates
-    flag_of_interest = set(self.active_config_dict.keys())
-    self._candidates = [
-      note for note in self.context.notes
-      if set(note.configs.keys()).issuperset(flag_of_interest)]
+    self._candidates = self.context.table.rows_having(
+      self.active_config_dict.keys())
     return self._candidates
 
+  @property
+  def qualified_notes(self):
+    return [self.context.notes[i] for i in self.qualified_rows]
+
   @property
   def groups(self):
     if self._groups is not None: return self._groups
     self._groups = OrderedDict()
-    for note in self.qualified_notes:
-      key = self._get_config_tuple(note)
-      if key not in self._groups.keys(): self._groups[key] = []
-      self._groups[key].append(note)
+    groups = self.context.table.group_by(
+      self.sorted_hyper_list, self.qualified_rows)
+    for key, rows in groups.items():
+      self._groups[key] = [self.context.notes[i] for i in rows]
     return self._groups
 
   @property
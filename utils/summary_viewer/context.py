@@ -2,11 +2,15 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import os
 import re
 import pickle
 from collections import OrderedDict
 from tframe.utils.note import Note
 
+from .note_table import NoteRecord, NoteTable, normalize_value
+from .note_table import get_index_path, get_records_path
+
 
 class Context(object):
   """The context of a NoteViewer. Usually stores the note file info and
@@ -19,7 +23,12 @@ class Context(object):
                default_inactive_criteria=(),
                flags_to_ignore=()):
     self.summary_file_path = None
+    # NoteRecords, whose configs and criteria are kept in table
     self.notes = []
+    # Columnar representation of notes, rows are in the same order as notes
+    self.table = NoteTable()
+    # Whether table is synchronized with the index file of summary
+    self._index_on = False
 
     self.active_flag_set = set()
     self.inactive_flag_set = set()
@@ -43,6 +52,16 @@ class Context(object):
     assert isinstance(self.summary_file_path, str)
     return '/'.join(re.split(r'/|\\', self.summary_file_path)[-last_level:])
 
+  @property
+  def index_path(self):
+    if self.summary_file_path is None: return None
+    return get_index_path(self.summary_file_path)
+
+  @property
+  def records_path(self):
+    if self.summary_file_path is None: return None
+    return get_records_path(self.summary_file_path)
+
   @property
   def active_flag_list(self):
     return self._set2list(self.active_flag_set)
@@ -65,21 +84,25 @@ class Context(object):
 
   def set_notes(self, summaries):
     if isinstance(summaries, str):
-      # Try to load note file
-      try:
-        with open(summaries, 'rb') as f:
-          self.notes = pickle.load(f)
-        assert isinstance(self.notes, list)
-        self.summary_file_path = summaries
-      except:
-        print('!! Failed to load {}'.format(summaries))
-        return
-      # Print status
-      print('>> Loaded notes from `{}`'.format(self.summary_file_path))
+      prev_path, self.summary_file_path = self.summary_file_path, summaries
+      # Read configs and criteria from index file so that notes are unpickled
+      # .. only when they are opened
+      if self._load_table():
+        print('>> Loaded {} notes from index of `{}`'.format(
+          len(self.notes), self.summary_file_path))
+      else:
+        # Otherwise unpickle the whole summary
+        notes = self._load_summary()
+        if notes is None:
+          self.summary_file_path = prev_path
+          print('!! Failed to load {}'.format(summaries))
+          return
+        self._set_loaded_notes(notes)
+        print('>> Loaded notes from `{}`'.format(self.summary_file_path))
     else:
       assert isinstance(summaries, list)
-      self.notes = summaries
       self.summary_file_path = 'Unknown'
+      self._set_loaded_notes(summaries)
       print('>> {} notes set to viewer'.format(len(summaries)))
 
     # Initialize flags and criteria
@@ -88,18 +111,32 @@ class Context(object):
 
   def reload(self):
     if not isinstance(self.summary_file_path, str): return
-    pre_length = len(self.notes)
-    try:
-      with open(self.summary_file_path, 'rb') as f:
-        self.notes = pickle.load(f)
-      assert isinstance(self.notes, list)
-    except:
-      print('!! Failed to reload {}'.format(self.summary_file_path))
-      return
+    if self._index_on:
+      # Read rows appended to index file since last load
+      if self.table.is_stale(self.index_path):
+        self.set_notes(self.summary_file_path)
+        return
+      size = self.table.size
+      self.table.load_index(self.index_path)
+      if None in self.table.offsets[size:]:
+        self.set_notes(self.summary_file_path)
+        return
+      self.notes += [self._get_record(i) for i in range(size, self.table.size)]
+      delta = self.table.size - size
+    else:
+      notes = self._load_summary()
+      if notes is None:
+        print('!! Failed to reload {}'.format(self.summary_file_path))
+        return
+      # Only notes appended since last load are processed
+      new_notes = notes[len(self.notes):]
+      self._normalize_notes(new_notes)
+      self.table.append_notes(new_notes)
+      self.notes += [NoteRecord(n.configs, n.criteria, note=n)
+                     for n in new_notes]
+      delta = len(new_notes)
     # Print status
     print('>> Reloaded notes from `{}`'.format(self.summary_file_path))
-    delta = len(self.notes) - pre_length
-    assert delta >= 0
     delta_str = 'No' if delta == 0 else '{}'.format(delta)
     print('>> {} notes added.'.format(delta_str))
 
@@ -107,21 +144,49 @@ class Context(object):
 
   # region : Private Methods
 
-  def _get_intersection_and_union(self, dict_attr):
-    intersection, union = set(), set()
-    for i, note in enumerate(self.notes):
-      # Get the specific dictionary attribute of note
-      attr = getattr(note, dict_attr)
-      assert isinstance(attr, dict)
-      keys = attr.keys()
-      # Update intersection and union
-      if i == 0:
-        intersection, union = set(keys), set(keys)
-      else:
-        key_set = set(attr.keys())
-        intersection.intersection_update(key_set)
-        union.update(key_set)
+  def _load_table(self):
+    """Load table from the index file of summary. Return False if any row
+       has no record in records file"""
+    if not all([os.path.exists(p)
+                for p in (self.index_path, self.records_path)]): return False
+    table = NoteTable()
+    table.load_index(self.index_path)
+    if None in table.offsets: return False
+    self.table, self._index_on = table, True
+    self.notes = [self._get_record(i) for i in range(self.table.size)]
+    return True
+
+  def _get_record(self, index):
+    configs, criteria = self.table.get_row(index)
+    path, offset = self.records_path, self.table.offsets[index]
+    return NoteRecord(configs, criteria,
+                      loader=lambda: NoteTable.load_record(path, offset))
+
+  def _load_summary(self):
+    try:
+      with open(self.summary_file_path, 'rb') as f: notes = pickle.load(f)
+      assert isinstance(notes, list)
+      return notes
+    except: return None
+
+  def _set_loaded_notes(self, notes):
+    """Build table from notes which have been unpickled"""
+    self._normalize_notes(notes)
+    self.table, self._index_on = NoteTable(), False
+    self.table.append_notes(notes)
+    self.notes = [NoteRecord(n.configs, n.criteria, note=n) for n in notes]
 
+  @staticmethod
+  def _normalize_notes(notes):
+    """Set values shown in viewer back to note configs"""
+    for note in notes:
+      for k, v in note.configs.items(): note.configs[k] = normalize_value(v)
+
+  def _get_intersection_and_union(self, dict_attr):
+    columns = getattr(self.table, dict_attr)
+    union = set(columns.keys())
+    intersection = set([k for k, column in columns.items()
+                        if all(column.mask)])
     return intersection, union
 
   def _init_flags(self):
@@ -135,35 +200,9 @@ class Context(object):
     self.inactive_flag_set = union - self.active_flag_set
 
     def get_flag_values(k):
-      values = set()
-      for note in self.notes:
-        if k in note.configs.keys():
-          value = note.configs[k]
-          # For type value
-          if isinstance(value, type):
-            value = str(value)
-            m = re.match(r"<class '([\w]+.)+([\w]+)'>", value)
-            if m is not None: value = m.group(1)
-            # Set string value back to note
-            note.configs[k] = value
-          # For list value
-          if isinstance(value, list):
-            value = tuple(value)
-            note.configs[k] = value
-          # TODO: for values if str(value) is too long
-          if not isinstance(value, str) and len(str(value)) > 15:
-            # For float value
-            if isinstance(value, float):
-              value = '{:.5f}'.format(value)
-              note.configs[k] = value
-            else:
-              m = re.match(r"<class '([\w]+.)+([\w]+)'>", str(type(value)))
-              if m is not None:
-                value = m.group(1)
-                note.configs[k] = value
-          values.add(value)
+      column = self.table.configs[k]
+      values = list(set(column.tolist(column.mask)))
       assert len(values) > 0
-      values = list(values)
 
       # TODO: workaround for avoiding sort stuff like (None, 4)
       try: values.sort()
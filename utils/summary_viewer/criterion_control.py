@@ -282,11 +282,9 @@ class CriteriaPanel(BaseControl):
   @property
   def notes_with_active_criteria(self):
     if self._candidates_set is None:
-      self._candidates_set = set([
-        note for note in self.context.notes
-        if set(note.criteria.keys()).issuperset(
-          self.context.active_criteria_set)
-      ])
+      rows = self.context.table.rows_having(
+        self.context.active_criteria_set, criteria=True)
+      self._candidates_set = set([self.context.notes[i] for i in rows])
     return self._candidates_set
 
   @property
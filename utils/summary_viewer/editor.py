@@ -2,9 +2,13 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import os
 import pickle
 from tframe import console
 
+from tframe.utils.summary_viewer.note_table import NoteTable, get_index_path
+from tframe.utils.summary_viewer.note_table import get_records_path
+
 
 class NoteList(object):
   def __init__(self, sum_path):
@@ -25,6 +29,13 @@ class NoteList(object):
   def save(self):
     with open(self.summary_path, 'wb') as f:
       pickle.dump(self.notes , f, pickle.HIGHEST_PROTOCOL)
+    # Rebuild the index and records files read by summary viewer
+    index_path = get_index_path(self.summary_path)
+    records_path = get_records_path(self.summary_path)
+    for path in (index_path, records_path):
+      if os.path.exists(path): os.remove(path)
+    offsets = NoteTable.append_records(records_path, self.notes)
+    NoteTable.write_index(index_path, self.notes, offsets)
     console.show_status('Note list (length {}) saved to `{}`'.format(
       len(self.notes), self.summary_path))
 
@@ -78,7 +78,7 @@ class HeaderControl(BaseControl):
   def refresh_header(self):
     # Refresh basic info label
     num_notes = len(self.context.notes)
-    num_qualified = len(self.config_panel.qualified_notes)
+    num_qualified = len(self.config_panel.qualified_rows)
     num_selected = len(self.config_panel.matched_notes)
     self.label_notes_info.config(text=self.notes_info.format(
       num_notes, num_qualified, num_selected))
@@ -99,13 +99,13 @@ class HeaderControl(BaseControl):
     if note is not None:
       console.show_status('Logs of selected note in header:')
       console.split()
-      print(note.content)
+      print(note.note.content)
       console.split()
 
   def save_selected_note(self, file_name):
     from tframe.utils.note import Note
     assert isinstance(file_name, str)
-    note = self.selected_note
+    note = self.selected_note.note
     assert isinstance(note, Note)
     note.save(file_name)
     console.show_status('Note saved to `{}`'.format(file_name))
@@ -137,8 +137,8 @@ class HeaderControl(BaseControl):
     text += ' '
     self.label_note_detail.configure(text=text)
 
-    # Fancy stuff
-    if note.has_history:
+    # Fancy stuff (the selected note is unpickled here)
+    if note.note.has_history:
       self.label_note_detail.configure(cursor='hand2', foreground='firebrick')
     else: self.label_note_detail.configure(cursor='arrow', foreground='black')
 
@@ -148,8 +148,8 @@ class HeaderControl(BaseControl):
 
   def on_label_detail_click(self):
     note = self.selected_note
-    if note is not None and note.has_history:
-      viewer = TensorViewer(note=note, plugins=self.main_frame.plugins)
+    if note is not None and note.note.has_history:
+      viewer = TensorViewer(note=note.note, plugins=self.main_frame.plugins)
       viewer.show()
 
   def move_cursor(self, offset):
@@ -0,0 +1,282 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+import os
+import pickle
+import re
+from collections import OrderedDict
+
+import numpy as np
+
+
+INDEX_SUFFIX = '.idx'
+RECORDS_SUFFIX = '.notes'
+
+
+def get_index_path(summary_path):
+  return summary_path + INDEX_SUFFIX
+
+
+def get_records_path(summary_path):
+  return summary_path + RECORDS_SUFFIX
+
+
+def normalize_value(value):
+  """Convert a config or criterion value to a hashable and JSON-serializable
+     value shown in summary viewer"""
+  if value is None or isinstance(value, (bool, str)): return value
+  if isinstance(value, (np.integer, np.floating, np.bool_)):
+    value = value.item()
+  # For type value
+  if isinstance(value, type):
+    value = str(value)
+    m = re.match(r"<class '([\w]+.)+([\w]+)'>", value)
+    return m.group(1) if m is not None else value
+  # For list value
+  if isinstance(value, (list, tuple)):
+    return tuple([normalize_value(v) for v in value])
+  # For long float value
+  if isinstance(value, float) and len(str(value)) > 15:
+    return '{:.5f}'.format(value)
+  if isinstance(value, (int, float)): return value
+  # For other objects
+  m = re.match(r"<class '([\w]+.)+([\w]+)'>", str(type(value)))
+  return m.group(1) if m is not None else str(value)
+
+
+def _normalize_configs(configs):
+  return OrderedDict([(k, normalize_value(v)) for k, v in configs.items()])
+
+
+def _normalize_criteria(criteria):
+  """Criteria are kept in full precision"""
+  od = OrderedDict()
+  for k, v in criteria.items():
+    if isinstance(v, np.generic): v = v.item()
+    od[k] = v if isinstance(v, (int, float)) else normalize_value(v)
+  return od
+
+
+class Column(object):
+  """A typed column. Numeric columns are kept as numpy arrays, others as
+     object arrays. Missing entries are marked in `mask`."""
+
+  def __init__(self):
+    self._values = []
+    self._mask = []
+    self._array = None
+    self._mask_array = None
+
+  def __len__(self):
+    return len(self._mask)
+
+  # region : Properties
+
+  @property
+  def array(self):
+    if self._array is None:
+      # Columns are typed only if all present values share the same type
+      types = set([type(v) for v, m in zip(self._values, self._mask) if m])
+      if types in ({int}, {float}):
+        dtype = np.int64 if types == {int} else np.float64
+        self._array = np.array(
+          [v if m else 0 for v, m in zip(self._values, self._mask)], dtype)
+      else:
+        self._array = np.empty(len(self._values), dtype=object)
+        self._array[:] = self._values
+    return self._array
+
+  @property
+  def mask(self):
+    if self._mask_array is None:
+      self._mask_array = np.array(self._mask, dtype=bool)
+    return self._mask_array
+
+  @property
+  def is_numeric(self):
+    return self.array.dtype != object
+
+  # endregion : Properties
+
+  def extend(self, n, index=None, value=None):
+    """Append n empty entries, then set the value at index if provided"""
+    self._values += [None] * n
+    self._mask += [False] * n
+    if index is not None:
+      self._values[index] = value
+      self._mask[index] = True
+    self._array, self._mask_array = None, None
+
+  def tolist(self, rows):
+    return self.array[rows].tolist()
+
+  def match(self, rows, value):
+    """Return a boolean array indicating whether each row equals value"""
+    values = self.array[rows]
+    if not self.is_numeric:
+      hits = np.array([v == value for v in values], dtype=bool)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+      hits = values == value
+    else: hits = np.zeros(len(values), dtype=bool)
+    return self.mask[rows] & hits
+
+
+class NoteRecord(object):
+  """A note in summary viewer. Configs and criteria are read from NoteTable
+     while the note itself is unpickled only when it is opened."""
+
+  def __init__(self, configs, criteria, loader=None, note=None):
+    assert callable(loader) or note is not None
+    self.configs = configs
+    self.criteria = criteria
+    self._loader = loader
+    self._note = note
+
+  @property
+  def note(self):
+    if self._note is None: self._note = self._loader()
+    return self._note
+
+
+class NoteTable(object):
+  """Columnar representation of configs and criteria of notes in a summary.
+     Rows are appended to an index file (summary_path + '.idx', one JSON line
+     per note) by Agent.gather_to_summary, so that summaries can be queried
+     and grouped without unpickling notes and reloaded incrementally. Each
+     note is also appended to a records file (summary_path + '.notes') as a
+     separate pickle, whose offset is kept in its row."""
+
+  def __init__(self):
+    self.configs = OrderedDict()
+    self.criteria = OrderedDict()
+    self.size = 0
+    # Offsets of notes in records file, None for rows without record
+    self.offsets = []
+    # Bytes of index file that have been read
+    self._offset = 0
+
+  # region : Public Methods
+
+  def append(self, configs, criteria, offset=None):
+    for columns, row in ((self.configs, _normalize_configs(configs)),
+                         (self.criteria, _normalize_criteria(criteria))):
+      for k in row.keys():
+        if k not in columns:
+          columns[k] = Column()
+          columns[k].extend(self.size)
+      for k, column in columns.items():
+        if k in row: column.extend(1, self.size, row[k])
+        else: column.extend(1)
+    self.offsets.append(offset)
+    self.size += 1
+
+  def append_notes(self, notes):
+    for note in notes: self.append(note.configs, note.criteria)
+
+  def load_index(self, path):
+    """Read rows appended to index file since last load.
+    :return: number of new rows
+    """
+    if not os.path.exists(path): return 0
+    size = self.size
+    with open(path, 'rb') as f:
+      f.seek(self._offset)
+      for line in f:
+        # Ignore a line which is being written
+        if not line.endswith(b'\n'): break
+        self._offset += len(line)
+        # Lists will be converted back to tuples in normalize_value
+        row = json.loads(line.decode('utf-8'))
+        self.append(row['configs'], row['criteria'], row.get('offset'))
+    return self.size - size
+
+  def is_stale(self, path):
+    """Whether index file has been rebuilt since last load"""
+    return not os.path.exists(path) or os.path.getsize(path) < self._offset
+
+  def get_row(self, index):
+    """Return (configs, criteria) of a row as OrderedDicts"""
+    return [OrderedDict([(k, column.array[index].item()
+                          if column.is_numeric else column.array[index])
+                         for k, column in columns.items()
+                         if column.mask[index]])
+            for columns in (self.configs, self.criteria)]
+
+  def rows_having(self, keys, criteria=False):
+    """Return indices of rows having all config (or criterion) keys"""
+    columns = self.criteria if criteria else self.configs
+    mask = np.ones(self.size, dtype=bool)
+    for k in keys:
+      if k not in columns: return np.zeros(0, dtype=np.int64)
+      mask &= columns[k].mask
+    return np.nonzero(mask)[0]
+
+  def select(self, rows=None, **configs):
+    """Return indices of rows matching configs"""
+    if rows is None: rows = self.rows_having(configs.keys())
+    rows = np.asarray(rows, dtype=np.int64)
+    for k, v in configs.items():
+      if k not in self.configs: return np.zeros(0, dtype=np.int64)
+      rows = rows[self.configs[k].match(rows, normalize_value(v))]
+    return rows
+
+  def group_by(self, keys, rows=None):
+    """Group rows by values of config keys.
+    :return: an OrderedDict mapping ((key, value), ...) to lists of indices
+    """
+    if rows is None: rows = self.rows_having(keys)
+    columns = [self.configs[k].tolist(rows) for k in keys]
+    groups = OrderedDict()
+    for i, values in zip(rows, zip(*columns) if keys else [()] * len(rows)):
+      group_key = tuple(zip(keys, values))
+      if group_key not in groups: groups[group_key] = []
+      groups[group_key].append(int(i))
+    return groups
+
+  def get_criteria(self, name, rows=None):
+    """Return values of a criterion as a numpy array, nan for missing ones"""
+    if rows is None: rows = np.arange(self.size)
+    column = self.criteria[name]
+    values = column.array[rows].astype(np.float64)
+    values[~column.mask[rows]] = np.nan
+    return values
+
+  # endregion : Public Methods
+
+  # region : Index File
+
+  @staticmethod
+  def write_index(path, notes, offsets=None):
+    """Append rows of notes to index file"""
+    if offsets is None: offsets = [None] * len(notes)
+    assert len(offsets) == len(notes)
+    rows = [OrderedDict(configs=_normalize_configs(note.configs),
+                        criteria=_normalize_criteria(note.criteria))
+            for note in notes]
+    for row, offset in zip(rows, offsets):
+      if offset is not None: row['offset'] = offset
+    with open(path, 'a') as f:
+      f.write(''.join([json.dumps(row) + '\n' for row in rows]))
+
+  @staticmethod
+  def append_records(path, notes):
+    """Append each note to records file as a separate pickle.
+    :return: offsets of notes in records file
+    """
+    offsets = []
+    with open(path, 'ab') as f:
+      f.seek(0, os.SEEK_END)
+      for note in notes:
+        offsets.append(f.tell())
+        pickle.dump(note, f, pickle.HIGHEST_PROTOCOL)
+    return offsets
+
+  @staticmethod
+  def load_record(path, offset):
+    with open(path, 'rb') as f:
+      f.seek(offset)
+      return pickle.load(f)
+
+  # endregion : Index File
@@ -47,5 +47,6 @@ def recursively_modify(method, v_dict, level=0, verbose=True):
       recursively_modify(method, e_dict, level=level+1, verbose=verbose)
     return
 
-  # At this point, values in v_dict must be lists of numpy arrays
+  # At this point, values in v_dict must be lists (or TensorSequences) of
+  #  numpy arrays
   for key in v_dict.keys(): v_dict[key] = method(key, v_dict[key])
@@ -6,6 +6,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 
 from tframe import checker
+from tframe.utils.file_tools.tensor_store import is_sequence, value_range
 from tframe.utils.tensor_viewer.plugin import Plugin, VariableWithView
 from tframe.utils.tensor_viewer.plugin import recursively_modify
 
@@ -16,7 +17,7 @@ from .plotter.heatmap1dto2d import heatmap2d
 
 def view(self, array_list):
   from tframe.utils.tensor_viewer.variable_viewer import VariableViewer
-  assert isinstance(array_list, list) and isinstance(self, VariableViewer)
+  assert is_sequence(array_list) and isinstance(self, VariableViewer)
 
   # Handle things happens in VariableView.refresh method
 
@@ -37,7 +38,7 @@ def view(self, array_list):
   # Plot histogram
 
   # Get range
-  a_range = [np.min(array_list), np.max(array_list)]
+  a_range = list(value_range(array_list))
   # Get activation
   activation = array_list[self.index].flatten()
   title = 'Activation Distribution'
@@ -53,7 +54,9 @@ def view(self, array_list):
 def method(key, value):
   assert isinstance(key, str)
   if 'sog_gate' not in key: return value
-  checker.check_type_v2(value, np.ndarray)
+  # Only the first array is checked since value may be mapped from disk
+  assert is_sequence(value)
+  checker.check_type_v2(value[0], np.ndarray)
   # Make sure activation is 1-D array
   assert len(value[0].shape) == 1
   return VariableWithView(value, view)
@@ -4,6 +4,8 @@ import numpy as np
 import matplotlib
 from matplotlib.ticker import FuncFormatter
 
+from tframe.utils.file_tools.tensor_store import is_sequence, lazy_map
+from tframe.utils.file_tools.tensor_store import value_range
 from tframe.utils.tensor_viewer.plugin import Plugin, VariableWithView
 
 
@@ -30,9 +32,9 @@ def _recursive_modify(v_dict, level=0):
     pairs.append((scope, v_dict.pop(key), v_dict.pop(mask_key)))
   # Update v_dict
   for scope, weights, mask in pairs:
-    assert isinstance(weights, list) and isinstance(mask, list)
+    assert is_sequence(weights) and is_sequence(mask)
     hist_key = scope + '_histogram'
-    v_dict[scope + '_masked'] = [w * m for w, m in zip(weights, mask)]
+    v_dict[scope + '_masked'] = lazy_map(lambda w, m: w * m, weights, mask)
     v_dict[hist_key] = VariableWithView((weights, mask), view=view)
     # Show status
     suffix = '..' * level if level > 0 else '>>'
@@ -56,8 +58,7 @@ def view(self, pair):
   weights = weights.flatten()
   # Calculate fraction and range
   frac = 100.0 * masked_weights.size / weights.size
-  w_range = ([np.min(weights_list), np.max(weights_list)]
-             if self.unify_range else None)
+  w_range = list(value_range(weights_list)) if self.unify_range else None
 
   # - Plot
   # .. preparation
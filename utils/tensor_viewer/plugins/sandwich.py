@@ -4,6 +4,7 @@ import numpy as np
 import matplotlib
 from matplotlib.ticker import FuncFormatter
 
+from tframe.utils.file_tools.tensor_store import lazy_map
 from tframe.utils.tensor_viewer.plugin import Plugin, VariableWithView
 
 
@@ -18,14 +19,13 @@ def _recursive_modify(v_dict, level=0):
   # Here the values in v_dict must be lists
   for key in list(v_dict.keys()):
     if not re.fullmatch(r'dL/dS\[\d+\]', key): continue
-    triangle_list = v_dict[key]
-    new_list = []
-    for triangle in triangle_list:
-      assert isinstance(triangle, np.ndarray) and len(triangle.shape) == 2
-      bottom = np.sum(triangle, axis=0, keepdims=True)
-      new_list.append(np.concatenate(
-        [triangle, np.zeros_like(bottom), bottom], axis=0))
-    v_dict[key] = new_list
+    v_dict[key] = lazy_map(_sandwich, v_dict[key])
+
+
+def _sandwich(triangle):
+  assert isinstance(triangle, np.ndarray) and len(triangle.shape) == 2
+  bottom = np.sum(triangle, axis=0, keepdims=True)
+  return np.concatenate([triangle, np.zeros_like(bottom), bottom], axis=0)
 
 
 def modifier(v_dict):
@@ -1,5 +1,6 @@
 import numpy as np
 
+from tframe.utils.file_tools.tensor_store import lazy_map
 from tframe.utils.tensor_viewer.plugin import Plugin
 
 
@@ -27,7 +28,7 @@ def _recursive_modify(v_dict, level=0):
   # Here the values in v_dict must be lists
   for key in list(v_dict.keys()):
     if key not in ['Significance']: continue
-    v_dict[key] = [_w2sig(v) for v in v_dict[key]]
+    v_dict[key] = lazy_map(_w2sig, v_dict[key])
 
 
 def modifier(v_dict):
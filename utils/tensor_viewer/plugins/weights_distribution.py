@@ -5,6 +5,7 @@ import numpy as np
 import matplotlib
 from matplotlib.ticker import FuncFormatter
 
+from tframe.utils.file_tools.tensor_store import is_sequence, value_range
 from tframe.utils.tensor_viewer.plugin import Plugin, VariableWithView
 from .plotter import histogram
 
@@ -25,9 +26,9 @@ def modifier(v_dict):
 
 def view(self, weights_list):
   from tframe.utils.tensor_viewer.variable_viewer import VariableViewer
-  assert isinstance(weights_list, list) and isinstance(self, VariableViewer)
+  assert is_sequence(weights_list) and isinstance(self, VariableViewer)
   # Get range
-  w_range = [np.min(weights_list), np.max(weights_list)]
+  w_range = list(value_range(weights_list))
   # Get weights
   weights = weights_list[self.index]
   assert isinstance(weights, np.ndarray)
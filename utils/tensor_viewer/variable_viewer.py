@@ -18,6 +18,8 @@ from tkinter import ttk
 from tkinter import Frame
 
 from tframe import console
+from tframe.utils.file_tools.tensor_store import TensorSequence, is_sequence
+from tframe.utils.file_tools.tensor_store import lazy_map, value_range
 from tframe.utils.tensor_viewer.plugin import Plugin, VariableWithView
 
 
@@ -81,7 +83,8 @@ class VariableViewer(Frame):
   def set_variable_dict(self, v_dict, plugins=None):
     """
     Set variable dict to this widgets
-    :param v_dict: a dict whose values are lists of numpy arrays
+    :param v_dict: a dict whose values are lists (or TensorSequences mapped
+                   from disk) of numpy arrays
     """
     # Sanity check
     assert isinstance(v_dict, OrderedDict) and len(v_dict) > 0
@@ -96,7 +99,7 @@ class VariableViewer(Frame):
           if len(vd) > 0: dst[k] = vd
           else:
             print(' ! Failed to set `{}` to viewer since its empty.'.format(k))
-        elif isinstance(v, list):
+        elif is_sequence(v):
           flattened = self._flatten(v, name=k)
           # Loosely check nan
           if np.isnan(flattened[0][0]).any():
@@ -135,7 +138,7 @@ class VariableViewer(Frame):
       assert isinstance(combo, ttk.Combobox)
       key = combo.get()
       target = target[key]
-    assert isinstance(target, (tuple, list, VariableWithView))
+    assert isinstance(target, (tuple, list, TensorSequence, VariableWithView))
 
     # Show target
     # Remove color bar if necessary
@@ -184,15 +187,15 @@ class VariableViewer(Frame):
     cmap = 'gist_earth' if self.show_absolute_value or gate_like else 'bwr'
     im = self._heat_map(image, cmap=cmap)
     if self.show_value: self._annotate_heat_map(im, image)
-    pool = np.abs(images) if self.unify_range else abs_variable
+    if self.unify_range: pool_min, pool_max = self._abs_range(images)
+    else: pool_min, pool_max = np.min(abs_variable), np.max(abs_variable)
     # Set color limits
     if gate_like:
       im.set_clim(0, 1)
     elif self.show_absolute_value:
-      im.set_clim(np.min(pool), np.max(pool))
+      im.set_clim(pool_min, pool_max)
     else:
-      lim = np.max(pool)
-      im.set_clim(-lim, lim)
+      im.set_clim(-pool_max, pool_max)
 
     title = '|T|' if self.show_absolute_value else 'T'
     title += '({}x{})'.format(image.shape[0], image.shape[1])
@@ -215,14 +218,15 @@ class VariableViewer(Frame):
     self.subplot.plot(step, array)
     self.subplot.set_xlim(min(step), max(step))
     # TODO: `use_clim` is not appropriate here
-    pool = arrays if self.unify_range else array
-    self.subplot.set_ylim(np.min(pool), np.max(pool))
+    pool_min, pool_max = (value_range(arrays) if self.unify_range
+                          else (np.min(array), np.max(array)))
+    self.subplot.set_ylim(pool_min, pool_max)
     self.subplot.set_aspect('auto')
 
     self.subplot.grid(True)
     self.subplot.set_yscale('log' if self.log_scale else 'linear')
     if self.log_scale:
-      self.subplot.set_ylim(max(np.min(pool), 1e-17), np.max(pool))
+      self.subplot.set_ylim(max(pool_min, 1e-17), pool_max)
     # self.subplot.set_title('Title')
     self.subplot.set_title('{:.3f}-{:.3f}'.format(min(array), max(array)))
 
@@ -330,17 +334,25 @@ class VariableViewer(Frame):
 
   # region : Utils
 
+  @staticmethod
+  def _abs_range(arrays):
+    """Return (min, max) of absolute values of a sequence of arrays"""
+    lo, hi = value_range(arrays)
+    if lo <= 0 <= hi: return 0, max(-lo, hi)
+    return min(abs(lo), abs(hi)), max(abs(lo), abs(hi))
+
   @staticmethod
   def _flatten(tensor_list, name):
     """Try to re-arrange an image stack, say, of shape (h, w, N) into
-        a single image of shape (H, W)
+        a single image of shape (H, W). Sequences mapped from disk are
+        converted lazily.
     """
-    assert isinstance(tensor_list, list)
+    assert is_sequence(tensor_list)
     tensor = tensor_list[0]
     if len(tensor.shape) in (2, 1): return tensor_list
     elif len(tensor.shape) == 3 and tensor.shape[2] == 3: return tensor_list
     elif len(tensor.shape) == 3 and tensor.shape[2] == 1:
-      return [t.reshape(t.shape[:2]) for t in tensor_list]
+      return lazy_map(lambda t: t.reshape(t.shape[:2]), tensor_list)
     elif len(tensor.shape) == 4 and tensor.shape[2] != 3: return None
     elif len(tensor.shape) not in (3, 4): return None
     # Now len(tensor.shape) in (3, 4)
@@ -351,8 +363,8 @@ class VariableViewer(Frame):
     edge = int(np.ceil(np.sqrt(total)))
     H, W = h * edge + edge - 1, w * edge + edge - 1
     new_shape = [H, W] + [3] if len(tensor.shape) == 4 else []
-    new_list = []
-    for t in tensor_list:
+
+    def to_pie(t):
       max_value = np.max(t)
       pie = np.zeros(shape=new_shape, dtype=np.float32)
       for i in range(total):
@@ -365,9 +377,9 @@ class VariableViewer(Frame):
         if len(tensor.shape) == 3:
           pie[i_slice, j_slice] = t[:, :, i] / max_value
         else: pie[i_slice, j_slice, :] = t[:, :, :, i] / max_value
-      new_list.append(pie)
-      # console.print_progress(i, total)
-    return new_list
+      return pie
+
+    return lazy_map(to_pie, tensor_list)
 
   # endregion : Utils
 
@@ -0,0 +1,176 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from collections import OrderedDict
+
+from tframe import tf
+
+import tframe as tfr
+
+from . import console
+
+
+class StepTracer(object):
+  """StepTracer runs selected session.run calls with FULL_TRACE RunOptions.
+     For each traced step, a Chrome-trace JSON file (can be opened in
+     chrome://tracing) and an aggregated per-op cost table will be written
+     to agent.trace_dir.
+
+     Steps to be traced are specified by th.trace_steps (training steps) and
+     th.trace_val_cycle (every N-th validation).
+  """
+
+  def __init__(self, agent):
+    self._agent = agent
+    # Validation related status
+    self._val_count = 0
+    self._in_validation = False
+    self._val_run_count = 0
+    # Steps that have been traced, used to avoid tracing a same step twice
+    self._traced_tags = set()
+
+  # region : Properties
+
+  @property
+  def activated(self):
+    return tfr.hub.trace_on
+
+  @property
+  def in_validation(self):
+    return self._in_validation
+
+  @property
+  def should_trace_validation(self):
+    cycle = tfr.hub.trace_val_cycle
+    if not self._in_validation or cycle <= 0: return False
+    return self._val_count % cycle == 0
+
+  # endregion : Properties
+
+  # region : Public Methods
+
+  def begin_validation(self):
+    """Called by Trainer._validate_model before validation set is evaluated"""
+    self._val_count += 1
+    self._val_run_count = 0
+    self._in_validation = True
+
+  def end_validation(self):
+    self._in_validation = False
+
+  def run(self, session, fetches, feed_dict=None, name='run',
+          training_step=True):
+    """Run fetches in session. If the current step should be traced,
+       FULL_TRACE RunOptions will be passed and the collected RunMetadata
+       will be exported.
+
+    :param session: a tf.Session
+    :param fetches: fetches to be passed to session.run
+    :param feed_dict: feed_dict to be passed to session.run
+    :param name: name used in tag of exported files
+    :param training_step: whether this run is a training step whose index is
+                          model.counter
+    :return: results of session.run
+    """
+    tag = self._get_tag(name, training_step) if self.activated else None
+    if tag is None: return session.run(fetches, feed_dict=feed_dict)
+
+    options = tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE)
+    run_metadata = tf.RunMetadata()
+    results = session.run(fetches, feed_dict=feed_dict, options=options,
+                          run_metadata=run_metadata)
+    self.export(run_metadata, tag)
+    return results
+
+  def export(self, run_metadata, tag):
+    """Write Chrome-trace JSON and per-op cost table to trace_dir"""
+    from tensorflow.python.client import timeline
+
+    assert isinstance(run_metadata, tf.RunMetadata)
+    trace_dir = self._agent.trace_dir
+
+    # Write chrome trace
+    tl = timeline.Timeline(run_metadata.step_stats)
+    content = tl.generate_chrome_trace_format(
+      show_memory=tfr.hub.trace_memory)
+    with open(os.path.join(trace_dir, '{}.json'.format(tag)), 'w') as f:
+      f.write(content)
+
+    # Write cost table
+    op_costs, scope_costs = self.get_cost_tables(run_metadata)
+    lines = ['Total time: {:.3f}ms'.format(
+      sum([c[1] for c in op_costs.values()]) / 1000), '']
+    lines += self._cost_table_lines(scope_costs, 'Scope')
+    lines += ['']
+    lines += self._cost_table_lines(op_costs, 'Op')
+    with open(os.path.join(trace_dir, '{}.txt'.format(tag)), 'w') as f:
+      f.write('\n'.join(lines) + '\n')
+
+    console.show_status(
+      'Step `{}` traced and exported to `{}`'.format(tag, trace_dir),
+      '[Tracer]')
+
+  def get_cost_tables(self, run_metadata):
+    """Aggregate node stats in run_metadata.
+
+    :return: (op_costs, scope_costs), each is an OrderedDict sorted by total
+             time in descending order. Values are (count, total_micros) tuples.
+             Keys of op_costs are `OpType` and keys of scope_costs are the
+             first 2 scopes in node names, e.g., `FeedforwardNet/Dense_1`.
+    """
+    graph = self._agent.graph
+    op_costs, scope_costs = {}, {}
+
+    def _add(d, key, micros):
+      count, total = d.get(key, (0, 0))
+      d[key] = (count + 1, total + micros)
+
+    for dev_stats in run_metadata.step_stats.dev_stats:
+      for node_stats in dev_stats.node_stats:
+        name = node_stats.node_name.split(':')[0]
+        micros = node_stats.all_end_rel_micros
+        # Find op type
+        try: op_type = graph.get_operation_by_name(name).type
+        except (KeyError, ValueError): op_type = name
+        _add(op_costs, op_type, micros)
+        _add(scope_costs, '/'.join(name.split('/')[:2]), micros)
+
+    sort = lambda d: OrderedDict(
+      sorted(d.items(), key=lambda kv: kv[1][1], reverse=True))
+    return sort(op_costs), sort(scope_costs)
+
+  # endregion : Public Methods
+
+  # region : Private Methods
+
+  def _get_tag(self, name, training_step):
+    """Returns tag of current run if it should be traced, otherwise None"""
+    name = name.replace(' ', '_').lower()
+    if self.should_trace_validation:
+      self._val_run_count += 1
+      return 'val{}-{}-{}'.format(
+        self._val_count, name, self._val_run_count)
+    if self._in_validation or not training_step: return None
+
+    step = self._agent._model.counter
+    if step not in tfr.hub.trace_step_set: return None
+    tag = 'step{}-{}'.format(step, name)
+    if tag in self._traced_tags: return None
+    self._traced_tags.add(tag)
+    return tag
+
+  @staticmethod
+  def _cost_table_lines(costs, title):
+    total = sum([c[1] for c in costs.values()]) or 1
+    width = max([len(title)] + [len(k) for k in costs.keys()])
+    fmt = '{:<' + str(width) + '}  {:>7}  {:>12}  {:>7}'
+    lines = [fmt.format(title, 'Count', 'Time (ms)', '%')]
+    lines.append('-' * len(lines[0]))
+    for key, (count, micros) in costs.items():
+      lines.append(fmt.format(key, count, '{:.3f}'.format(micros / 1000),
+                              '{:.1f}'.format(100.0 * micros / total)))
+    return lines
+
+  # endregion : Private Methods